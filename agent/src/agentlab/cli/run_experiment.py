@@ -1,11 +1,13 @@
 import argparse
+import asyncio
+import copy
 import json
 import os
 from pathlib import Path
 from datetime import datetime, timezone
+from typing import Any
 
 import yaml
-from pymongo import MongoClient
 
 from agentlab.catalog.loader import load_ui_catalog
 from agentlab.control.priors import (
@@ -13,102 +15,213 @@ from agentlab.control.priors import (
     save_learned_priors,
     update_priors_from_episodes,
 )
-from agentlab.env.browser_playwright_env import BrowserPlaywrightEnv
-from agentlab.env.simazon_env import SimazonEnv
+from agentlab.env.async_env import AsyncSimazonEnv
+from agentlab.env.env_pool import SCREENSHOT_VARIANTS, EnvPool
 from agentlab.eval.metrics import compute_rollups
-from agentlab.eval.runner import run_episode
+from agentlab.eval.progress import ProgressReporter
+from agentlab.eval.runner import run_episode, run_episodes_async, run_episodes_batched
 from agentlab.eval.task_resolver import resolve_task_template
 from agentlab.eval.tasks import load_task_templates
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--config", required=True)
-    parser.add_argument("--tasks-file", default="tasks/starter_20.json")
-    parser.add_argument("--catalog", default="agent/catalog/ui_catalog.yaml")
-    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
-    parser.add_argument("--db", default="simazon")
-    parser.add_argument("--collection", default="products")
-    parser.add_argument("--screenshot-base-url", default=os.getenv("SIMAZON_BASE_URL", ""))
-    parser.add_argument("--learn-priors-path", default="agent/catalog/learned_priors.json")
-    parser.add_argument("--learn-priors-lr", type=float, default=0.5)
-    parser.add_argument("--out", default="experiments/reports/last_run.json")
-    parser.add_argument("--summary-out", default="")
-    args = parser.parse_args()
+_CATALOG_CACHE: dict[str, tuple[int, dict[str, Any]]] = {}
+_PRIORS_CACHE: dict[str, tuple[int, dict[str, Any]]] = {}
 
-    cfg = yaml.safe_load(Path(args.config).read_text(encoding="utf-8"))
-    variants = cfg.get("variants", ["typed_action"])
-    max_steps = int(cfg.get("max_steps_per_episode", 30))
-    base_seed = int(cfg.get("seed", 42))
 
-    tasks = load_task_templates(args.tasks_file)
-    catalog = load_ui_catalog(args.catalog)
-    learned_priors = load_learned_priors(args.learn_priors_path)
+def _mtime_ns(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return -1
+
+
+def _cached(cache: dict[str, tuple[int, dict[str, Any]]], path: str | Path, loader) -> dict[str, Any]:
+    """Load `path` once per mtime. Callers get a deep copy, so the cached value is never mutated."""
+    p = Path(path).resolve()
+    key, mtime = str(p), _mtime_ns(p)
+    hit = cache.get(key)
+    if hit is None or hit[0] != mtime:
+        hit = cache[key] = (mtime, loader(p))
+    return copy.deepcopy(hit[1])
+
 
-    results: list[dict] = []
-    client = MongoClient(args.mongo_uri)
-    products_col = client[args.db][args.collection]
+def warm_caches(catalog: str | Path, learn_priors_path: str | Path) -> None:
+    """Parse the catalog and priors now so processes forked afterwards start with them loaded."""
+    if Path(catalog).exists():
+        _cached(_CATALOG_CACHE, catalog, load_ui_catalog)
+    _cached(_PRIORS_CACHE, learn_priors_path, load_learned_priors)
+
+
+async def _run_async(
+    mongo_uri: str,
+    db: str,
+    collection: str,
+    graph: Any,
+    jobs: list[tuple[dict[str, Any], str]],
+    catalog: dict[str, Any],
+    concurrency: int,
+    **kwargs: Any,
+) -> list[dict[str, Any]]:
+    # The async client belongs to the event loop, so it is created (and closed) inside it.
+    env = AsyncSimazonEnv(mongo_uri, db=db, collection=collection, graph=graph)
     try:
-        for idx, task_template in enumerate(tasks):
-            task = resolve_task_template(task_template, products_col, seed=base_seed + idx)
-            for variant in variants:
-                if variant in {"screenshot_based", "vision_ocr"}:
-                    if not args.screenshot_base_url:
-                        raise ValueError(f"{variant} variant requires --screenshot-base-url")
-                    env = BrowserPlaywrightEnv(args.screenshot_base_url)
-                else:
-                    env = SimazonEnv(args.mongo_uri, db=args.db, collection=args.collection)
-                try:
-                    episode = run_episode(
-                        env,
-                        task,
-                        variant,
-                        catalog,
-                        max_steps=max_steps,
-                        learned_priors_model=learned_priors,
-                    )
-                finally:
-                    env.close()
-                results.append(episode)
+        return await run_episodes_async(env, jobs, catalog, concurrency=concurrency, **kwargs)
     finally:
-        client.close()
+        await env.close()
+
+
+def run_experiment(
+    config: str | Path,
+    tasks_file: str | Path = "tasks/starter_20.json",
+    catalog: str | Path = "agent/catalog/ui_catalog.yaml",
+    mongo_uri: str = "mongodb://localhost:27017",
+    db: str = "simazon",
+    collection: str = "products",
+    screenshot_base_url: str = "",
+    learn_priors_path: str | Path = "agent/catalog/learned_priors.json",
+    learn_priors_lr: float = 0.5,
+    out: str | Path = "experiments/reports/last_run.json",
+    summary_out: str | Path = "",
+    max_steps: int | None = None,
+    progress_file: str | Path = "",
+    engine: str = "mongo",
+    graph_index: str | Path | None = None,
+    batch_size: int = 1,
+    concurrency: int = 1,
+) -> dict[str, Any]:
+    """Run every task x variant in `config`, write episodes, summary and updated priors; return the totals."""
+    cfg = yaml.safe_load(Path(config).read_text(encoding="utf-8"))
+    variants = cfg.get("variants", ["typed_action"])
+    max_steps = max_steps if max_steps is not None else int(cfg.get("max_steps_per_episode", 30))
+    base_seed = int(cfg.get("seed", 42))
 
-    out = Path(args.out)
+    tasks = load_task_templates(tasks_file)
+    ui_catalog = _cached(_CATALOG_CACHE, catalog, load_ui_catalog)
+    learned_priors = _cached(_PRIORS_CACHE, learn_priors_path, load_learned_priors)
+
+    progress = ProgressReporter(progress_file or None, total=len(tasks) * len(variants))
+    # One client and one env per backend for the whole run; reset() isolates episodes.
+    with EnvPool(
+        mongo_uri,
+        db=db,
+        collection=collection,
+        screenshot_base_url=screenshot_base_url,
+        engine=engine,
+        graph_index=graph_index,
+    ) as pool:
+        # Each template is resolved once so every variant runs against the same sampled product.
+        resolved = (
+            resolve_task_template(task_template, pool.products_col, seed=base_seed + idx, graph=pool.graph)
+            for idx, task_template in enumerate(tasks)
+        )
+        jobs = [(task, variant) for task in resolved for variant in variants]
+        slots: list[dict | None] = [None] * len(jobs)
+        # Structured episodes on the mongo engine can overlap or share round trips; the rest run one at a time.
+        overlapped = []
+        if pool.columnar is None and (concurrency > 1 or batch_size > 1):
+            overlapped = [i for i, (_, variant) in enumerate(jobs) if variant not in SCREENSHOT_VARIANTS]
+        if overlapped:
+            subset = [jobs[i] for i in overlapped]
+            common = {"max_steps": max_steps, "learned_priors_model": learned_priors, "on_episode": progress.episode}
+            if concurrency > 1:
+                episodes = asyncio.run(
+                    _run_async(mongo_uri, db, collection, pool.graph, subset, ui_catalog, concurrency, **common)
+                )
+            else:
+                episodes = run_episodes_batched(pool.vector_env(batch_size), subset, ui_catalog, **common)
+            for i, episode in zip(overlapped, episodes):
+                slots[i] = episode
+        for i, (task, variant) in enumerate(jobs):
+            if slots[i] is None:
+                slots[i] = run_episode(
+                    pool.env_for(variant),
+                    task,
+                    variant,
+                    ui_catalog,
+                    max_steps=max_steps,
+                    learned_priors_model=learned_priors,
+                )
+                progress.episode(slots[i])
+    results = [episode for episode in slots if episode is not None]
+
+    out = Path(out)
     out.parent.mkdir(parents=True, exist_ok=True)
     out.write_text(json.dumps(results, indent=2), encoding="utf-8")
 
-    learned_priors = update_priors_from_episodes(learned_priors, results, lr=args.learn_priors_lr)
-    save_learned_priors(args.learn_priors_path, learned_priors)
+    learned_priors = update_priors_from_episodes(learned_priors, results, lr=learn_priors_lr)
+    save_learned_priors(learn_priors_path, learned_priors)
 
     rollups = compute_rollups(results)
     summary = {
         "generated_at": datetime.now(timezone.utc).isoformat(),
-        "config": str(args.config),
+        "config": str(config),
         "episodes_file": str(out),
-        "learned_priors_file": str(args.learn_priors_path),
+        "learned_priors_file": str(learn_priors_path),
         "rollups": rollups,
     }
-    if args.summary_out:
-        summary_path = Path(args.summary_out)
+    if summary_out:
+        summary_path = Path(summary_out)
     else:
         summary_path = out.with_suffix(".summary.json")
     summary_path.parent.mkdir(parents=True, exist_ok=True)
     summary_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    progress.close(summary_out=str(summary_path))
 
     total = len(results)
     successes = sum(1 for r in results if r.get("success"))
-    print(
-        json.dumps(
-            {
-                "episodes": total,
-                "successes": successes,
-                "success_rate": (successes / total) if total else 0.0,
-                "out": str(out),
-                "summary_out": str(summary_path),
-            },
-            indent=2,
-        )
+    return {
+        "episodes": total,
+        "successes": successes,
+        "success_rate": (successes / total) if total else 0.0,
+        "out": str(out),
+        "summary_out": str(summary_path),
+    }
+
+
+def run_and_report(**kwargs: Any) -> None:
+    """`run_experiment` plus the CLI's stdout report; this is what warm job workers call."""
+    print(json.dumps(run_experiment(**kwargs), indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", required=True)
+    parser.add_argument("--tasks-file", default="tasks/starter_20.json")
+    parser.add_argument("--catalog", default="agent/catalog/ui_catalog.yaml")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="simazon")
+    parser.add_argument("--collection", default="products")
+    parser.add_argument("--screenshot-base-url", default=os.getenv("SIMAZON_BASE_URL", ""))
+    parser.add_argument("--learn-priors-path", default="agent/catalog/learned_priors.json")
+    parser.add_argument("--learn-priors-lr", type=float, default=0.5)
+    parser.add_argument("--out", default="experiments/reports/last_run.json")
+    parser.add_argument("--summary-out", default="")
+    parser.add_argument("--max-steps", type=int, default=None, help="Override max_steps_per_episode from --config.")
+    parser.add_argument("--progress-file", default="", help="Append a JSON progress event per episode to this file.")
+    parser.add_argument(
+        "--engine",
+        choices=("mongo", "columnar"),
+        default="mongo",
+        help="Backend for structured variants; columnar loads the catalog into memory once.",
+    )
+    parser.add_argument(
+        "--graph-index",
+        default=None,
+        help="Related-graph directory from scripts/build_related_graph.py; navigation and task targets skip Mongo.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Step this many structured episodes in lockstep, sharing one aggregation per tick (mongo engine).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Keep this many structured episodes in flight on one asyncio event loop (mongo engine; overrides --batch-size).",
     )
+    run_and_report(**vars(parser.parse_args()))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,21 @@
+"""Preload module for warm experiment workers.
+
+Importing it pulls in agentlab, pymongo and yaml and parses the repo's default
+UI catalog and learned priors, so every job forked from the importing process
+skips interpreter startup and the first parse. Never raises: a forkserver
+that fails a preload import would take the whole pool down with it.
+"""
+
+from pathlib import Path
+
+from agentlab.cli.run_experiment import warm_caches
+
+_REPO_ROOT = Path(__file__).resolve().parents[4]
+
+try:
+    warm_caches(
+        _REPO_ROOT / "agent" / "catalog" / "ui_catalog.yaml",
+        _REPO_ROOT / "agent" / "catalog" / "learned_priors.json",
+    )
+except Exception:  # noqa: BLE001 - a cold cache only costs the first job a parse
+    pass
@@ -1,4 +1,15 @@
-from typing import Any
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable
+
+# Lookahead over a structured env (SimazonEnv and subclasses): branches are
+# explored from env.snapshot() checkpoints instead of replaying the episode
+# prefix, and repeated queries across branches hit the env's search/product
+# caches. The env is always left at the state it started in.
+
+Expand = Callable[[dict[str, Any]], list[dict[str, Any]]]
+Score = Callable[[dict[str, Any], dict[str, Any]], float]
 
 
 def pick_best_action(candidates: list[dict[str, Any]]) -> dict[str, Any]:
@@ -8,3 +19,61 @@ def pick_best_action(candidates: list[dict[str, Any]]) -> dict[str, Any]:
     best = ranked[0].copy()
     best.pop("score", None)
     return best
+
+
+@dataclass
+class Branch:
+    actions: list[dict[str, Any]]
+    observation: dict[str, Any]
+    score: float
+    checkpoint: Any
+
+
+def beam_search(
+    env,
+    observation: dict[str, Any],
+    expand: Expand,
+    score: Score,
+    depth: int = 2,
+    beam_width: int = 4,
+) -> list[Branch]:
+    """Every branch evaluated within `depth` steps of the current state, best first.
+
+    `expand(observation)` proposes actions from a state and `score(observation, info)`
+    rates the state an action led to; after each level only the `beam_width`
+    best branches are expanded further.
+    """
+    root = env.snapshot()
+    beam = [Branch([], observation, 0.0, root)]
+    evaluated: list[Branch] = []
+    try:
+        for _ in range(depth):
+            children = []
+            for branch in beam:
+                for action in expand(branch.observation):
+                    env.restore(branch.checkpoint)
+                    obs, info = env.step(action)
+                    children.append(Branch([*branch.actions, action], obs, float(score(obs, info)), env.snapshot()))
+            if not children:
+                break
+            # Stable sort: among equal scores, earlier-proposed actions win.
+            children.sort(key=lambda b: b.score, reverse=True)
+            evaluated += children
+            beam = children[:beam_width]
+    finally:
+        env.restore(root)
+    # Prefer the shorter plan on ties so the planner does not wander.
+    return sorted(evaluated, key=lambda b: (-b.score, len(b.actions)))
+
+
+def lookahead_action(
+    env,
+    observation: dict[str, Any],
+    expand: Expand,
+    score: Score,
+    depth: int = 2,
+    beam_width: int = 4,
+) -> dict[str, Any]:
+    """First action of the best branch found by `beam_search` (NoOp if nothing could be expanded)."""
+    branches = beam_search(env, observation, expand, score, depth=depth, beam_width=beam_width)
+    return pick_best_action([{**b.actions[0], "score": b.score} for b in branches[:1]])
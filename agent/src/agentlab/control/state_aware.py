@@ -15,7 +15,7 @@ def next_action(task: dict[str, Any], observation: dict[str, Any]) -> dict[str,
             target = task.get("spec", {}).get("target_asin")
             if target and observation.get("selected_asin") == target:
                 return {"type": "AddToCart", "args": {"qty": 1}}
-            if isinstance(related_asins, list) and related_asins:
+            if isinstance(related_asins, (list, tuple)) and related_asins:
                 return {"type": "OpenRelated", "args": {"rank": 1}}
         return {"type": "AddToCart", "args": {"qty": 1}}
     return {"type": "NoOp", "args": {"reason": "state-aware fallback"}}
@@ -72,7 +72,7 @@ def next_action(
                 add("ApplyFacet", {"facet": "rating_bucket", "value": str(constraints["rating_gte"])}, task_score=0.7)
 
         asins = observation.get("result_asins", [])
-        if isinstance(asins, list) and asins:
+        if isinstance(asins, (list, tuple)) and asins:
             if oracle_target_asin and oracle_target_asin in asins:
                 rank = asins.index(oracle_target_asin) + 1
                 add("OpenResult", {"rank": rank}, task_score=1.5)
@@ -84,10 +84,10 @@ def next_action(
             related_asins = observation.get("related_asins", [])
             if oracle_target_asin and selected == oracle_target_asin:
                 add("AddToCart", {"qty": 1}, task_score=1.8)
-            elif oracle_target_asin and isinstance(related_asins, list) and oracle_target_asin in related_asins:
+            elif oracle_target_asin and isinstance(related_asins, (list, tuple)) and oracle_target_asin in related_asins:
                 rank = related_asins.index(oracle_target_asin) + 1
                 add("OpenRelated", {"rank": rank}, task_score=1.3)
-            elif isinstance(related_asins, list) and related_asins:
+            elif isinstance(related_asins, (list, tuple)) and related_asins:
                 add("OpenRelated", {"rank": 1}, task_score=0.8)
             else:
                 add("BackToResults", {}, task_score=0.1)
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from pymongo import AsyncMongoClient
+
+from agentlab.env.related_graph import RelatedGraph
+from agentlab.env.search_cache import search_cache
+from agentlab.env.search_query import CATALOG_META_COLLECTION, search_terms_collection
+from agentlab.env.vector_env import (
+    _Batch,
+    _Lane,
+    _Request,
+    oracle_requests,
+    page_request,
+    reset_requests,
+    search_request,
+    step_requests,
+)
+
+# SimazonEnv on pymongo's asyncio driver. Each call awaits the one aggregation
+# its action needs (the same prediction VectorSimazonEnv batches by) and then
+# runs SimazonEnv's synchronous step logic against the result, so behaviour is
+# identical and hundreds of envs can share one event loop and connection pool.
+
+
+class _Shared:
+    """Per-catalog state that sibling envs load once: catalog meta and BM25 document frequencies."""
+
+    def __init__(self) -> None:
+        self.meta_load: asyncio.Task | None = None
+        self.epoch: int | None = None
+        self.term_df: dict[str, int] = {}
+
+
+class AsyncSimazonEnv:
+    def __init__(
+        self,
+        mongo_uri: str,
+        db: str = "simazon",
+        collection: str = "products",
+        page_size: int = 50,
+        client: AsyncMongoClient | None = None,
+        graph: RelatedGraph | None = None,
+        _shared: _Shared | None = None,
+    ) -> None:
+        # A caller-supplied client is shared and outlives this env.
+        self._owns_client = client is None
+        self.client = client if client is not None else AsyncMongoClient(mongo_uri)
+        self.mongo_uri = mongo_uri
+        self.db = self.client[db]
+        self.col = self.db[collection]
+        self.graph = graph
+        self._shared = _shared or _Shared()
+        # Never touches the driver itself: every query it makes is prefetched first.
+        self._lane = _Lane(mongo_uri, db=db, collection=collection, page_size=page_size, client=self.client, graph=graph)
+        self._lane.prefetched = {}
+        self._lane.strict = True
+        self._lane._term_df = self._shared.term_df
+
+    def spawn(self) -> AsyncSimazonEnv:
+        """Another env on the same client, catalog meta and term cache (one per concurrent episode)."""
+        return AsyncSimazonEnv(
+            self.mongo_uri,
+            db=self.db.name,
+            collection=self.col.name,
+            page_size=self._lane.page_size,
+            client=self.client,
+            graph=self.graph,
+            _shared=self._shared,
+        )
+
+    @property
+    def state(self):
+        return self._lane.state
+
+    async def close(self) -> None:
+        if self._owns_client:
+            await self.client.close()
+
+    async def _catalog_meta(self, refresh: bool = False) -> dict[str, Any]:
+        shared = self._shared
+        # Siblings asking together wait on one find_one instead of each sending their own;
+        # a reset re-reads it (as SimazonEnv.reset does) once the previous read has finished.
+        if shared.meta_load is None or (refresh and shared.meta_load.done()):
+            shared.meta_load = asyncio.ensure_future(self._load_meta())
+        self._lane._meta = await shared.meta_load
+        return self._lane._meta
+
+    async def _find_meta(self) -> dict[str, Any]:
+        return await self.db[CATALOG_META_COLLECTION].find_one({"_id": self.col.name}) or {}
+
+    async def _load_meta(self) -> dict[str, Any]:
+        meta = await self._find_meta()
+        epoch = meta.get("epoch", 0)
+        if epoch != self._shared.epoch:
+            # Document frequencies belong to one ingest.
+            self._shared.term_df.clear()
+            self._shared.epoch = epoch
+        search_cache.note_epoch(self._lane._cache_ns, epoch)
+        return meta
+
+    async def _load_terms(self, tokens: list[str]) -> None:
+        missing = [t for t in tokens if t not in self._shared.term_df]
+        if not missing:
+            return
+        async for row in self.db[search_terms_collection(self.col.name)].find({"_id": {"$in": missing}}):
+            self._shared.term_df[row["_id"]] = int(row.get("df", 0))
+        for t in missing:
+            self._shared.term_df.setdefault(t, 0)
+
+    async def _prefetch(self, requests: list[_Request]) -> None:
+        batch = _Batch(self._lane.prefetched, requests)
+        if not batch.pending:
+            return
+        await self._load_terms(batch.tokens())
+        cursor = await self.col.aggregate(batch.pipeline(self._lane))
+        batch.store(await cursor.to_list())
+
+    async def reset(self, start_asin: str | None = None, related_edge: str | None = None) -> dict[str, Any]:
+        await self._catalog_meta(refresh=True)
+        await self._prefetch(reset_requests(self._lane, start_asin, related_edge))
+        return self._lane.reset(start_asin=start_asin, related_edge=related_edge)
+
+    async def step(self, action: dict[str, Any]) -> tuple[dict[str, Any], dict[str, Any]]:
+        await self._catalog_meta()
+        await self._prefetch(step_requests(self._lane, action))
+        return self._lane.step(action)
+
+    async def search(
+        self,
+        query: str,
+        constraints: dict[str, Any],
+        sort_key: str,
+        limit: int = 50,
+        after: str | None = None,
+    ) -> list[dict[str, Any]]:
+        await self._catalog_meta()
+        await self._prefetch([search_request(self._lane, query, constraints, sort_key, limit, after)])
+        return self._lane.search(query, constraints, sort_key, limit, after)
+
+    async def faceted_search(
+        self,
+        query: str,
+        constraints: dict[str, Any],
+        sort_key: str,
+        after: str | None = None,
+    ) -> dict[str, Any]:
+        """One page (`page_size` results) plus totals/facets, as the env's own searches fetch it."""
+        await self._catalog_meta()
+        await self._prefetch([page_request(self._lane, query, constraints, sort_key, after)])
+        return self._lane.faceted_search(query, constraints, sort_key, limit=self._lane.page_size, after=after)
+
+    async def compute_oracle_target_asin(self, task: dict[str, Any]) -> str | None:
+        await self._catalog_meta()
+        await self._prefetch(oracle_requests(self._lane, task))
+        return self._lane.compute_oracle_target_asin(task)
+
+    def snapshot(self):
+        return self._lane.snapshot()
+
+    def restore(self, checkpoint) -> dict[str, Any]:
+        return self._lane.restore(checkpoint)
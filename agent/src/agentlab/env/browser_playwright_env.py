@@ -4,12 +4,17 @@ import os
 import subprocess
 import sys
 import time
+import uuid
 from pathlib import Path
 from typing import Any
 
 from agentlab.perception.screenshot_view_classifier import screenshot_features
 
 
+def _new_sid() -> str:
+    return f"s{int(time.time())}{uuid.uuid4().hex[:6]}"
+
+
 class BrowserPlaywrightEnv:
     def __init__(self, base_url: str, artifacts_dir: str = "experiments/artifacts") -> None:
         try:
@@ -29,7 +34,7 @@ class BrowserPlaywrightEnv:
         # Keep browsers in-project so ephemeral runtime caches don't break launches.
         self._browsers_path = os.getenv("PLAYWRIGHT_BROWSERS_PATH", str(Path.cwd() / ".playwright"))
         os.environ["PLAYWRIGHT_BROWSERS_PATH"] = self._browsers_path
-        self.sid = f"s{int(time.time())}"
+        self.sid = _new_sid()
 
     def _install_chromium(self) -> None:
         env = os.environ.copy()
@@ -43,6 +48,12 @@ class BrowserPlaywrightEnv:
         )
 
     def _ensure(self) -> None:
+        if self._browser is not None and not self._browser.is_connected():
+            # The browser died mid-run; drop it and launch a new one.
+            try:
+                self.close()
+            except Exception:
+                self._pw = self._browser = self._ctx = self._page = None
         if self._pw is not None:
             return
         self._pw = self._sync_playwright().start()
@@ -69,8 +80,20 @@ class BrowserPlaywrightEnv:
         self._ctx = None
         self._page = None
 
+    def _new_session(self) -> None:
+        """Fresh storefront session and browser context, keeping the (expensive) browser process."""
+        if self._ctx is not None:
+            self._ctx.close()
+        self._ctx = self._browser.new_context(viewport={"width": 1440, "height": 1024})
+        self._page = self._ctx.new_page()
+        self.sid = _new_sid()
+
     def reset(self, start_asin: str | None = None, related_edge: str | None = None) -> dict[str, Any]:
+        # Each episode gets its own sid (server-side cart) and context, so one env can be reused.
+        first = self._pw is None
         self._ensure()
+        if not first:
+            self._new_session()
         if start_asin:
             edge_q = f"&edge={related_edge}" if related_edge else ""
             url = f"{self.base_url}/ui/product/{start_asin}?sid={self.sid}{edge_q}"
@@ -88,7 +111,7 @@ class BrowserPlaywrightEnv:
     def _observation(self, step_idx: int) -> dict[str, Any]:
         shot_path = self._shot(step_idx)
         feats = screenshot_features(shot_path)
-        # Keep replay paths relative to the /artifacts static mount.
+        # Keep replay paths relative to the /artifacts route.
         feats["screenshot_path"] = shot_path.name
         feats["screenshot_abspath"] = str(shot_path)
         feats["step_idx"] = step_idx
@@ -118,6 +141,9 @@ class BrowserPlaywrightEnv:
                 rank = max(1, int(args.get("rank", 1)))
                 ok = self._click_nth('[data-testid="open-product"]', rank - 1)
                 event = "OpenedProduct"
+            elif kind == "NextPage":
+                ok = self._click_nth('[data-testid="next-page"]', 0)
+                event = "PageAdvanced"
             elif kind == "OpenRelated":
                 rank = max(1, int(args.get("rank", 1)))
                 ok = self._click_nth('[data-testid="related-item"]', rank - 1)
@@ -0,0 +1,399 @@
+from __future__ import annotations
+
+import bisect
+from collections import Counter
+from typing import Any
+
+import numpy as np
+
+from agentlab.env.product_query import FALLBACK_LIMIT, PRODUCT_PROJECTION, edge_asins
+from agentlab.env.search_query import (
+    BM25_B,
+    BM25_K1,
+    CATALOG_META_COLLECTION,
+    FACET_FIELDS,
+    PRICE_BUCKET_BOUNDARIES,
+    SCORE_FIELD,
+    SEARCH_PROJECTION,
+    SEARCH_TOKENS_FIELD,
+    bm25_idf,
+    decode_cursor,
+    parse_faceted_result,
+    query_tokens,
+    search_terms_collection,
+    sort_spec,
+    split_page,
+)
+from agentlab.env.related_graph import RelatedGraph
+from agentlab.env.simazon_env import SimazonEnv, SimazonState
+
+# The products collection held as NumPy columns, answering the same queries as
+# search_query's pipelines (filter, BM25, sort with asin tie-break, keyset
+# cursors, facets) and product_query's detail view without a database. Meant
+# for large structured sweeps; the Mongo path stays the reference.
+
+_NUMERIC_FIELDS = ("price", "rating_avg", "rating_count")
+
+
+def _number(value: Any) -> float:
+    # BSON numbers only: bools are their own type and never match $type: "number".
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return np.nan
+
+
+def _encode(values: list[Any]) -> tuple[np.ndarray, list[str], dict[str, int]]:
+    """Dictionary-encode non-empty strings; codes follow sorted value order so code ties sort like _id."""
+    vocab = sorted({v for v in values if isinstance(v, str) and v})
+    index = {v: i for i, v in enumerate(vocab)}
+    codes = np.array([index.get(v, -1) if isinstance(v, str) else -1 for v in values], dtype=np.int32)
+    return codes, vocab, index
+
+
+def _group_offsets(codes: np.ndarray, asin_rank: np.ndarray, size: int) -> tuple[np.ndarray, np.ndarray]:
+    """Rows ordered by (code, asin) plus the start offset of each code, for brand/category neighbours."""
+    order = np.lexsort((asin_rank, codes))
+    starts = np.searchsorted(codes[order], np.arange(size + 1))
+    return order, starts
+
+
+def _neumaier_add(total: np.ndarray, comp: np.ndarray, term: np.ndarray) -> np.ndarray:
+    # Compensated summation, matching the server's double-double $add closely enough that
+    # BM25 ties break the same way.
+    t = total + term
+    comp += np.where(np.abs(total) >= np.abs(term), (total - t) + term, (term - t) + total)
+    return t
+
+
+class ColumnarCatalog:
+    """Column-oriented, read-only snapshot of a products collection.
+
+    Rows are addressed by position. Numeric fields are float64 with NaN for
+    null/missing/non-numeric, brand and category_leaf are dictionary codes (-1
+    when absent), and `search_tokens` becomes per-token postings (row ids plus
+    term frequencies) for the `$all` filter and BM25.
+    """
+
+    def __init__(self, docs: list[dict[str, Any]], term_stats: dict[str, Any] | None = None) -> None:
+        self.size = len(docs)
+        self._search_rows = [{k: d[k] for k in d if k in SEARCH_PROJECTION and k != "_id"} for d in docs]
+        self._product_rows = [{k: d[k] for k in d if k in PRODUCT_PROJECTION and k != "_id"} for d in docs]
+
+        self.asins = asins = [str(d.get("asin", "")) for d in docs]
+        self.asin_index = {a: i for i, a in enumerate(asins)}
+        order = sorted(range(self.size), key=asins.__getitem__)
+        self.sorted_asins = [asins[i] for i in order]
+        self.asin_rank = np.empty(self.size, dtype=np.int64)
+        self.asin_rank[order] = np.arange(self.size)
+
+        self.columns = {f: np.array([_number(d.get(f)) for d in docs], dtype=np.float64) for f in _NUMERIC_FIELDS}
+        self.codes: dict[str, np.ndarray] = {}
+        self.vocab: dict[str, list[str]] = {}
+        self._code_index: dict[str, dict[str, int]] = {}
+        self._groups: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        for f in FACET_FIELDS:
+            self.codes[f], self.vocab[f], self._code_index[f] = _encode([d.get(f) for d in docs])
+            self._groups[f] = _group_offsets(self.codes[f], self.asin_rank, len(self.vocab[f]))
+
+        doc_len = np.zeros(self.size, dtype=np.int64)
+        postings: dict[str, tuple[list[int], list[int]]] = {}
+        for row, d in enumerate(docs):
+            tokens = d.get(SEARCH_TOKENS_FIELD)
+            if not isinstance(tokens, list):
+                continue
+            doc_len[row] = len(tokens)
+            for token, tf in Counter(t for t in tokens if isinstance(t, str)).items():
+                ids, tfs = postings.setdefault(token, ([], []))
+                ids.append(row)
+                tfs.append(tf)
+        self.doc_len = doc_len
+        self.postings = {t: (np.array(ids, dtype=np.int64), np.array(tfs, dtype=np.int64)) for t, (ids, tfs) in postings.items()}
+
+        if term_stats is None:
+            # Same definitions as ingest's rebuild_term_stats.
+            term_stats = {
+                "doc_count": self.size,
+                "avg_len": float(doc_len.mean()) if self.size else 0.0,
+                "df": {t: len(ids) for t, (ids, _) in self.postings.items()},
+            }
+        self.term_stats = term_stats
+
+    @classmethod
+    def from_collection(cls, col) -> ColumnarCatalog:
+        """Load every product once, with the BM25 corpus stats ingest persisted next to it."""
+        projection = {**PRODUCT_PROJECTION, SEARCH_TOKENS_FIELD: 1}
+        docs = list(col.find({}, projection))
+        db = col.database
+        meta = db[CATALOG_META_COLLECTION].find_one({"_id": col.name}) or {}
+        df = {row["_id"]: int(row.get("df", 0)) for row in db[search_terms_collection(col.name)].find({})}
+        return cls(
+            docs,
+            term_stats={"doc_count": meta.get("search_doc_count", 0), "avg_len": meta.get("search_avg_len", 0.0), "df": df},
+        )
+
+    # -- filtering -----------------------------------------------------------------
+
+    def _token_rows(self, tokens: list[str]) -> tuple[np.ndarray, list[np.ndarray]]:
+        """Rows containing every token (`$all`), plus each token's term frequency on those rows."""
+        lists = [self.postings.get(t) for t in tokens]
+        if any(p is None for p in lists):
+            return np.empty(0, dtype=np.int64), []
+        rows = min((p[0] for p in lists), key=len)
+        for ids, _ in lists:
+            rows = rows[np.isin(rows, ids, assume_unique=True)]
+        return rows, [tfs[np.searchsorted(ids, rows)] for ids, tfs in lists]
+
+    def _code_mask(self, field: str, rows: np.ndarray, value: Any) -> np.ndarray:
+        code = self._code_index[field].get(value) if isinstance(value, str) else None
+        if code is None:
+            return np.zeros(len(rows), dtype=bool)
+        return self.codes[field][rows] == code
+
+    def _filter(self, query: str, constraints: dict[str, Any]) -> tuple[np.ndarray, list[str], list[np.ndarray]]:
+        """`query_filter` semantics: matching row ids (ascending) and per-token tf for BM25."""
+        tokens = query_tokens(query)
+        if tokens:
+            rows, tfs = self._token_rows(tokens)
+        else:
+            rows, tfs = np.arange(self.size, dtype=np.int64), []
+        keep = np.ones(len(rows), dtype=bool)
+
+        for field in FACET_FIELDS:
+            value = constraints.get(field)
+            if value:
+                keep &= self._code_mask(field, rows, value)
+        price = self.columns["price"][rows]
+        price_lte = constraints.get("price_lte")
+        if isinstance(price_lte, (int, float)):
+            keep &= price <= float(price_lte)
+        rating_gte = constraints.get("rating_gte")
+        if isinstance(rating_gte, (int, float)):
+            keep &= self.columns["rating_avg"][rows] >= float(rating_gte)
+        rating_count_gte = constraints.get("rating_count_gte")
+        if isinstance(rating_count_gte, int):
+            keep &= self.columns["rating_count"][rows] >= rating_count_gte
+        if constraints.get("price_bucket") == "under_25":
+            keep &= price < 25
+
+        if keep.all():
+            return rows, tokens, tfs
+        return rows[keep], tokens, [tf[keep] for tf in tfs]
+
+    def _bm25(self, rows: np.ndarray, tokens: list[str], tfs: list[np.ndarray]) -> np.ndarray:
+        """`bm25_score_expr` evaluated in the same operation order as the server."""
+        doc_count = int(self.term_stats.get("doc_count", 0))
+        avg_len = max(float(self.term_stats.get("avg_len", 0.0)), 1.0)
+        df = self.term_stats.get("df", {})
+        norm = BM25_K1 * ((1 - BM25_B) + BM25_B * (self.doc_len[rows] / avg_len))
+        total = np.zeros(len(rows))
+        comp = np.zeros(len(rows))
+        for token, tf in zip(tokens, tfs):
+            idf = bm25_idf(int(df.get(token, 0)), doc_count)
+            total = _neumaier_add(total, comp, idf * ((tf * (BM25_K1 + 1)) / (tf + norm)))
+        return total + comp
+
+    # -- ordering ------------------------------------------------------------------
+
+    def _field_values(self, field: str, rows: np.ndarray, scores: np.ndarray | None) -> np.ndarray:
+        if field == SCORE_FIELD:
+            return scores
+        return self.columns[field][rows]
+
+    def _sort_keys(self, spec: list[tuple[str, int]], rows: np.ndarray, scores: np.ndarray | None) -> list[np.ndarray]:
+        """Ascending float keys per sort field; Mongo puts null below every number."""
+        keys = []
+        for field, direction in spec:
+            if field == "asin":
+                keys.append(self.asin_rank[rows])
+                continue
+            values = self._field_values(field, rows, scores)
+            if direction == 1:
+                keys.append(np.where(np.isnan(values), -np.inf, values))
+            else:
+                keys.append(np.where(np.isnan(values), np.inf, -values))
+        return keys
+
+    def _asin_after(self, rows: np.ndarray, value: Any) -> tuple[np.ndarray, np.ndarray]:
+        """(asin == value, asin > value) for `rows`, via binary search over the sorted asins."""
+        none = np.zeros(len(rows), dtype=bool)
+        if value is None:
+            return none, ~none
+        if not isinstance(value, str):
+            return none, none
+        pos = bisect.bisect_left(self.sorted_asins, value)
+        exact = pos < self.size and self.sorted_asins[pos] == value
+        ranks = self.asin_rank[rows]
+        eq = ranks == pos if exact else none
+        return eq, ranks >= pos + (1 if exact else 0)
+
+    def _keyset_mask(self, spec: list[tuple[str, int]], values: list[Any], rows: np.ndarray, scores: np.ndarray | None) -> np.ndarray:
+        """`keyset_filter` semantics: rows strictly after `values`, including the null rules."""
+        mask = np.zeros(len(rows), dtype=bool)
+        equal = np.ones(len(rows), dtype=bool)
+        for (field, direction), value in zip(spec, values):
+            if field == "asin":
+                eq, after = self._asin_after(rows, value)
+            else:
+                col = self._field_values(field, rows, scores)
+                null = np.isnan(col)
+                number = _number(value)
+                if value is None:
+                    eq = null
+                    after = ~null if direction == 1 else None
+                elif np.isnan(number):
+                    eq = after = np.zeros(len(rows), dtype=bool)
+                else:
+                    with np.errstate(invalid="ignore"):
+                        eq = col == number
+                        after = col > number if direction == 1 else (col < number) | null
+            if after is not None:
+                mask |= equal & after
+            equal &= eq
+        return mask
+
+    def _top(self, rows: np.ndarray, keys: list[np.ndarray], limit: int) -> np.ndarray:
+        """Positions (into `rows`) of the first `limit` rows in key order, without a full sort."""
+        if limit <= 0 or not len(rows):
+            return np.empty(0, dtype=np.int64)
+        if limit < len(rows):
+            primary = keys[0]
+            kth = primary[np.argpartition(primary, limit - 1)[limit - 1]]
+            candidates = np.flatnonzero(primary <= kth)
+        else:
+            candidates = np.arange(len(rows))
+        order = np.lexsort([k[candidates] for k in reversed(keys)])
+        return candidates[order[:limit]]
+
+    def _page(
+        self,
+        rows: np.ndarray,
+        tokens: list[str],
+        tfs: list[np.ndarray],
+        sort_key: str,
+        limit: int,
+        after: str | None,
+    ) -> tuple[list[dict[str, Any]], bool]:
+        scored = sort_key == "relevance" and bool(tokens)
+        scores = self._bm25(rows, tokens, tfs) if scored else None
+        spec = sort_spec(sort_key, scored=scored)
+        values = decode_cursor(after, sort_key, scored)
+        if values is not None:
+            keep = self._keyset_mask(spec, values, rows, scores)
+            rows = rows[keep]
+            scores = scores[keep] if scores is not None else None
+        top = self._top(rows, self._sort_keys(spec, rows, scores), limit)
+        docs = []
+        for pos in top:
+            doc = dict(self._search_rows[rows[pos]])
+            if scores is not None:
+                doc[SCORE_FIELD] = float(scores[pos])
+            docs.append(doc)
+        return docs, scored
+
+    # -- public queries (same shapes as SimazonEnv) ---------------------------------
+
+    def search(self, query: str, constraints: dict[str, Any], sort_key: str, limit: int = 50, after: str | None = None) -> list[dict[str, Any]]:
+        rows, tokens, tfs = self._filter(query, constraints)
+        return self._page(rows, tokens, tfs, sort_key, limit, after)[0]
+
+    def _facet_rows(self, rows: np.ndarray, facet_top_k: int) -> dict[str, list[dict[str, Any]]]:
+        out: dict[str, list[dict[str, Any]]] = {}
+        for field in FACET_FIELDS:
+            codes = self.codes[field][rows]
+            counts = np.bincount(codes[codes >= 0], minlength=len(self.vocab[field]))
+            present = np.flatnonzero(counts)
+            ordered = present[np.lexsort((present, -counts[present]))][:facet_top_k]
+            out[field] = [{"_id": self.vocab[field][c], "count": int(counts[c])} for c in ordered]
+        price = self.columns["price"][rows]
+        price = price[price >= 0]
+        bounds = PRICE_BUCKET_BOUNDARIES
+        inside = price < bounds[-1]
+        buckets = np.bincount(np.searchsorted(bounds, price[inside], side="right") - 1, minlength=len(bounds) - 1)
+        out["price_bucket"] = [{"_id": bounds[i], "count": int(n)} for i, n in enumerate(buckets) if n]
+        overflow = int((~inside).sum())
+        if overflow:
+            out["price_bucket"].append({"_id": f"{bounds[-1]}+", "count": overflow})
+        return out
+
+    def faceted_search(
+        self,
+        query: str,
+        constraints: dict[str, Any],
+        sort_key: str,
+        limit: int = 50,
+        facet_top_k: int = 12,
+        after: str | None = None,
+    ) -> dict[str, Any]:
+        rows, tokens, tfs = self._filter(query, constraints)
+        docs, scored = self._page(rows, tokens, tfs, sort_key, limit + 1, after)
+        raw = {"results": docs, "total": [{"n": len(rows)}] if len(rows) else [], **self._facet_rows(rows, facet_top_k)}
+        page = parse_faceted_result([raw])
+        page["results"], page["next_cursor"] = split_page(page["results"], limit, sort_key, scored)
+        return page
+
+    def _neighbours(self, field: str, row: int) -> list[str]:
+        code = int(self.codes[field][row])
+        if code < 0:
+            return []
+        order, starts = self._groups[field]
+        members = order[starts[code] : min(starts[code + 1], starts[code] + FALLBACK_LIMIT + 1)]
+        return [self.asins[m] for m in members if m != row][:FALLBACK_LIMIT]
+
+    def product_view(self, asin: str, edge: str) -> dict[str, Any] | None:
+        """Same result as `parse_product_view` over `product_view_pipeline`."""
+        row = self.asin_index.get(asin)
+        if row is None:
+            return None
+        product = dict(self._product_rows[row])
+        related = []
+        for a in edge_asins(product, edge):
+            target = self.asin_index.get(a)
+            if target is not None:
+                related.append({k: v for k, v in self._search_rows[target].items() if k in ("asin", "title")})
+        if edge_asins(product, edge):
+            neighbours = [d["asin"] for d in related]
+        else:
+            neighbours = []
+            for field in ("brand", "category_leaf"):
+                if product.get(field):
+                    neighbours = self._neighbours(field, row)
+                    if neighbours:
+                        break
+        return {"product": product, "edge": edge, "related": related, "neighbours": neighbours}
+
+
+class ColumnarSimazonEnv(SimazonEnv):
+    """SimazonEnv whose queries are answered by a shared ColumnarCatalog; no database in the step loop."""
+
+    def __init__(self, catalog: ColumnarCatalog, page_size: int = 50, graph: RelatedGraph | None = None) -> None:
+        self.catalog = catalog
+        self.page_size = page_size
+        self.graph = graph
+        self.state = SimazonState()
+
+    def close(self) -> None:
+        pass
+
+    def _product_view(self, asin: str, edge: str) -> dict[str, Any] | None:
+        return self.catalog.product_view(asin, edge)
+
+    def search(
+        self,
+        query: str,
+        constraints: dict[str, Any],
+        sort_key: str,
+        limit: int = 50,
+        after: str | None = None,
+    ) -> list[dict[str, Any]]:
+        return self.catalog.search(query, constraints, sort_key, limit, after)
+
+    def faceted_search(
+        self,
+        query: str,
+        constraints: dict[str, Any],
+        sort_key: str,
+        limit: int = 50,
+        facet_top_k: int = 12,
+        after: str | None = None,
+    ) -> dict[str, Any]:
+        return self.catalog.faceted_search(query, constraints, sort_key, limit, facet_top_k, after)
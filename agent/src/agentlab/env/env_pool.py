@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+from pymongo import MongoClient
+
+from agentlab.env.browser_playwright_env import BrowserPlaywrightEnv
+from agentlab.env.columnar_catalog import ColumnarCatalog, ColumnarSimazonEnv
+from agentlab.env.related_graph import RelatedGraph
+from agentlab.env.search_query import CATALOG_META_COLLECTION
+from agentlab.env.simazon_env import SimazonEnv
+from agentlab.env.vector_env import VectorSimazonEnv
+
+SCREENSHOT_VARIANTS = frozenset({"screenshot_based", "vision_ocr"})
+
+
+class EnvPool:
+    """One reusable env per backend for a whole run, all sharing a single MongoClient.
+
+    Episodes are isolated by `reset()`: SimazonEnv starts from a fresh state and
+    BrowserPlaywrightEnv opens a new browser context and storefront session, so
+    only connection pools, server discovery and the browser process carry over.
+    Not thread-safe; give each worker thread its own pool.
+    """
+
+    def __init__(
+        self,
+        mongo_uri: str,
+        db: str = "simazon",
+        collection: str = "products",
+        screenshot_base_url: str = "",
+        engine: str = "mongo",
+        graph_index: str | Path | None = None,
+    ) -> None:
+        self.mongo_uri = mongo_uri
+        self.db = db
+        self.collection = collection
+        self.screenshot_base_url = screenshot_base_url
+        self.client = MongoClient(mongo_uri)
+        self._envs: dict[str, Any] = {}
+        # "columnar" loads the collection once and answers structured variants in memory.
+        self.columnar = ColumnarCatalog.from_collection(self.products_col) if engine == "columnar" else None
+        self.graph = self._load_graph(graph_index) if graph_index else None
+
+    @property
+    def products_col(self):
+        return self.client[self.db][self.collection]
+
+    def _load_graph(self, path: str | Path) -> RelatedGraph:
+        graph = RelatedGraph.load(path)
+        meta = self.client[self.db][CATALOG_META_COLLECTION].find_one({"_id": self.collection}) or {}
+        built, current = graph.meta.get("catalog_epoch"), int(meta.get("epoch", 0))
+        if graph.meta.get("collection") != self.collection or built != current:
+            raise ValueError(
+                f"related graph {path} was built for {graph.meta.get('collection')}@{built}, "
+                f"catalog is {self.collection}@{current}; rebuild it with scripts/build_related_graph.py"
+            )
+        return graph
+
+    def _build(self, kind: str) -> Any:
+        if kind == "browser":
+            return BrowserPlaywrightEnv(self.screenshot_base_url)
+        if kind == "columnar":
+            return ColumnarSimazonEnv(self.columnar, graph=self.graph)
+        return SimazonEnv(self.mongo_uri, db=self.db, collection=self.collection, client=self.client, graph=self.graph)
+
+    def env_for(self, variant: str) -> Any:
+        if variant in SCREENSHOT_VARIANTS:
+            if not self.screenshot_base_url:
+                raise ValueError(f"{variant} variant requires --screenshot-base-url")
+            kind = "browser"
+        else:
+            kind = "columnar" if self.columnar is not None else "structured"
+        env = self._envs.get(kind)
+        if env is None:
+            env = self._envs[kind] = self._build(kind)
+        return env
+
+    def vector_env(self, num_envs: int) -> VectorSimazonEnv:
+        """Lockstep env for batched structured episodes on the mongo engine."""
+        env = self._envs.get("vector")
+        if env is None or env.num_envs != num_envs:
+            if env is not None:
+                env.close()
+            env = self._envs["vector"] = VectorSimazonEnv(
+                self.mongo_uri, num_envs, db=self.db, collection=self.collection, client=self.client, graph=self.graph
+            )
+        return env
+
+    def close(self) -> None:
+        for env in self._envs.values():
+            env.close()
+        self._envs.clear()
+        self.client.close()
+
+    def __enter__(self) -> EnvPool:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
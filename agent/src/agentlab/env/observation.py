@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import sys
+from collections.abc import Collection, Iterator, Mapping
+from types import MappingProxyType
+from typing import Any
+
+# What SimazonEnv hands to policies each step. It wraps a SimazonState checkpoint
+# (which shares its containers with the live state, see SimazonEnv.snapshot), so
+# building one copies nothing; ASIN lists become tuples of interned strings only
+# when a policy actually reads them. Reads like the dict observations it replaces.
+
+KEYS = (
+    "view_id",
+    "search_query",
+    "applied_constraints",
+    "sort_key",
+    "result_asins",
+    "result_count",
+    "result_total",
+    "page",
+    "has_next_page",
+    "facet_counts",
+    "selected_asin",
+    "related_asins",
+    "related_edge",
+    "cart_asins",
+)
+_INTERNED = frozenset(("result_asins", "related_asins", "cart_asins"))
+_VIEW_SLOTS = ("_result_asins", "_related_asins", "_cart_asins")
+_set = object.__setattr__
+
+
+def _interned(asins: Any) -> tuple[str, ...]:
+    return tuple(sys.intern(a) if type(a) is str else a for a in asins)
+
+
+class Observation(Mapping):
+    """Immutable, dict-compatible view of one state; `to_dict()` gives the JSON form."""
+
+    __slots__ = ("_state", "_extra", *_VIEW_SLOTS)
+
+    def __init__(self, state: Any, extra: Mapping[str, Any] | None = None) -> None:
+        # The view slots stay unset until first read.
+        _set(self, "_state", state)
+        _set(self, "_extra", extra)
+
+    def __getitem__(self, key: str) -> Any:
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        s = self._state
+        if key in _INTERNED:
+            slot = f"_{key}"
+            value = getattr(self, slot, None)
+            if value is None:
+                raw = [r["asin"] for r in s.results] if key == "result_asins" else getattr(s, key)
+                value = _interned(raw)
+                _set(self, slot, value)
+            return value
+        if key == "applied_constraints":
+            return MappingProxyType(s.constraints)
+        if key == "result_count":
+            return len(s.results)
+        if key == "has_next_page":
+            return s.next_cursor is not None
+        if key in KEYS:
+            return getattr(s, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from KEYS
+        if self._extra is not None:
+            yield from (k for k in self._extra if k not in KEYS)
+
+    def __len__(self) -> int:
+        return len(KEYS) + (sum(1 for k in self._extra if k not in KEYS) if self._extra is not None else 0)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Observation is immutable")
+
+    def __repr__(self) -> str:
+        return f"Observation({self.to_dict()!r})"
+
+    def with_extra(self, **extra: Any) -> Observation:
+        """Same state plus extra keys (e.g. the runner's `_history`); shares the materialized views."""
+        out = Observation(self._state, {**(self._extra or {}), **extra})
+        for slot in _VIEW_SLOTS:
+            value = getattr(self, slot, None)
+            if value is not None:
+                _set(out, slot, value)
+        return out
+
+    def to_dict(self, exclude: Collection[str] = ()) -> dict[str, Any]:
+        out = {}
+        for key, value in self.items():
+            if key in exclude:
+                continue
+            if key == "applied_constraints":
+                value = dict(value)
+            elif key in _INTERNED:
+                value = list(value)
+            out[key] = value
+        return out
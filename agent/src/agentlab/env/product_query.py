@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import os
+from typing import Any
+
+from agentlab.env.search_cache import SearchCache
+
+# Product detail assembly shared by SimazonEnv and /ui/product: the product, its
+# resolved related items for one edge and the brand/category fallback
+# neighbourhood all come back from a single aggregation.
+
+PRODUCT_PROJECTION = {
+    "_id": 0,
+    "asin": 1,
+    "title": 1,
+    "brand": 1,
+    "price": 1,
+    "rating_avg": 1,
+    "rating_count": 1,
+    "category_leaf": 1,
+    "related": 1,
+}
+FALLBACK_LIMIT = 10
+
+
+def edge_asins(product: dict[str, Any] | None, edge: str) -> list[str]:
+    if not product:
+        return []
+    related = product.get("related") if isinstance(product.get("related"), dict) else {}
+    edge_values = related.get(edge)
+    if isinstance(edge_values, str):
+        return [edge_values]
+    if isinstance(edge_values, list):
+        return [str(x) for x in edge_values if str(x).strip()]
+    return []
+
+
+def _neighbour_lookup(collection: str, field: str, alias: str, when: dict[str, Any]) -> dict[str, Any]:
+    # `$$v` is null unless `when` holds, and the sub-pipeline matches nothing
+    # unless it is a non-empty string, so unused fallbacks cost no scan.
+    return {
+        "$lookup": {
+            "from": collection,
+            "let": {"v": {"$cond": [when, f"${field}", None]}, "a": "$asin"},
+            "pipeline": [
+                {
+                    "$match": {
+                        "$expr": {
+                            "$and": [
+                                {"$eq": [{"$type": "$$v"}, "string"]},
+                                {"$ne": ["$$v", ""]},
+                                {"$eq": [f"${field}", "$$v"]},
+                                {"$ne": ["$asin", "$$a"]},
+                            ]
+                        }
+                    }
+                },
+                {"$sort": {"asin": 1}},
+                {"$limit": FALLBACK_LIMIT},
+                {"$project": {"_id": 0, "asin": 1}},
+            ],
+            "as": alias,
+        }
+    }
+
+
+# True when the edge has no usable ASIN (same test as `edge_asins`): blank strings don't count.
+_NO_EDGE = {
+    "$eq": [
+        {
+            "$size": {
+                "$filter": {
+                    "input": "$_edge",
+                    "cond": {"$or": [{"$ne": [{"$type": "$$this"}, "string"]}, {"$ne": [{"$trim": {"input": "$$this"}}, ""]}]},
+                }
+            }
+        },
+        0,
+    ]
+}
+
+
+def product_view_pipeline(
+    collection: str,
+    asin: str | list[str],
+    edge: str,
+    include_fallback: bool = True,
+) -> list[dict[str, Any]]:
+    """Detail view for one product, or for every product in a list (one row each, in no particular order)."""
+    raw = {"$getField": {"field": {"$literal": edge}, "input": {"$ifNull": ["$related", {}]}}}
+    match = [{"$match": {"asin": {"$in": asin}}}] if isinstance(asin, list) else [{"$match": {"asin": asin}}, {"$limit": 1}]
+    stages: list[dict[str, Any]] = [
+        *match,
+        {"$project": PRODUCT_PROJECTION},
+        {
+            "$addFields": {
+                "_edge": {
+                    "$switch": {
+                        "branches": [
+                            {"case": {"$isArray": raw}, "then": raw},
+                            {"case": {"$eq": [{"$type": raw}, "string"]}, "then": [raw]},
+                        ],
+                        "default": [],
+                    }
+                }
+            }
+        },
+        {
+            "$lookup": {
+                "from": collection,
+                "localField": "_edge",
+                "foreignField": "asin",
+                "pipeline": [{"$project": {"_id": 0, "asin": 1, "title": 1}}],
+                "as": "_related_docs",
+            }
+        },
+    ]
+    if include_fallback:
+        # Only products without edge items need neighbours, and category only when brand found none.
+        stages.append(_neighbour_lookup(collection, "brand", "_brand_nbrs", _NO_EDGE))
+        no_brand = {"$and": [_NO_EDGE, {"$eq": [{"$size": "$_brand_nbrs"}, 0]}]}
+        stages.append(_neighbour_lookup(collection, "category_leaf", "_category_nbrs", no_brand))
+    return stages
+
+
+def parse_product_view(rows: list[dict[str, Any]], edge: str) -> dict[str, Any] | None:
+    """Resolve related items in edge order, falling back to brand then category neighbours."""
+    if not rows:
+        return None
+    row = rows[0]
+    found = {d["asin"]: d for d in row.pop("_related_docs", []) if d.get("asin")}
+    brand_nbrs = [d["asin"] for d in row.pop("_brand_nbrs", [])]
+    category_nbrs = [d["asin"] for d in row.pop("_category_nbrs", [])]
+    row.pop("_edge", None)
+
+    asins = edge_asins(row, edge)
+    related = [found[a] for a in asins if a in found]
+    if asins:
+        neighbours = [d["asin"] for d in related]
+    elif row.get("brand") and brand_nbrs:
+        neighbours = brand_nbrs
+    elif row.get("category_leaf") and category_nbrs:
+        neighbours = category_nbrs
+    else:
+        neighbours = []
+    return {"product": row, "edge": edge, "related": related, "neighbours": neighbours}
+
+
+product_cache = SearchCache(
+    max_entries=int(os.getenv("SIMAZON_PRODUCT_CACHE_SIZE", "8192")),
+    ttl_s=float(os.getenv("SIMAZON_PRODUCT_CACHE_TTL_S", "3600")),
+)
+
+
+def product_cache_key(namespace: str, epoch: int | None, asin: str, edge: str, include_fallback: bool) -> tuple:
+    return (namespace, epoch, "product", asin, edge, include_fallback)
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+
+from agentlab.env.product_query import FALLBACK_LIMIT, edge_asins
+from agentlab.env.search_query import CATALOG_META_COLLECTION
+
+# Related-item navigation as a static CSR graph over ASIN ids, built once after
+# ingest and memory-mapped by SimazonEnv and the task resolver. Edges are
+# pre-validated (targets that are not in the catalog are dropped, edge order is
+# kept) and every node carries its brand-then-category fallback neighbourhood,
+# so neighbours() gives the same answer as product_query's product view.
+
+FORMAT_VERSION = 1
+_FALLBACK_KINDS = ("none", "brand_fallback", "category_fallback")
+
+
+def _csr(rows: list[list[int]]) -> tuple[np.ndarray, np.ndarray]:
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(r) for r in rows])
+    indices = np.fromiter((v for r in rows for v in r), dtype=np.int32, count=int(indptr[-1]))
+    return indptr, indices
+
+
+def _gather(indptr: np.ndarray, indices: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """Concatenated adjacency lists of `nodes`, without a Python loop."""
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=indices.dtype)
+    offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(total)
+    return indices[offsets]
+
+
+class RelatedGraph:
+    """Node ids are positions in the sorted ASIN array.
+
+    Per edge name: `indptr`/`indices` hold validated targets, and `declared`
+    marks nodes whose `related[edge]` was non-empty before validation (those
+    never fall back, matching the product view). `fallback_*` holds up to
+    FALLBACK_LIMIT same-brand (else same-category) neighbours by ASIN.
+    """
+
+    def __init__(
+        self,
+        asins: np.ndarray,
+        edges: dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]],
+        fallback: tuple[np.ndarray, np.ndarray, np.ndarray],
+        meta: dict[str, Any] | None = None,
+    ) -> None:
+        self.asins = asins
+        self.edges = edges
+        self.fallback_indptr, self.fallback_indices, self.fallback_kind = fallback
+        self.meta = meta or {}
+
+    def __len__(self) -> int:
+        return len(self.asins)
+
+    def __contains__(self, asin: str) -> bool:
+        return self.node(asin) is not None
+
+    def node(self, asin: str) -> int | None:
+        i = int(np.searchsorted(self.asins, asin))
+        return i if i < len(self.asins) and self.asins[i] == asin else None
+
+    def _asins(self, nodes: np.ndarray) -> list[str]:
+        return [str(a) for a in self.asins[nodes]]
+
+    def edge_targets(self, asin: str, edge: str) -> list[str]:
+        """Validated `related[edge]` of `asin`, in edge order."""
+        i = self.node(asin)
+        if i is None or edge not in self.edges:
+            return []
+        indptr, indices, _ = self.edges[edge]
+        return self._asins(indices[indptr[i] : indptr[i + 1]])
+
+    def fallback(self, asin: str) -> tuple[list[str], str]:
+        """Brand (else category) neighbours of `asin` and which one was used."""
+        i = self.node(asin)
+        if i is None:
+            return [], "none"
+        nodes = self.fallback_indices[self.fallback_indptr[i] : self.fallback_indptr[i + 1]]
+        return self._asins(nodes), _FALLBACK_KINDS[int(self.fallback_kind[i])]
+
+    def neighbours(self, asin: str, edge: str) -> list[str] | None:
+        """What the product view offers under `edge`; None if `asin` is not in the catalog."""
+        i = self.node(asin)
+        if i is None:
+            return None
+        if edge in self.edges and self.edges[edge][2][i]:
+            return self.edge_targets(asin, edge)
+        return self.fallback(asin)[0]
+
+    def _step(self, edge: str, frontier: np.ndarray) -> np.ndarray:
+        if edge not in self.edges:
+            return _gather(self.fallback_indptr, self.fallback_indices, frontier)
+        indptr, indices, declared = self.edges[edge]
+        use_edge = declared[frontier].astype(bool)
+        return np.concatenate(
+            [
+                _gather(indptr, indices, frontier[use_edge]),
+                _gather(self.fallback_indptr, self.fallback_indices, frontier[~use_edge]),
+            ]
+        )
+
+    def k_hop(self, asin: str, edge: str, k: int) -> dict[str, int]:
+        """Every product reachable from `asin` in at most `k` OpenRelated clicks, with its hop count."""
+        start = self.node(asin)
+        if start is None:
+            return {}
+        hops = np.full(len(self.asins), -1, dtype=np.int32)
+        hops[start] = 0
+        frontier = np.array([start], dtype=np.int64)
+        for depth in range(1, k + 1):
+            reached = np.unique(self._step(edge, frontier))
+            frontier = reached[hops[reached] < 0].astype(np.int64)
+            if not len(frontier):
+                break
+            hops[frontier] = depth
+        found = np.flatnonzero(hops >= 0)
+        return dict(zip(self._asins(found), hops[found].tolist()))
+
+    def hops_between(self, source: str, target: str, edge: str, k: int) -> int | None:
+        return self.k_hop(source, edge, k).get(target)
+
+    # -- persistence ---------------------------------------------------------------
+
+    def save(self, path: str | Path) -> None:
+        out = Path(path)
+        out.mkdir(parents=True, exist_ok=True)
+        np.save(out / "asins.npy", self.asins)
+        np.save(out / "fallback.indptr.npy", self.fallback_indptr)
+        np.save(out / "fallback.indices.npy", self.fallback_indices)
+        np.save(out / "fallback.kind.npy", self.fallback_kind)
+        names = sorted(self.edges)
+        for i, name in enumerate(names):
+            for part, array in zip(("indptr", "indices", "declared"), self.edges[name]):
+                np.save(out / f"edge{i}.{part}.npy", array)
+        meta = {
+            **self.meta,
+            "version": FORMAT_VERSION,
+            "nodes": len(self.asins),
+            "edges": names,
+            "fallback_limit": FALLBACK_LIMIT,
+        }
+        # Written last: a directory without meta.json is an incomplete build.
+        (out / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str | Path, mmap: bool = True) -> RelatedGraph:
+        src = Path(path)
+        meta = json.loads((src / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"unsupported related graph format {meta.get('version')!r} in {src}")
+        mode = "r" if mmap else None
+
+        def arr(name: str) -> np.ndarray:
+            return np.load(src / f"{name}.npy", mmap_mode=mode)
+
+        edges = {
+            name: (arr(f"edge{i}.indptr"), arr(f"edge{i}.indices"), arr(f"edge{i}.declared"))
+            for i, name in enumerate(meta["edges"])
+        }
+        return cls(arr("asins"), edges, (arr("fallback.indptr"), arr("fallback.indices"), arr("fallback.kind")), meta)
+
+
+def build_related_graph(docs: Iterable[dict[str, Any]], meta: dict[str, Any] | None = None) -> RelatedGraph:
+    """Build from product documents (asin, brand, category_leaf, related)."""
+    by_asin: dict[str, dict[str, Any]] = {}
+    for doc in docs:
+        asin = doc.get("asin")
+        if isinstance(asin, str) and asin:
+            by_asin[asin] = doc
+    asins = sorted(by_asin)
+    ids = {a: i for i, a in enumerate(asins)}
+    docs_by_id = [by_asin[a] for a in asins]
+
+    edge_names = sorted(
+        {e for d in docs_by_id if isinstance(d.get("related"), dict) for e in d["related"] if isinstance(e, str)}
+    )
+    edges = {}
+    for edge in edge_names:
+        rows: list[list[int]] = []
+        declared = np.zeros(len(asins), dtype=np.uint8)
+        for i, doc in enumerate(docs_by_id):
+            raw = edge_asins(doc, edge)
+            declared[i] = bool(raw)
+            rows.append([ids[a] for a in raw if a in ids])
+        edges[edge] = (*_csr(rows), declared)
+
+    # Node ids are already in ASIN order, so each group's member list is sorted.
+    groups: dict[str, dict[Any, list[int]]] = {"brand": {}, "category_leaf": {}}
+    for i, doc in enumerate(docs_by_id):
+        for field, members in groups.items():
+            value = doc.get(field)
+            if value and isinstance(value, str):
+                members.setdefault(value, []).append(i)
+    fallback_rows: list[list[int]] = []
+    kinds = np.zeros(len(asins), dtype=np.uint8)
+    for i, doc in enumerate(docs_by_id):
+        row: list[int] = []
+        for kind, field in enumerate(("brand", "category_leaf"), start=1):
+            value = doc.get(field)
+            if not (value and isinstance(value, str)):
+                continue
+            row = [j for j in groups[field][value][: FALLBACK_LIMIT + 1] if j != i][:FALLBACK_LIMIT]
+            if row:
+                kinds[i] = kind
+                break
+        fallback_rows.append(row)
+
+    stamp = {"generated_at": datetime.now(timezone.utc).isoformat(), **(meta or {})}
+    width = max((len(a) for a in asins), default=1)
+    return RelatedGraph(np.array(asins, dtype=f"<U{width}"), edges, (*_csr(fallback_rows), kinds), stamp)
+
+
+def build_from_collection(col) -> RelatedGraph:
+    meta = col.database[CATALOG_META_COLLECTION].find_one({"_id": col.name}) or {}
+    docs = col.find({}, {"_id": 0, "asin": 1, "brand": 1, "category_leaf": 1, "related": 1})
+    return build_related_graph(docs, meta={"collection": col.name, "catalog_epoch": int(meta.get("epoch", 0))})
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from agentlab.env.search_query import query_tokens
+
+
+def _freeze_constraints(constraints: dict[str, Any]) -> tuple[tuple[str, str], ...]:
+    return tuple(
+        sorted((str(k), json.dumps(v, sort_keys=True, default=str)) for k, v in constraints.items() if v not in (None, ""))
+    )
+
+
+def search_cache_key(
+    namespace: str,
+    epoch: int | None,
+    kind: str,
+    query: str,
+    constraints: dict[str, Any],
+    sort_key: str,
+    limit: int,
+    *extra: Hashable,
+) -> tuple:
+    """Key on what the query engine actually sees, so "USB  cable" and "usb cable" share an entry."""
+    return (namespace, epoch, kind, tuple(query_tokens(query)), _freeze_constraints(constraints), sort_key, limit, *extra)
+
+
+class SearchCache:
+    """Bounded LRU + TTL cache for search results, shared by every caller in the process.
+
+    Keys embed the catalog epoch, so a re-ingest makes old entries unreachable;
+    `note_epoch` also drops them eagerly. Cached values are shared and must be
+    treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl_s: float = 600.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._epochs: dict[str, int | None] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> Any | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] > self.ttl_s:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def note_epoch(self, namespace: str, epoch: int | None) -> None:
+        with self._lock:
+            if self._epochs.get(namespace, epoch) == epoch:
+                self._epochs[namespace] = epoch
+                return
+            self._epochs[namespace] = epoch
+            stale = [k for k in self._entries if k[0] == namespace and k[1] != epoch]
+            for k in stale:
+                del self._entries[k]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+search_cache = SearchCache(
+    max_entries=int(os.getenv("SIMAZON_SEARCH_CACHE_SIZE", "4096")),
+    ttl_s=float(os.getenv("SIMAZON_SEARCH_CACHE_TTL_S", "600")),
+)
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import base64
+import json
+import math
+import re
+from typing import Any
+
+# Shared by SimazonEnv and the storefront (/ui/search) so both tiers see identical
+# filtering, ordering and facet counts for the same query.
+
+SEARCH_PROJECTION = {
+    "_id": 0,
+    "asin": 1,
+    "title": 1,
+    "brand": 1,
+    "price": 1,
+    "rating_avg": 1,
+    "rating_count": 1,
+    "category_leaf": 1,
+}
+
+FACET_FIELDS = ("brand", "category_leaf")
+PRICE_BUCKET_BOUNDARIES = [0, 10, 25, 50, 100, 250, 500, 1000, 5000]
+
+# Ingest stores tokenize(title + brand + category_leaf) as `search_tokens`, backed
+# by a multikey index. ingest.snap_amazon.normalize keeps a copy of this tokenizer.
+SEARCH_TOKENS_FIELD = "search_tokens"
+CATALOG_META_COLLECTION = "catalog_meta"
+SCORE_FIELD = "_score"
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def search_terms_collection(collection: str) -> str:
+    return f"{collection}_search_terms"
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def query_tokens(query: str) -> list[str]:
+    return list(dict.fromkeys(tokenize(query)))
+
+
+def query_filter(query: str, constraints: dict[str, Any]) -> dict[str, Any]:
+    parts: list[dict[str, Any]] = []
+    tokens = query_tokens(query)
+    if tokens:
+        parts.append({SEARCH_TOKENS_FIELD: {"$all": tokens}})
+
+    brand = constraints.get("brand")
+    if brand:
+        parts.append({"brand": brand})
+    category_leaf = constraints.get("category_leaf")
+    if category_leaf:
+        parts.append({"category_leaf": category_leaf})
+    price_lte = constraints.get("price_lte")
+    if isinstance(price_lte, (int, float)):
+        parts.append({"price": {"$type": "number", "$lte": float(price_lte)}})
+    rating_gte = constraints.get("rating_gte")
+    if isinstance(rating_gte, (int, float)):
+        parts.append({"rating_avg": {"$type": "number", "$gte": float(rating_gte)}})
+    rating_count_gte = constraints.get("rating_count_gte")
+    if isinstance(rating_count_gte, int):
+        parts.append({"rating_count": {"$type": "number", "$gte": rating_count_gte}})
+
+    price_bucket = constraints.get("price_bucket")
+    if price_bucket == "under_25":
+        parts.append({"price": {"$type": "number", "$lt": 25}})
+
+    return {"$and": parts} if parts else {}
+
+
+def sort_spec(sort_key: str, scored: bool = False) -> list[tuple[str, int]]:
+    if sort_key == "relevance" and scored:
+        return [(SCORE_FIELD, -1), ("rating_count", -1), ("asin", 1)]
+    if sort_key == "price_asc":
+        return [("price", 1), ("asin", 1)]
+    if sort_key == "price_desc":
+        return [("price", -1), ("asin", 1)]
+    if sort_key == "rating_desc":
+        return [("rating_avg", -1), ("rating_count", -1), ("asin", 1)]
+    return [("rating_count", -1), ("asin", 1)]
+
+
+def bm25_idf(df: int, doc_count: int) -> float:
+    return math.log(1.0 + (doc_count - df + 0.5) / (df + 0.5))
+
+
+def bm25_score_expr(tokens: list[str], term_stats: dict[str, Any]) -> dict[str, Any] | None:
+    """Okapi BM25 over `search_tokens` as an aggregation expression.
+
+    `term_stats` is {"doc_count": N, "avg_len": avgdl, "df": {token: df}} as
+    written by `ingest.reindex`.
+    """
+    if not tokens:
+        return None
+    doc_count = int(term_stats.get("doc_count", 0))
+    avg_len = max(float(term_stats.get("avg_len", 0.0)), 1.0)
+    df = term_stats.get("df", {})
+    doc_len = {"$size": {"$ifNull": [f"${SEARCH_TOKENS_FIELD}", []]}}
+    norm = {"$multiply": [BM25_K1, {"$add": [1 - BM25_B, {"$multiply": [BM25_B, {"$divide": [doc_len, avg_len]}]}]}]}
+    terms = []
+    for token in tokens:
+        tf = {
+            "$size": {
+                "$filter": {"input": {"$ifNull": [f"${SEARCH_TOKENS_FIELD}", []]}, "cond": {"$eq": ["$$this", token]}}
+            }
+        }
+        idf = bm25_idf(int(df.get(token, 0)), doc_count)
+        terms.append({"$multiply": [idf, {"$divide": [{"$multiply": [tf, BM25_K1 + 1]}, {"$add": [tf, norm]}]}]})
+    return {"$add": terms}
+
+
+def price_bucket_label(lower: Any) -> str:
+    if isinstance(lower, (int, float)):
+        idx = PRICE_BUCKET_BOUNDARIES.index(lower)
+        return f"[{int(lower)}, {int(PRICE_BUCKET_BOUNDARIES[idx + 1])})"
+    return str(lower)
+
+
+def facet_branches(top_k: int) -> dict[str, list[dict[str, Any]]]:
+    branches: dict[str, list[dict[str, Any]]] = {
+        field: [
+            {"$match": {field: {"$type": "string", "$ne": ""}}},
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": top_k},
+        ]
+        for field in FACET_FIELDS
+    }
+    branches["price_bucket"] = [
+        {"$match": {"price": {"$type": "number", "$gte": 0}}},
+        {
+            "$bucket": {
+                "groupBy": "$price",
+                "boundaries": PRICE_BUCKET_BOUNDARIES,
+                "default": f"{PRICE_BUCKET_BOUNDARIES[-1]}+",
+                "output": {"count": {"$sum": 1}},
+            }
+        },
+    ]
+    return branches
+
+
+def is_scored(sort_key: str, score_expr: dict[str, Any] | None) -> bool:
+    return sort_key == "relevance" and score_expr is not None
+
+
+def query_is_scored(query: str, sort_key: str) -> bool:
+    """`is_scored` without building the expression: relevance with at least one query token."""
+    return sort_key == "relevance" and bool(query_tokens(query))
+
+
+def encode_cursor(doc: dict[str, Any], sort_key: str, scored: bool) -> str:
+    """Opaque keyset cursor: the active sort tuple of the last row on a page."""
+    values = [doc.get(f) for f, _ in sort_spec(sort_key, scored=scored)]
+    raw = json.dumps({"s": sort_key, "r": scored, "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str | None, sort_key: str, scored: bool) -> list[Any] | None:
+    """Sort values from `token`, or None if it is missing, malformed or from another ordering."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(data, dict) or data.get("s") != sort_key or data.get("r") != scored:
+        return None
+    values = data.get("v")
+    if not isinstance(values, list) or len(values) != len(sort_spec(sort_key, scored=scored)):
+        return None
+    return values
+
+
+def _after(field: str, direction: int, value: Any) -> dict[str, Any] | None:
+    # Mongo sorts null/missing below every number, and range operators never match null.
+    if direction == 1:
+        return {field: {"$ne": None}} if value is None else {field: {"$gt": value}}
+    if value is None:
+        return None
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+
+def keyset_filter(sort_key: str, values: list[Any], scored: bool) -> dict[str, Any]:
+    """Rows strictly after `values` in the (field..., asin) ordering for `sort_key`."""
+    spec = sort_spec(sort_key, scored=scored)
+    branches: list[dict[str, Any]] = []
+    for i, (field, direction) in enumerate(spec):
+        cond = _after(field, direction, values[i])
+        if cond is None:
+            continue
+        equal = {f: values[j] for j, (f, _) in enumerate(spec[:i])}
+        branches.append({"$and": [equal, cond]} if equal else cond)
+    return {"$or": branches} if branches else {"asin": {"$in": []}}
+
+
+def split_page(docs: list[dict[str, Any]], page_size: int, sort_key: str, scored: bool) -> tuple[list[dict[str, Any]], str | None]:
+    """Trim a `page_size + 1` fetch to one page and return the cursor for the next one."""
+    if len(docs) <= page_size:
+        return docs, None
+    page = docs[:page_size]
+    return page, encode_cursor(page[-1], sort_key, scored)
+
+
+def _page_stages(
+    sort_key: str,
+    limit: int,
+    score_expr: dict[str, Any] | None,
+    after: list[Any] | None = None,
+    presorted: bool = False,
+) -> list[dict[str, Any]]:
+    stages: list[dict[str, Any]] = []
+    scored = is_scored(sort_key, score_expr)
+    if scored:
+        stages.append({"$addFields": {SCORE_FIELD: score_expr}})
+    if after is not None:
+        stages.append({"$match": keyset_filter(sort_key, after, scored)})
+    if not presorted:
+        stages.append({"$sort": dict(sort_spec(sort_key, scored=scored))})
+    stages.append({"$limit": limit})
+    stages.append({"$project": {**SEARCH_PROJECTION, SCORE_FIELD: 1} if scored else SEARCH_PROJECTION})
+    return stages
+
+
+def search_pipeline(
+    filt: dict[str, Any],
+    sort_key: str,
+    limit: int,
+    score_expr: dict[str, Any] | None = None,
+    after: list[Any] | None = None,
+) -> list[dict[str, Any]]:
+    return [{"$match": filt}, *_page_stages(sort_key, limit, score_expr, after)]
+
+
+def faceted_search_pipeline(
+    filt: dict[str, Any],
+    sort_key: str,
+    limit: int,
+    facet_top_k: int = 12,
+    include_facets: bool = True,
+    include_total: bool = True,
+    score_expr: dict[str, Any] | None = None,
+    after: list[Any] | None = None,
+) -> list[dict[str, Any]]:
+    """One round trip: result page, total hit count and facet counts for `filt`.
+
+    `after` (decoded cursor values) only narrows the result page; the total and
+    facet counts always describe the whole match set. `$facet` branches cannot
+    use indexes, so unscored orderings are sorted before it (index-backed) and
+    the results branch only limits; a BM25 ordering needs the score first.
+    Callers that need neither total nor facets should use `search_pipeline`.
+    """
+    presorted = not is_scored(sort_key, score_expr)
+    branches: dict[str, list[dict[str, Any]]] = {
+        "results": _page_stages(sort_key, limit, score_expr, after, presorted=presorted)
+    }
+    if include_total:
+        branches["total"] = [{"$count": "n"}]
+    if include_facets:
+        branches.update(facet_branches(facet_top_k))
+    head: list[dict[str, Any]] = [{"$match": filt}]
+    if presorted:
+        head.append({"$sort": dict(sort_spec(sort_key))})
+    return [*head, {"$facet": branches}]
+
+
+def parse_faceted_result(rows: list[dict[str, Any]]) -> dict[str, Any]:
+    row = rows[0] if rows else {}
+    total_rows = row.get("total")
+    facets: dict[str, list[dict[str, Any]]] = {}
+    for field in FACET_FIELDS:
+        if field in row:
+            facets[field] = [{"value": r["_id"], "count": r["count"]} for r in row[field]]
+    if "price_bucket" in row:
+        facets["price_bucket"] = [{"value": price_bucket_label(r["_id"]), "count": r["count"]} for r in row["price_bucket"]]
+    results = row.get("results", [])
+    return {
+        "results": results,
+        "total": int(total_rows[0]["n"]) if total_rows else (0 if total_rows is not None else None),
+        "facets": facets,
+    }
+
+
+BATCH_TAG = "_batch"
+
+
+def union_pipeline(collection: str, pipelines: list[list[dict[str, Any]]]) -> list[dict[str, Any]]:
+    """Run several pipelines over `collection` in one round trip; each output row carries `_batch` = its pipeline's index.
+
+    Every branch keeps its own leading `$match`, so each one can still use indexes.
+    """
+    tagged = [[*p, {"$addFields": {BATCH_TAG: i}}] for i, p in enumerate(pipelines)]
+    if not tagged:
+        return []
+    first, *rest = tagged
+    return [*first, *({"$unionWith": {"coll": collection, "pipeline": p}} for p in rest)]
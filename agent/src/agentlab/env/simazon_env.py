@@ -1,94 +1,112 @@
 from __future__ import annotations
 
-import re
 from dataclasses import dataclass, field
 from typing import Any
 
-from pymongo import ASCENDING, DESCENDING, MongoClient
+from pymongo import MongoClient
+
+from agentlab.env.observation import Observation
+from agentlab.env.product_query import parse_product_view, product_cache, product_cache_key, product_view_pipeline
+from agentlab.env.related_graph import RelatedGraph
+from agentlab.env.search_cache import search_cache, search_cache_key
+from agentlab.env.search_query import (
+    CATALOG_META_COLLECTION,
+    bm25_score_expr,
+    decode_cursor,
+    faceted_search_pipeline,
+    is_scored,
+    parse_faceted_result,
+    query_filter,
+    query_is_scored,
+    query_tokens,
+    search_pipeline,
+    search_terms_collection,
+    split_page,
+)
 
 
 @dataclass
 class SimazonState:
+    # step() replaces containers instead of mutating them, so a shallow copy is a
+    # full checkpoint: snapshots share every list and dict with the live state.
     view_id: str = "HOME"
     search_query: str = ""
     constraints: dict[str, Any] = field(default_factory=dict)
     sort_key: str = "relevance"
     results: list[dict[str, Any]] = field(default_factory=list)
+    result_total: int = 0
+    facet_counts: dict[str, list[dict[str, Any]]] = field(default_factory=dict)
+    page: int = 1
+    next_cursor: str | None = None
     selected_asin: str | None = None
     related_edge: str = "also_bought"
     related_asins: list[str] = field(default_factory=list)
     cart_asins: list[str] = field(default_factory=list)
 
+    def copy(self) -> SimazonState:
+        # Much cheaper than copy.copy(), which goes through __reduce_ex__.
+        clone = object.__new__(SimazonState)
+        clone.__dict__.update(self.__dict__)
+        return clone
+
 
 class SimazonEnv:
-    def __init__(self, mongo_uri: str, db: str = "simazon", collection: str = "products") -> None:
-        self.client = MongoClient(mongo_uri)
-        self.col = self.client[db][collection]
+    def __init__(
+        self,
+        mongo_uri: str,
+        db: str = "simazon",
+        collection: str = "products",
+        page_size: int = 50,
+        client: MongoClient | None = None,
+        graph: RelatedGraph | None = None,
+    ) -> None:
+        # A caller-supplied client is shared (e.g. by EnvPool) and outlives this env.
+        self._owns_client = client is None
+        self.client = client if client is not None else MongoClient(mongo_uri)
+        # With a related-graph index, product navigation needs no database call.
+        self.graph = graph
+        self.db = self.client[db]
+        self.col = self.db[collection]
+        self.page_size = page_size
         self.state = SimazonState()
+        self._meta: dict[str, Any] | None = None
+        self._epoch: int | None = None
+        self._term_df: dict[str, int] = {}
+        self._cache_ns = f"{db}.{collection}"
 
     def close(self) -> None:
-        self.client.close()
-
-    def _load_product(self, asin: str) -> dict[str, Any] | None:
-        return self.col.find_one(
-            {"asin": asin},
-            {
-                "_id": 0,
-                "asin": 1,
-                "title": 1,
-                "brand": 1,
-                "price": 1,
-                "rating_avg": 1,
-                "rating_count": 1,
-                "category_leaf": 1,
-                "related": 1,
-            },
-        )
+        if self._owns_client:
+            self.client.close()
 
-    def _related_asins_for(self, product: dict[str, Any] | None, edge: str) -> list[str]:
-        if not product:
-            return []
-        related = product.get("related") if isinstance(product.get("related"), dict) else {}
-        edge_values = related.get(edge)
-        if isinstance(edge_values, str):
-            asins = [edge_values]
-        elif isinstance(edge_values, list):
-            asins = [str(x) for x in edge_values if str(x).strip()]
-        else:
-            asins = []
-        if asins:
-            existing = self.col.find({"asin": {"$in": asins}}, {"_id": 0, "asin": 1})
-            aset = {row["asin"] for row in existing}
-            return [a for a in asins if a in aset]
-
-        # Fallback neighborhood for categories where explicit related links are sparse.
-        brand = product.get("brand")
-        category = product.get("category_leaf")
-        asin = product.get("asin")
-        if brand:
-            docs = self.col.find({"asin": {"$ne": asin}, "brand": brand}, {"_id": 0, "asin": 1}).limit(10)
-            found = [d["asin"] for d in docs]
-            if found:
-                return found
-        if category:
-            docs = self.col.find({"asin": {"$ne": asin}, "category_leaf": category}, {"_id": 0, "asin": 1}).limit(10)
-            found = [d["asin"] for d in docs]
-            if found:
-                return found
-        return []
+    def _product_view(self, asin: str, edge: str) -> dict[str, Any] | None:
+        key = product_cache_key(self._cache_ns, self._catalog_meta().get("epoch", 0), asin, edge, True)
+        cached = product_cache.get(key)
+        if cached is not None:
+            return cached
+        view = parse_product_view(list(self.col.aggregate(product_view_pipeline(self.col.name, asin, edge))), edge)
+        if view is not None:
+            product_cache.put(key, view)
+        return view
+
+    def _neighbours(self, asin: str, edge: str) -> list[str] | None:
+        if self.graph is not None:
+            return self.graph.neighbours(asin, edge)
+        view = self._product_view(asin, edge)
+        return None if view is None else list(view["neighbours"])
 
     def _set_product_view(self, asin: str, edge: str | None = None) -> bool:
-        product = self._load_product(asin)
-        if not product:
+        neighbours = self._neighbours(asin, edge or self.state.related_edge)
+        if neighbours is None:
             return False
         if edge:
             self.state.related_edge = edge
         self.state.selected_asin = asin
-        self.state.related_asins = self._related_asins_for(product, self.state.related_edge)
+        self.state.related_asins = neighbours
         self.state.view_id = "PRODUCT_DETAIL"
         return True
 
     def reset(self, start_asin: str | None = None, related_edge: str | None = None) -> dict[str, Any]:
+        self._refresh_catalog_meta()
         self.state = SimazonState()
         if related_edge:
             self.state.related_edge = related_edge
@@ -96,59 +114,126 @@ class SimazonEnv:
             self._set_product_view(start_asin, related_edge)
         return self._observation()
 
+    def snapshot(self) -> SimazonState:
+        """Checkpoint of the current state; O(1) in the size of results, facets and cart."""
+        return self.state.copy()
+
+    def restore(self, checkpoint: SimazonState) -> dict[str, Any]:
+        """Return to `checkpoint` (which stays reusable) without replaying or re-querying anything."""
+        self.state = checkpoint.copy()
+        return self._observation()
+
     def _query_filter(self, query: str, constraints: dict[str, Any]) -> dict[str, Any]:
-        parts: list[dict[str, Any]] = []
-        tokens = [t for t in re.split(r"\s+", query.strip()) if t]
-        for token in tokens:
-            rx = {"$regex": re.escape(token), "$options": "i"}
-            parts.append({"$or": [{"title": rx}, {"brand": rx}, {"category_leaf": rx}]})
-
-        brand = constraints.get("brand")
-        if brand:
-            parts.append({"brand": brand})
-        category_leaf = constraints.get("category_leaf")
-        if category_leaf:
-            parts.append({"category_leaf": category_leaf})
-        price_lte = constraints.get("price_lte")
-        if isinstance(price_lte, (int, float)):
-            parts.append({"price": {"$type": "number", "$lte": float(price_lte)}})
-        rating_gte = constraints.get("rating_gte")
-        if isinstance(rating_gte, (int, float)):
-            parts.append({"rating_avg": {"$type": "number", "$gte": float(rating_gte)}})
-        rating_count_gte = constraints.get("rating_count_gte")
-        if isinstance(rating_count_gte, int):
-            parts.append({"rating_count": {"$type": "number", "$gte": rating_count_gte}})
-
-        price_bucket = constraints.get("price_bucket")
-        if price_bucket == "under_25":
-            parts.append({"price": {"$type": "number", "$lt": 25}})
-
-        return {"$and": parts} if parts else {}
-
-    def search(self, query: str, constraints: dict[str, Any], sort_key: str, limit: int = 50) -> list[dict[str, Any]]:
+        return query_filter(query, constraints)
+
+    def _refresh_catalog_meta(self) -> None:
+        # Re-read once per episode: a pooled env outlives re-ingests, which bump the epoch.
+        self._meta = None
+
+    def _find_meta(self) -> dict[str, Any]:
+        return self.db[CATALOG_META_COLLECTION].find_one({"_id": self.col.name}) or {}
+
+    def _catalog_meta(self) -> dict[str, Any]:
+        if self._meta is None:
+            self._adopt_meta(self._find_meta())
+        return self._meta
+
+    def _adopt_meta(self, meta: dict[str, Any]) -> None:
+        epoch = meta.get("epoch", 0)
+        if epoch != self._epoch:
+            # Document frequencies belong to one ingest.
+            self._term_df.clear()
+            self._epoch = epoch
+        search_cache.note_epoch(self._cache_ns, epoch)
+        self._meta = meta
+
+    def _term_stats(self, tokens: list[str]) -> dict[str, Any]:
+        meta = self._catalog_meta()
+        missing = [t for t in tokens if t not in self._term_df]
+        if missing:
+            for row in self.db[search_terms_collection(self.col.name)].find({"_id": {"$in": missing}}):
+                self._term_df[row["_id"]] = int(row.get("df", 0))
+            for t in missing:
+                self._term_df.setdefault(t, 0)
+        return {"doc_count": meta.get("search_doc_count", 0), "avg_len": meta.get("search_avg_len", 0.0), "df": self._term_df}
+
+    def _score_expr(self, query: str, sort_key: str) -> dict[str, Any] | None:
+        tokens = query_tokens(query)
+        if sort_key != "relevance" or not tokens:
+            return None
+        return bm25_score_expr(tokens, self._term_stats(tokens))
+
+    def _cache_key(self, kind: str, query: str, constraints: dict[str, Any], sort_key: str, limit: int, *extra: Any) -> tuple:
+        epoch = self._catalog_meta().get("epoch", 0)
+        return search_cache_key(self._cache_ns, epoch, kind, query, constraints, sort_key, limit, *extra)
+
+    def search(
+        self,
+        query: str,
+        constraints: dict[str, Any],
+        sort_key: str,
+        limit: int = 50,
+        after: str | None = None,
+    ) -> list[dict[str, Any]]:
+        key = self._cache_key("search", query, constraints, sort_key, limit, after)
+        cached = search_cache.get(key)
+        if cached is not None:
+            return cached
         filt = self._query_filter(query, constraints)
-        cursor = self.col.find(
-            filt,
-            {
-                "_id": 0,
-                "asin": 1,
-                "title": 1,
-                "brand": 1,
-                "price": 1,
-                "rating_avg": 1,
-                "rating_count": 1,
-                "category_leaf": 1,
-            },
+        score_expr = self._score_expr(query, sort_key)
+        after_values = decode_cursor(after, sort_key, is_scored(sort_key, score_expr))
+        pipeline = search_pipeline(filt, sort_key, limit, score_expr=score_expr, after=after_values)
+        docs = list(self.col.aggregate(pipeline))
+        search_cache.put(key, docs)
+        return docs
+
+    def faceted_search(
+        self,
+        query: str,
+        constraints: dict[str, Any],
+        sort_key: str,
+        limit: int = 50,
+        facet_top_k: int = 12,
+        after: str | None = None,
+    ) -> dict[str, Any]:
+        """One page of results plus totals/facets; `next_cursor` continues after the page."""
+        key = self._cache_key("faceted", query, constraints, sort_key, limit, facet_top_k, after)
+        cached = search_cache.get(key)
+        if cached is not None:
+            return cached
+        score_expr = self._score_expr(query, sort_key)
+        scored = is_scored(sort_key, score_expr)
+        pipeline = faceted_search_pipeline(
+            self._query_filter(query, constraints),
+            sort_key,
+            limit + 1,
+            facet_top_k,
+            score_expr=score_expr,
+            after=decode_cursor(after, sort_key, scored),
         )
-        if sort_key == "price_asc":
-            cursor = cursor.sort([("price", ASCENDING), ("asin", ASCENDING)])
-        elif sort_key == "price_desc":
-            cursor = cursor.sort([("price", DESCENDING), ("asin", ASCENDING)])
-        elif sort_key == "rating_desc":
-            cursor = cursor.sort([("rating_avg", DESCENDING), ("rating_count", DESCENDING), ("asin", ASCENDING)])
+        page = parse_faceted_result(list(self.col.aggregate(pipeline)))
+        page["results"], page["next_cursor"] = split_page(page["results"], limit, sort_key, scored)
+        search_cache.put(key, page)
+        return page
+
+    def _refresh_results(self, after: str | None = None) -> None:
+        state = self.state
+        scored = query_is_scored(state.search_query, state.sort_key)
+        if after and decode_cursor(after, state.sort_key, scored) is not None:
+            # Later pages are a plain keyset query; total and facets describe the
+            # whole match set, so they carry over from page 1.
+            docs = self.search(state.search_query, state.constraints, state.sort_key, limit=self.page_size + 1, after=after)
+            state.results, state.next_cursor = split_page(docs, self.page_size, state.sort_key, scored)
+            state.page += 1
         else:
-            cursor = cursor.sort([("rating_count", DESCENDING), ("asin", ASCENDING)])
-        return list(cursor.limit(limit))
+            # No cursor, or one that no longer matches the ordering: start again from page 1.
+            page = self.faceted_search(state.search_query, state.constraints, state.sort_key, limit=self.page_size)
+            state.results = page["results"]
+            state.result_total = page["total"] or 0
+            state.facet_counts = page["facets"]
+            state.next_cursor = page["next_cursor"]
+            state.page = 1
+        state.view_id = "SEARCH_RESULTS" if state.results else "EMPTY_RESULTS"
 
     def step(self, action: dict[str, Any]) -> tuple[dict[str, Any], dict[str, Any]]:
         kind = action.get("type", "NoOp")
@@ -157,24 +242,27 @@ class SimazonEnv:
 
         if kind == "Search":
             self.state.search_query = str(args.get("query", "")).strip()
-            self.state.results = self.search(self.state.search_query, self.state.constraints, self.state.sort_key)
-            self.state.view_id = "SEARCH_RESULTS" if self.state.results else "EMPTY_RESULTS"
+            self._refresh_results()
             info["event"] = "Searched"
         elif kind == "ApplyFacet":
             facet = str(args.get("facet", ""))
             value = args.get("value")
             if facet and value is not None:
-                self.state.constraints[facet] = value
-                self.state.results = self.search(self.state.search_query, self.state.constraints, self.state.sort_key)
-                self.state.view_id = "SEARCH_RESULTS" if self.state.results else "EMPTY_RESULTS"
+                self.state.constraints = {**self.state.constraints, facet: value}
+                self._refresh_results()
                 info["event"] = "FacetApplied"
             else:
                 info["postcondition_ok"] = False
         elif kind == "SortBy":
             self.state.sort_key = str(args.get("key", "relevance"))
-            self.state.results = self.search(self.state.search_query, self.state.constraints, self.state.sort_key)
-            self.state.view_id = "SEARCH_RESULTS" if self.state.results else "EMPTY_RESULTS"
+            self._refresh_results()
             info["event"] = "SortChanged"
+        elif kind == "NextPage":
+            if self.state.view_id == "SEARCH_RESULTS" and self.state.next_cursor:
+                self._refresh_results(after=self.state.next_cursor)
+                info["event"] = "PageAdvanced"
+            else:
+                info["postcondition_ok"] = False
         elif kind == "OpenResult":
             rank = int(args.get("rank", 1))
             idx = rank - 1
@@ -197,7 +285,7 @@ class SimazonEnv:
                 info["postcondition_ok"] = False
         elif kind == "AddToCart":
             if self.state.selected_asin:
-                self.state.cart_asins.append(self.state.selected_asin)
+                self.state.cart_asins = [*self.state.cart_asins, self.state.selected_asin]
                 info["event"] = "AddedToCart"
             else:
                 info["postcondition_ok"] = False
@@ -215,19 +303,8 @@ class SimazonEnv:
 
         return self._observation(), info
 
-    def _observation(self) -> dict[str, Any]:
-        return {
-            "view_id": self.state.view_id,
-            "search_query": self.state.search_query,
-            "applied_constraints": dict(self.state.constraints),
-            "sort_key": self.state.sort_key,
-            "result_asins": [r["asin"] for r in self.state.results],
-            "result_count": len(self.state.results),
-            "selected_asin": self.state.selected_asin,
-            "related_asins": list(self.state.related_asins),
-            "related_edge": self.state.related_edge,
-            "cart_asins": list(self.state.cart_asins),
-        }
+    def _observation(self) -> Observation:
+        return Observation(self.snapshot())
 
     def compute_oracle_target_asin(self, task: dict[str, Any]) -> str | None:
         oracle = task.get("oracle", {})
@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from pymongo import MongoClient
+
+from agentlab.env.product_query import parse_product_view, product_cache, product_cache_key, product_view_pipeline
+from agentlab.env.related_graph import RelatedGraph
+from agentlab.env.search_cache import search_cache
+from agentlab.env.search_query import (
+    BATCH_TAG,
+    decode_cursor,
+    faceted_search_pipeline,
+    is_scored,
+    parse_faceted_result,
+    query_filter,
+    query_is_scored,
+    query_tokens,
+    search_pipeline,
+    split_page,
+    union_pipeline,
+)
+from agentlab.env.simazon_env import SimazonEnv, SimazonState
+
+# N structured episodes stepped in lockstep. Each tick, the queries the lanes'
+# actions are about to issue are predicted, de-duplicated and fetched in one
+# $unionWith aggregation; the lanes then run SimazonEnv's ordinary step logic
+# against that prefetch. A query the planner did not foresee still works, it
+# just costs its own round trip.
+
+FACET_TOP_K = 12
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class _Request:
+    kind: str  # "faceted" | "search" | "view"
+    key: tuple
+    query: str = ""
+    constraints: Any = None
+    sort_key: str = "relevance"
+    limit: int = 0
+    after: str | None = None
+    asin: str = ""
+    edge: str = ""
+
+
+class _Lane(SimazonEnv):
+    """One episode slot: SimazonEnv's step logic, answered from the current tick's prefetch first.
+
+    A `strict` lane has no blocking client to fall back on (AsyncSimazonEnv), so
+    a query that was not prefetched is a bug rather than an extra round trip.
+    """
+
+    prefetched: dict[tuple, Any]
+    strict: bool = False
+
+    def _refresh_catalog_meta(self) -> None:
+        # The driver re-reads catalog meta once for all of its lanes.
+        pass
+
+    def _miss(self, key: tuple) -> None:
+        if self.strict:
+            raise RuntimeError(f"query was not prefetched: {key!r}")
+
+    def faceted_search(
+        self,
+        query: str,
+        constraints: dict[str, Any],
+        sort_key: str,
+        limit: int = 50,
+        facet_top_k: int = FACET_TOP_K,
+        after: str | None = None,
+    ) -> dict[str, Any]:
+        key = self._cache_key("faceted", query, constraints, sort_key, limit, facet_top_k, after)
+        hit = self.prefetched.get(key)
+        if hit is None:
+            self._miss(key)
+            return super().faceted_search(query, constraints, sort_key, limit, facet_top_k, after)
+        return hit
+
+    def search(
+        self,
+        query: str,
+        constraints: dict[str, Any],
+        sort_key: str,
+        limit: int = 50,
+        after: str | None = None,
+    ) -> list[dict[str, Any]]:
+        key = self._cache_key("search", query, constraints, sort_key, limit, after)
+        hit = self.prefetched.get(key)
+        if hit is None:
+            self._miss(key)
+            return super().search(query, constraints, sort_key, limit, after)
+        return hit
+
+    def _product_view(self, asin: str, edge: str) -> dict[str, Any] | None:
+        key = product_cache_key(self._cache_ns, self._catalog_meta().get("epoch", 0), asin, edge, True)
+        hit = self.prefetched.get(key)
+        if hit is _MISSING:
+            return None
+        if hit is None:
+            self._miss(key)
+            return super()._product_view(asin, edge)
+        return hit
+
+
+def page_request(lane: _Lane, query: str, constraints: dict[str, Any], sort_key: str, after: str | None = None) -> _Request:
+    key = lane._cache_key("faceted", query, constraints, sort_key, lane.page_size, FACET_TOP_K, after)
+    return _Request("faceted", key, query, constraints, sort_key, lane.page_size, after)
+
+
+def search_request(lane: _Lane, query: str, constraints: dict[str, Any], sort_key: str, limit: int, after: str | None = None) -> _Request:
+    key = lane._cache_key("search", query, constraints, sort_key, limit, after)
+    return _Request("search", key, query, constraints, sort_key, limit, after)
+
+
+def view_requests(lane: _Lane, asin: str, edge: str) -> list[_Request]:
+    if lane.graph is not None:
+        return []
+    key = product_cache_key(lane._cache_ns, lane._catalog_meta().get("epoch", 0), asin, edge, True)
+    return [_Request("view", key, asin=asin, edge=edge)]
+
+
+def reset_requests(lane: _Lane, start_asin: str | None, edge: str | None) -> list[_Request]:
+    return view_requests(lane, start_asin, edge or SimazonState.related_edge) if start_asin else []
+
+
+def step_requests(lane: _Lane, action: dict[str, Any]) -> list[_Request]:
+    """The query `lane.step(action)` will issue, mirroring SimazonEnv.step."""
+    state = lane.state
+    kind = action.get("type", "NoOp")
+    args = action.get("args", {})
+    if kind == "Search":
+        return [page_request(lane, str(args.get("query", "")).strip(), state.constraints, state.sort_key)]
+    if kind == "ApplyFacet" and args.get("facet") and args.get("value") is not None:
+        constraints = {**state.constraints, str(args["facet"]): args["value"]}
+        return [page_request(lane, state.search_query, constraints, state.sort_key)]
+    if kind == "SortBy":
+        return [page_request(lane, state.search_query, state.constraints, str(args.get("key", "relevance")))]
+    if kind == "NextPage" and state.view_id == "SEARCH_RESULTS" and state.next_cursor:
+        if decode_cursor(state.next_cursor, state.sort_key, query_is_scored(state.search_query, state.sort_key)) is None:
+            return [page_request(lane, state.search_query, state.constraints, state.sort_key)]
+        return [search_request(lane, state.search_query, state.constraints, state.sort_key, lane.page_size + 1, state.next_cursor)]
+    if kind in ("OpenResult", "OpenRelated"):
+        idx = int(args.get("rank", 1)) - 1
+        if kind == "OpenResult" and 0 <= idx < len(state.results):
+            return view_requests(lane, state.results[idx]["asin"], state.related_edge)
+        if kind == "OpenRelated" and 0 <= idx < len(state.related_asins):
+            return view_requests(lane, state.related_asins[idx], state.related_edge)
+    return []
+
+
+def oracle_requests(lane: _Lane, task: dict[str, Any]) -> list[_Request]:
+    """The search `lane.compute_oracle_target_asin(task)` will issue, if any."""
+    sort_key = {"min_price_match": "price_asc", "max_rating_match": "rating_desc"}.get(task.get("oracle", {}).get("type"))
+    if not sort_key:
+        return []
+    spec = task.get("spec", {})
+    constraints = spec.get("constraints", {}) if isinstance(spec.get("constraints"), dict) else {}
+    return [search_request(lane, str(spec.get("query", "")).strip(), constraints, sort_key, 1)]
+
+
+class _Batch:
+    """The requests of one tick that neither the tick nor the shared caches can answer yet.
+
+    Driver-agnostic: the caller loads `tokens()` into the term cache, runs
+    `pipeline()` on whichever client it has and hands the rows to `store()`.
+    """
+
+    def __init__(self, prefetched: dict[tuple, Any], requests: list[_Request]) -> None:
+        self.prefetched = prefetched
+        self.pending: dict[tuple, _Request] = {}
+        self._branches: list[tuple[str, Any]] = []
+        prefetched.clear()
+        for req in requests:
+            if req.key in self.pending or req.key in prefetched:
+                continue
+            cached = (product_cache if req.kind == "view" else search_cache).get(req.key)
+            if cached is not None:
+                prefetched[req.key] = cached
+            else:
+                self.pending[req.key] = req
+
+    def tokens(self) -> list[str]:
+        """BM25 terms the relevance queries need, for one df lookup across every lane."""
+        tokens = [t for r in self.pending.values() if r.kind != "view" and r.sort_key == "relevance" for t in query_tokens(r.query)]
+        return list(dict.fromkeys(tokens))
+
+    def pipeline(self, planner: _Lane) -> list[dict[str, Any]]:
+        """One $unionWith aggregation for every pending request; `planner`'s term cache must hold `tokens()`."""
+        pipelines: list[list[dict[str, Any]]] = []
+        views_by_edge: dict[str, list[_Request]] = defaultdict(list)
+        for req in self.pending.values():
+            if req.kind == "view":
+                views_by_edge[req.edge].append(req)
+                continue
+            score_expr = planner._score_expr(req.query, req.sort_key)
+            scored = is_scored(req.sort_key, score_expr)
+            after = decode_cursor(req.after, req.sort_key, scored)
+            filt = query_filter(req.query, req.constraints)
+            if req.kind == "faceted":
+                pipeline = faceted_search_pipeline(
+                    filt, req.sort_key, req.limit + 1, FACET_TOP_K, score_expr=score_expr, after=after
+                )
+            else:
+                pipeline = search_pipeline(filt, req.sort_key, req.limit, score_expr=score_expr, after=after)
+            pipelines.append(pipeline)
+            self._branches.append((req.kind, (req, scored)))
+        for edge, reqs in views_by_edge.items():
+            pipelines.append(product_view_pipeline(planner.col.name, sorted({r.asin for r in reqs}), edge))
+            self._branches.append(("view", reqs))
+        return union_pipeline(planner.col.name, pipelines)
+
+    def store(self, rows: Iterable[dict[str, Any]]) -> None:
+        """Decode the union's rows into the shared caches and this tick's prefetch."""
+        rows_by_branch: dict[int, list[dict[str, Any]]] = defaultdict(list)
+        for row in rows:
+            rows_by_branch[row.pop(BATCH_TAG)].append(row)
+        for i, (kind, payload) in enumerate(self._branches):
+            branch_rows = rows_by_branch.get(i, [])
+            if kind == "view":
+                edge = payload[0].edge
+                views = {row.get("asin"): parse_product_view([row], edge) for row in branch_rows}
+                for req in payload:
+                    view = views.get(req.asin)
+                    if view is None:
+                        self.prefetched[req.key] = _MISSING
+                    else:
+                        product_cache.put(req.key, view)
+                        self.prefetched[req.key] = view
+                continue
+            req, scored = payload
+            if kind == "faceted":
+                value = parse_faceted_result(branch_rows)
+                value["results"], value["next_cursor"] = split_page(value["results"], req.limit, req.sort_key, scored)
+            else:
+                value = branch_rows
+            search_cache.put(req.key, value)
+            self.prefetched[req.key] = value
+
+
+class VectorSimazonEnv:
+    """`num_envs` independent SimazonStates sharing one client, BM25 term cache and catalog meta.
+
+    `reset`, `step` and `compute_oracle_target_asins` take {lane: ...} dicts so
+    lanes can start and finish episodes independently.
+    """
+
+    def __init__(
+        self,
+        mongo_uri: str,
+        num_envs: int,
+        db: str = "simazon",
+        collection: str = "products",
+        page_size: int = 50,
+        client: MongoClient | None = None,
+        graph: RelatedGraph | None = None,
+    ) -> None:
+        self._owns_client = client is None
+        self.client = client if client is not None else MongoClient(mongo_uri)
+        self.col = self.client[db][collection]
+        self.page_size = page_size
+        self.round_trips = 0
+        self._prefetched: dict[tuple, Any] = {}
+        term_df: dict[str, int] = {}
+        self.envs: list[_Lane] = []
+        for _ in range(num_envs):
+            lane = _Lane(mongo_uri, db=db, collection=collection, page_size=page_size, client=self.client, graph=graph)
+            lane.prefetched = self._prefetched
+            lane._term_df = term_df
+            self.envs.append(lane)
+        self._meta_synced = False
+
+    @property
+    def num_envs(self) -> int:
+        return len(self.envs)
+
+    def close(self) -> None:
+        if self._owns_client:
+            self.client.close()
+
+    def _sync_meta(self, refresh: bool = False) -> None:
+        if refresh or not self._meta_synced:
+            planner = self.envs[0]
+            planner._meta = None
+            meta = planner._catalog_meta()
+            for lane in self.envs[1:]:
+                lane._meta = meta
+            self._meta_synced = True
+
+    def _prefetch(self, requests: list[_Request]) -> None:
+        batch = _Batch(self._prefetched, requests)
+        if not batch.pending:
+            return
+        planner = self.envs[0]
+        tokens = batch.tokens()
+        if tokens:
+            planner._term_stats(tokens)  # one $in for every lane's missing terms
+        batch.store(self.col.aggregate(batch.pipeline(planner)))
+        self.round_trips += 1
+
+    def reset(self, lanes: dict[int, tuple[str | None, str | None]]) -> dict[int, dict[str, Any]]:
+        """Start a new episode on each given lane: {lane: (start_asin, related_edge)}."""
+        # Like SimazonEnv.reset, pick up a new catalog epoch between episodes.
+        self._sync_meta(refresh=True)
+        self._prefetch([req for i, (start, edge) in lanes.items() for req in reset_requests(self.envs[i], start, edge)])
+        return {i: self.envs[i].reset(start_asin=start, related_edge=edge) for i, (start, edge) in lanes.items()}
+
+    def compute_oracle_target_asins(self, tasks: dict[int, dict[str, Any]]) -> dict[int, str | None]:
+        self._sync_meta()
+        self._prefetch([req for i, task in tasks.items() for req in oracle_requests(self.envs[i], task)])
+        return {i: self.envs[i].compute_oracle_target_asin(task) for i, task in tasks.items()}
+
+    def step(self, actions: dict[int, dict[str, Any]]) -> dict[int, tuple[dict[str, Any], dict[str, Any]]]:
+        """Apply one action per given lane; all their queries share a single round trip."""
+        self._sync_meta()
+        self._prefetch([req for i, action in actions.items() for req in step_requests(self.envs[i], action)])
+        return {i: self.envs[i].step(action) for i, action in actions.items()}
@@ -2,7 +2,7 @@ def oracle_satisfied(task_materialized: dict, final_state: dict, expected_asin:
     oracle = task_materialized.get("oracle", {})
     otype = oracle.get("type")
     cart = final_state.get("cart_asins", [])
-    if not isinstance(cart, list):
+    if not isinstance(cart, (list, tuple)):
         return False
 
     if otype == "exact_asin_in_cart":
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, TextIO
+
+
+class ProgressReporter:
+    """Appends one JSON line per finished episode (plus start/done markers) for live job monitoring.
+
+    Each event carries completed/total, an ETA and per-variant success so far, so a
+    reader only ever needs the newest line. `path=None` makes every call a no-op.
+    """
+
+    def __init__(self, path: str | Path | None, total: int) -> None:
+        self.total = total
+        self.completed = 0
+        self._started = time.monotonic()
+        self._by_variant: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+        self._fh: TextIO | None = None
+        if path:
+            p = Path(path)
+            p.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = p.open("a", encoding="utf-8")
+        self._emit({"event": "start"})
+
+    def _emit(self, event: dict[str, Any]) -> None:
+        if self._fh is None:
+            return
+        elapsed = time.monotonic() - self._started
+        remaining = self.total - self.completed
+        event.update(
+            completed=self.completed,
+            total=self.total,
+            elapsed_s=round(elapsed, 2),
+            eta_s=round(elapsed / self.completed * remaining, 2) if self.completed else None,
+            by_variant={
+                v: {"episodes": n, "successes": s, "success_rate": round(s / n, 4) if n else 0.0}
+                for v, (n, s) in sorted(self._by_variant.items())
+            },
+            ts=time.time(),
+        )
+        self._fh.write(json.dumps(event) + "\n")
+        self._fh.flush()
+
+    def episode(self, episode: dict[str, Any]) -> None:
+        self.completed += 1
+        counts = self._by_variant[str(episode.get("agent_variant", "UNKNOWN"))]
+        counts[0] += 1
+        counts[1] += 1 if episode.get("success") else 0
+        self._emit(
+            {
+                "event": "episode",
+                "task_id": episode.get("task_id"),
+                "variant": episode.get("agent_variant"),
+                "success": bool(episode.get("success")),
+            }
+        )
+
+    def close(self, **extra: Any) -> None:
+        if self._fh is None:
+            return
+        self._emit({"event": "done", **extra})
+        self._fh.close()
+        self._fh = None
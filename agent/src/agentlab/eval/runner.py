@@ -1,15 +1,21 @@
 from __future__ import annotations
 
+import asyncio
+from collections import deque
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Callable
 
 from agentlab.control.baseline_freeform import next_action as baseline_next_action
 from agentlab.control.screenshot_based import next_action as screenshot_next_action
 from agentlab.control.state_aware import next_action as state_aware_next_action
 from agentlab.control.typed_action import next_action as typed_next_action
 from agentlab.control.vision_ocr import next_action as vision_ocr_next_action
+from agentlab.env.observation import Observation
 from agentlab.eval.oracle import oracle_satisfied
 
+# Policies read facet counts live; a stored step would repeat the page's full facet lists.
+_UNPERSISTED_KEYS = frozenset(("facet_counts",))
+
 
 def _pick_action(
     variant: str,
@@ -69,37 +75,41 @@ def _pick_action(
     )
 
 
-def run_episode(
-    env,
-    task: dict[str, Any],
-    variant: str,
-    catalog: dict[str, Any],
-    max_steps: int = 30,
-    learned_priors_model: dict[str, Any] | None = None,
-) -> dict[str, Any]:
-    started = datetime.now(timezone.utc).isoformat()
+def _reset_args(task: dict[str, Any]) -> tuple[str | None, str | None]:
     spec = task.get("spec", {})
     start_asin = spec.get("start_asin")
     edge = spec.get("edge") or spec.get("edge_used")
-    observation = env.reset(start_asin=start_asin if isinstance(start_asin, str) else None, related_edge=edge if isinstance(edge, str) else None)
-    target_asin = env.compute_oracle_target_asin(task)
-    steps: list[dict[str, Any]] = []
-    success = False
-    steps_to_success: int | None = None
+    return (start_asin if isinstance(start_asin, str) else None, edge if isinstance(edge, str) else None)
 
-    for t in range(max_steps):
+
+class _Episode:
+    """Step bookkeeping shared by run_episode and run_episodes_batched."""
+
+    def __init__(self, task: dict[str, Any], variant: str, observation: dict[str, Any], target_asin: str | None, started: str) -> None:
+        self.task = task
+        self.variant = variant
+        self.observation = observation
+        self.target_asin = target_asin
+        self.started = started
+        self.steps: list[dict[str, Any]] = []
+        self.success = False
+        self.steps_to_success: int | None = None
+
+    def next_action(self, catalog: dict[str, Any], learned_priors_model: dict[str, Any] | None) -> dict[str, Any]:
         # lightweight in-memory history exposed only to screenshot policy for step-local context.
-        obs_for_policy = dict(observation)
-        obs_for_policy["_history"] = steps
-        action = _pick_action(variant, task, obs_for_policy, catalog, target_asin, learned_priors_model)
-        if variant in {"screenshot_based", "vision_ocr"} and hasattr(env, "step"):
-            next_obs, info = env.step(action, step_idx=t + 1)
+        if isinstance(self.observation, Observation):
+            obs_for_policy = self.observation.with_extra(_history=self.steps)
         else:
-            next_obs, info = env.step(action)
-        done = oracle_satisfied(task, next_obs, expected_asin=target_asin)
+            obs_for_policy = {**self.observation, "_history": self.steps}
+        return _pick_action(self.variant, self.task, obs_for_policy, catalog, self.target_asin, learned_priors_model)
+
+    def record(self, action: dict[str, Any], next_obs: dict[str, Any], info: dict[str, Any]) -> bool:
+        """Append the step; True once the oracle is satisfied."""
+        t = len(self.steps)
+        done = oracle_satisfied(self.task, next_obs, expected_asin=self.target_asin)
         step = {
             "t": t,
-            "view_pred": observation.get("view_id"),
+            "view_pred": self.observation.get("view_id"),
             "action": action,
             "postcondition_ok": info.get("postcondition_ok", True),
             "event": info.get("event"),
@@ -108,22 +118,152 @@ def run_episode(
             "action_debug": action.get("_debug", {}),
             "oracle_done": done,
         }
-        steps.append(step)
-        observation = next_obs
+        self.steps.append(step)
+        self.observation = next_obs
         if done:
-            success = True
-            steps_to_success = t + 1
+            self.success = True
+            self.steps_to_success = t + 1
+        return done
+
+    def result(self) -> dict[str, Any]:
+        ended = datetime.now(timezone.utc).isoformat()
+        # Observations stay lazy views while the episode runs; the stored episode is plain JSON.
+        for step in self.steps:
+            if isinstance(step["state_vars"], Observation):
+                step["state_vars"] = step["state_vars"].to_dict(exclude=_UNPERSISTED_KEYS)
+        return {
+            "task_id": self.task.get("task_id"),
+            "workload_type": self.task.get("workload_type"),
+            "agent_variant": self.variant,
+            "success": self.success,
+            "steps_to_success": self.steps_to_success,
+            "steps": self.steps,
+            "oracle_target_asin": self.target_asin,
+            "start_ts": self.started,
+            "end_ts": ended,
+        }
+
+
+def run_episode(
+    env,
+    task: dict[str, Any],
+    variant: str,
+    catalog: dict[str, Any],
+    max_steps: int = 30,
+    learned_priors_model: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    started = datetime.now(timezone.utc).isoformat()
+    start_asin, edge = _reset_args(task)
+    observation = env.reset(start_asin=start_asin, related_edge=edge)
+    episode = _Episode(task, variant, observation, env.compute_oracle_target_asin(task), started)
+
+    for t in range(max_steps):
+        action = episode.next_action(catalog, learned_priors_model)
+        if variant in {"screenshot_based", "vision_ocr"} and hasattr(env, "step"):
+            next_obs, info = env.step(action, step_idx=t + 1)
+        else:
+            next_obs, info = env.step(action)
+        if episode.record(action, next_obs, info):
+            break
+
+    return episode.result()
+
+
+def run_episodes_batched(
+    vec_env,
+    jobs: list[tuple[dict[str, Any], str]],
+    catalog: dict[str, Any],
+    max_steps: int = 30,
+    learned_priors_model: dict[str, Any] | None = None,
+    on_episode: Callable[[dict[str, Any]], None] | None = None,
+) -> list[dict[str, Any]]:
+    """Run (task, variant) jobs on a VectorSimazonEnv, one per lane, stepping all live lanes together.
+
+    A lane whose episode ends (oracle satisfied or out of steps) picks up the
+    next job on the following tick. Results come back in `jobs` order and match
+    what run_episode would produce for each job; structured variants only.
+    """
+    results: list[dict[str, Any] | None] = [None] * len(jobs)
+    pending = deque(enumerate(jobs))
+    active: dict[int, tuple[int, _Episode]] = {}
+
+    def finish(lane: int) -> None:
+        idx, episode = active.pop(lane)
+        results[idx] = episode.result()
+        if on_episode is not None:
+            on_episode(results[idx])
+
+    while pending or active:
+        starting = {}
+        for lane in range(vec_env.num_envs):
+            if lane not in active and pending:
+                starting[lane] = pending.popleft()
+        if starting:
+            started = datetime.now(timezone.utc).isoformat()
+            observations = vec_env.reset({lane: _reset_args(task) for lane, (_, (task, _)) in starting.items()})
+            targets = vec_env.compute_oracle_target_asins({lane: task for lane, (_, (task, _)) in starting.items()})
+            for lane, (idx, (task, variant)) in starting.items():
+                active[lane] = (idx, _Episode(task, variant, observations[lane], targets[lane], started))
+                if max_steps <= 0:
+                    finish(lane)
+        if not active:
+            continue
+
+        actions = {lane: episode.next_action(catalog, learned_priors_model) for lane, (_, episode) in active.items()}
+        for lane, (next_obs, info) in vec_env.step(actions).items():
+            episode = active[lane][1]
+            if episode.record(actions[lane], next_obs, info) or len(episode.steps) >= max_steps:
+                finish(lane)
+
+    return [r for r in results if r is not None]
+
+
+async def run_episode_async(
+    env,
+    task: dict[str, Any],
+    variant: str,
+    catalog: dict[str, Any],
+    max_steps: int = 30,
+    learned_priors_model: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """run_episode on an AsyncSimazonEnv: the env is awaited, the policy stays synchronous."""
+    started = datetime.now(timezone.utc).isoformat()
+    start_asin, edge = _reset_args(task)
+    observation = await env.reset(start_asin=start_asin, related_edge=edge)
+    episode = _Episode(task, variant, observation, await env.compute_oracle_target_asin(task), started)
+
+    for _ in range(max_steps):
+        action = episode.next_action(catalog, learned_priors_model)
+        next_obs, info = await env.step(action)
+        if episode.record(action, next_obs, info):
             break
 
-    ended = datetime.now(timezone.utc).isoformat()
-    return {
-        "task_id": task.get("task_id"),
-        "workload_type": task.get("workload_type"),
-        "agent_variant": variant,
-        "success": success,
-        "steps_to_success": steps_to_success,
-        "steps": steps,
-        "oracle_target_asin": target_asin,
-        "start_ts": started,
-        "end_ts": ended,
-    }
+    return episode.result()
+
+
+async def run_episodes_async(
+    env,
+    jobs: list[tuple[dict[str, Any], str]],
+    catalog: dict[str, Any],
+    max_steps: int = 30,
+    learned_priors_model: dict[str, Any] | None = None,
+    concurrency: int = 64,
+    on_episode: Callable[[dict[str, Any]], None] | None = None,
+) -> list[dict[str, Any]]:
+    """Run (task, variant) jobs with up to `concurrency` episodes in flight, each on an `env.spawn()` sibling.
+
+    Results come back in `jobs` order; structured variants only.
+    """
+    results: list[dict[str, Any] | None] = [None] * len(jobs)
+    queue = iter(enumerate(jobs))  # shared by the workers; next() never awaits
+
+    async def worker(worker_env) -> None:
+        for idx, (task, variant) in queue:
+            results[idx] = await run_episode_async(
+                worker_env, task, variant, catalog, max_steps=max_steps, learned_priors_model=learned_priors_model
+            )
+            if on_episode is not None:
+                on_episode(results[idx])
+
+    await asyncio.gather(*(worker(env.spawn()) for _ in range(max(1, min(concurrency, len(jobs))))))
+    return [r for r in results if r is not None]
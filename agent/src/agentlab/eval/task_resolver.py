@@ -4,6 +4,8 @@ from copy import deepcopy
 from random import Random
 from typing import Any
 
+from agentlab.env.related_graph import RelatedGraph
+
 
 def _derive_query_from(record: dict[str, Any], fields: list[str], max_tokens: int) -> str:
     tokens: list[str] = []
@@ -42,14 +44,35 @@ def _resolve_node(node: Any, bindings: dict[str, Any]) -> Any:
     return node
 
 
-def _pick_graph_target(products_col, seed_product: dict[str, Any], edge: str) -> tuple[str | None, str]:
+def _preferred_edges(edge: str) -> list[str]:
+    return list(dict.fromkeys([edge, "bought_together", "also_viewed", "also_bought"]))
+
+
+def _pick_graph_target_indexed(graph: RelatedGraph, seed_asin: str, edge: str) -> tuple[str | None, str]:
+    """Same preference order as `_pick_graph_target`, answered from the prebuilt graph."""
+    for e in _preferred_edges(edge):
+        targets = graph.edge_targets(seed_asin, e)
+        if targets:
+            return targets[0], e
+    neighbours, kind = graph.fallback(seed_asin)
+    if neighbours:
+        return neighbours[0], kind
+    for i in range(min(2, len(graph))):
+        if str(graph.asins[i]) != seed_asin:
+            return str(graph.asins[i]), "random_fallback"
+    return None, "none"
+
+
+def _pick_graph_target(
+    products_col,
+    seed_product: dict[str, Any],
+    edge: str,
+    graph: RelatedGraph | None = None,
+) -> tuple[str | None, str]:
+    if graph is not None and seed_product.get("asin") in graph:
+        return _pick_graph_target_indexed(graph, seed_product["asin"], edge)
     related = seed_product.get("related") if isinstance(seed_product.get("related"), dict) else {}
-    preferred_edges = [edge, "bought_together", "also_viewed", "also_bought"]
-    seen: set[str] = set()
-    for e in preferred_edges:
-        if e in seen:
-            continue
-        seen.add(e)
+    for e in _preferred_edges(edge):
         raw = related.get(e)
         if isinstance(raw, str):
             candidates = [raw]
@@ -59,27 +82,33 @@ def _pick_graph_target(products_col, seed_product: dict[str, Any], edge: str) ->
             candidates = []
         if not candidates:
             continue
-        hit = products_col.find_one({"asin": {"$in": candidates}}, {"asin": 1})
+        # The first candidate in edge order that exists, as RelatedGraph.edge_targets returns them.
+        existing = {d["asin"] for d in products_col.find({"asin": {"$in": candidates}}, {"asin": 1})}
+        hit = next((a for a in candidates if a in existing), None)
         if hit:
-            return hit["asin"], e
+            return hit, e
 
+    # Lowest-ASIN neighbour, matching the prebuilt graph's fallback lists.
+    by_asin = [("asin", 1)]
     seed_asin = seed_product.get("asin")
-    seed_brand = seed_product.get("brand")
-    seed_category = seed_product.get("category_leaf")
-    if seed_brand:
-        hit = products_col.find_one({"asin": {"$ne": seed_asin}, "brand": seed_brand}, {"asin": 1})
-        if hit:
-            return hit["asin"], "brand_fallback"
-    if seed_category:
-        hit = products_col.find_one({"asin": {"$ne": seed_asin}, "category_leaf": seed_category}, {"asin": 1})
+    for field, kind in (("brand", "brand_fallback"), ("category_leaf", "category_fallback")):
+        value = seed_product.get(field)
+        if not (value and isinstance(value, str)):
+            continue
+        hit = products_col.find_one({"asin": {"$ne": seed_asin}, field: value}, {"asin": 1}, sort=by_asin)
         if hit:
-            return hit["asin"], "category_fallback"
+            return hit["asin"], kind
 
-    hit = products_col.find_one({"asin": {"$ne": seed_asin}}, {"asin": 1})
+    hit = products_col.find_one({"asin": {"$ne": seed_asin}}, {"asin": 1}, sort=by_asin)
     return (hit["asin"], "random_fallback") if hit else (None, "none")
 
 
-def resolve_task_template(task_template: dict[str, Any], products_col, seed: int = 0) -> dict[str, Any]:
+def resolve_task_template(
+    task_template: dict[str, Any],
+    products_col,
+    seed: int = 0,
+    graph: RelatedGraph | None = None,
+) -> dict[str, Any]:
     task = deepcopy(task_template)
     rng = Random(seed)
     bindings: dict[str, Any] = {}
@@ -108,7 +137,7 @@ def resolve_task_template(task_template: dict[str, Any], products_col, seed: int
     if task.get("workload_type") == "graph_browse_related" and "P" in bindings:
         edge = str(task.get("spec", {}).get("edge", "also_bought"))
         start_asin = bindings["P"].get("asin")
-        target_asin, edge_used = _pick_graph_target(products_col, bindings["P"], edge)
+        target_asin, edge_used = _pick_graph_target(products_col, bindings["P"], edge, graph=graph)
         task.setdefault("spec", {})
         task["spec"]["start_asin"] = start_asin
         task["spec"]["target_asin"] = target_asin
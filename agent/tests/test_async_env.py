@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+from pathlib import Path
+
+from agentlab.catalog.loader import load_ui_catalog
+from agentlab.env.async_env import AsyncSimazonEnv
+from agentlab.env.columnar_catalog import ColumnarCatalog, ColumnarSimazonEnv
+from agentlab.env.search_cache import search_cache
+from agentlab.eval.runner import run_episode, run_episodes_async
+
+URI = "mongodb://localhost:27017/?serverSelectionTimeoutMS=100"
+DOCS = [
+    {"asin": f"P{i}", "title": f"usb {w}", "price": float(i + 1), "rating_avg": 4.0, "search_tokens": ["usb", w]}
+    for i, w in enumerate(["cable", "charger", "hub", "cable", "hub"])
+]
+
+
+class AsyncEnvTest(unittest.TestCase):
+    def tearDown(self) -> None:
+        search_cache.clear()
+
+    def test_cached_page_needs_no_driver_and_siblings_share_catalog_state(self) -> None:
+        async def scenario():
+            env = AsyncSimazonEnv(URI, page_size=2)
+            catalog_meta = {"epoch": 0}
+
+            async def find_meta():
+                return dict(catalog_meta)
+
+            env._find_meta = find_meta
+            sibling = env.spawn()
+            sibling._find_meta = find_meta
+            self.assertIs(sibling.client, env.client)
+            self.assertIs(sibling._lane._term_df, env._lane._term_df)
+            page = {"results": [{"asin": "A1"}], "total": 1, "facets": {}, "next_cursor": None}
+            await env.reset()
+            search_cache.put(env._lane._cache_key("faceted", "", {}, "price_asc", 2, 12, None), page)
+            await sibling.reset()
+            obs, info = await sibling.step({"type": "SortBy", "args": {"key": "price_asc"}})
+            self.assertEqual((obs["result_asins"], info["event"]), (("A1",), "SortChanged"))
+            self.assertEqual(env.state.sort_key, "relevance")
+            with self.assertRaises(RuntimeError):
+                env._lane.faceted_search("nothing prefetched", {}, "price_asc", limit=2)
+            # A re-ingest between episodes reaches the cache keys and drops stale term stats.
+            env._lane._term_df["usb"] = 3
+            catalog_meta["epoch"] = 1
+            await sibling.reset()
+            self.assertEqual(env._lane._term_df, {})
+            self.assertEqual(sibling._lane._cache_key("search", "", {}, "price_asc", 2)[1], 1)
+            await env.close()
+
+        asyncio.run(scenario())
+
+
+class _AsyncColumnar:
+    """Awaitable facade over the in-memory env, yielding to the loop on every call."""
+
+    def __init__(self, catalog: ColumnarCatalog) -> None:
+        self.catalog = catalog
+        self.env = ColumnarSimazonEnv(catalog, page_size=2)
+
+    def spawn(self):
+        return _AsyncColumnar(self.catalog)
+
+    async def reset(self, **kwargs):
+        await asyncio.sleep(0)
+        return self.env.reset(**kwargs)
+
+    async def step(self, action):
+        await asyncio.sleep(0)
+        return self.env.step(action)
+
+    async def compute_oracle_target_asin(self, task):
+        return self.env.compute_oracle_target_asin(task)
+
+
+class AsyncRunnerTest(unittest.TestCase):
+    def test_matches_sequential_episodes_in_job_order(self) -> None:
+        catalog = ColumnarCatalog(DOCS)
+        ui = load_ui_catalog(Path(__file__).resolve().parents[1] / "catalog" / "ui_catalog.yaml")
+        jobs = [
+            ({"task_id": f"t{i}", "spec": {"query": q}, "oracle": {"type": "min_price_match"}}, variant)
+            for i, q in enumerate(["usb", "hub", "cable", "charger"])
+            for variant in ("typed_action", "state_aware")
+        ]
+        seen = []
+        got = asyncio.run(run_episodes_async(_AsyncColumnar(catalog), jobs, ui, max_steps=6, concurrency=3, on_episode=seen.append))
+        want = [run_episode(ColumnarSimazonEnv(catalog, page_size=2), t, v, ui, max_steps=6) for t, v in jobs]
+        strip = lambda r: {k: v for k, v in r.items() if k not in ("start_ts", "end_ts")}  # noqa: E731
+        self.assertEqual([strip(r) for r in got], [strip(r) for r in want])
+        self.assertEqual(len(seen), len(jobs))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import math
+import random
+import unittest
+
+from agentlab.env.columnar_catalog import ColumnarCatalog, ColumnarSimazonEnv
+from agentlab.env.search_query import BM25_B, BM25_K1, bm25_idf, tokenize
+
+BRANDS = ["Anker", "Belkin", "", None]
+CATEGORIES = ["Cables", "Chargers", None]
+WORDS = ["usb", "cable", "charger", "fast", "braided"]
+
+
+def _docs(n: int = 120, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    docs = []
+    for i in range(n):
+        brand = rng.choice(BRANDS)
+        category = rng.choice(CATEGORIES)
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        doc = {
+            "asin": f"A{rng.randint(0, 10**6):07d}{i:03d}",
+            "title": title,
+            "price": rng.choice([None, 5.0, 9.99, 24.0, 60.0, 6000.0, float(rng.randint(1, 300))]),
+            "rating_avg": rng.choice([None, 3.5, 4.0, 4.5]),
+            "rating_count": rng.choice([None, 0, 10, 10, 250]),
+            "search_tokens": tokenize(f"{title} {brand or ''} {category or ''}"),
+        }
+        if brand is not None:
+            doc["brand"] = brand
+        if category is not None:
+            doc["category_leaf"] = category
+        docs.append(doc)
+    return docs
+
+
+class ColumnarSearchTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.docs = _docs()
+        self.catalog = ColumnarCatalog(self.docs)
+
+    def test_filters_and_sorts_like_the_pipeline(self) -> None:
+        specs = {
+            "price_asc": [("price", 1), ("asin", 1)],
+            "price_desc": [("price", -1), ("asin", 1)],
+            "rating_desc": [("rating_avg", -1), ("rating_count", -1), ("asin", 1)],
+            "relevance": [("rating_count", -1), ("asin", 1)],
+        }
+        constraints = {"brand": "Anker", "price_lte": 100}
+        for sort_key, spec in specs.items():
+            expected = [
+                d
+                for d in self.docs
+                if d.get("brand") == "Anker" and isinstance(d.get("price"), float) and d["price"] <= 100
+            ]
+            expected = sorted(expected, key=lambda d: self._sort_tuple(d, spec))
+            got = self.catalog.search("", constraints, sort_key, limit=7)
+            self.assertEqual([d["asin"] for d in got], [d["asin"] for d in expected[:7]], sort_key)
+
+    @staticmethod
+    def _sort_tuple(doc: dict, spec: list[tuple[str, int]]) -> tuple:
+        # Reference ordering: null/missing sorts below numbers, asin breaks ties.
+        out = []
+        for field, direction in spec:
+            value = doc.get(field)
+            if field == "asin":
+                out.append(value)
+            elif direction == 1:
+                out.append(-math.inf if value is None else value)
+            else:
+                out.append(math.inf if value is None else -value)
+        return tuple(out)
+
+    def test_keyset_pages_cover_the_full_ordering(self) -> None:
+        for sort_key in ("price_asc", "price_desc", "rating_desc", "relevance"):
+            full = [d["asin"] for d in self.catalog.search("usb", {}, sort_key, limit=1000)]
+            paged, cursor = [], None
+            while True:
+                page = self.catalog.faceted_search("usb", {}, sort_key, limit=9, after=cursor)
+                paged += [d["asin"] for d in page["results"]]
+                cursor = page["next_cursor"]
+                if not cursor:
+                    break
+            self.assertEqual(paged, full, sort_key)
+            self.assertEqual(page["total"], len(full))
+
+    def test_bm25_matches_the_score_expression(self) -> None:
+        docs = self.catalog.search("fast cable", {}, "relevance", limit=1000)
+        stats = self.catalog.term_stats
+        avg_len = max(stats["avg_len"], 1.0)
+        for doc in docs:
+            tokens = next(d["search_tokens"] for d in self.docs if d["asin"] == doc["asin"])
+            self.assertTrue({"fast", "cable"} <= set(tokens))
+            norm = BM25_K1 * ((1 - BM25_B) + BM25_B * (len(tokens) / avg_len))
+            expected = math.fsum(
+                bm25_idf(stats["df"][t], stats["doc_count"]) * ((tokens.count(t) * (BM25_K1 + 1)) / (tokens.count(t) + norm))
+                for t in ("fast", "cable")
+            )
+            self.assertEqual(doc["_score"], expected)
+        spec = [("_score", -1), ("rating_count", -1), ("asin", 1)]
+        self.assertEqual(docs, sorted(docs, key=lambda d: self._sort_tuple(d, spec)))
+
+    def test_facets_count_whole_match_set(self) -> None:
+        page = self.catalog.faceted_search("", {}, "price_asc", limit=5, facet_top_k=1)
+        brands = [d.get("brand") for d in self.docs if d.get("brand")]
+        top = max(sorted(set(brands)), key=brands.count)
+        self.assertEqual(page["facets"]["brand"], [{"value": top, "count": brands.count(top)}])
+        priced = [d["price"] for d in self.docs if d["price"] is not None]
+        self.assertEqual(sum(b["count"] for b in page["facets"]["price_bucket"]), len(priced))
+        self.assertEqual(page["facets"]["price_bucket"][-1]["value"], "5000+")
+        self.assertEqual(page["total"], len(self.docs))
+
+
+class ColumnarProductViewTest(unittest.TestCase):
+    def test_edge_then_brand_then_category_fallback(self) -> None:
+        docs = [
+            {"asin": "P1", "title": "a", "brand": "Anker", "category_leaf": "Cables", "related": {"also_bought": ["P3", "ZZ", "P2"]}},
+            {"asin": "P2", "title": "b", "brand": "Anker", "category_leaf": "Cables"},
+            {"asin": "P3", "title": "c", "brand": "Belkin", "category_leaf": "Cables"},
+            {"asin": "P0", "title": "d", "category_leaf": "Cables"},
+        ]
+        catalog = ColumnarCatalog(docs)
+        view = catalog.product_view("P1", "also_bought")
+        self.assertEqual(view["neighbours"], ["P3", "P2"])
+        self.assertEqual(view["related"], [{"asin": "P3", "title": "c"}, {"asin": "P2", "title": "b"}])
+        self.assertEqual(catalog.product_view("P2", "also_bought")["neighbours"], ["P1"])
+        self.assertEqual(catalog.product_view("P0", "also_bought")["neighbours"], ["P1", "P2", "P3"])
+        self.assertIsNone(catalog.product_view("nope", "also_bought"))
+
+    def test_env_steps_without_a_database(self) -> None:
+        env = ColumnarSimazonEnv(ColumnarCatalog(_docs()), page_size=5)
+        env.reset()
+        obs, info = env.step({"type": "Search", "args": {"query": "usb"}})
+        self.assertEqual(obs["view_id"], "SEARCH_RESULTS")
+        self.assertTrue(obs["has_next_page"])
+        obs, info = env.step({"type": "NextPage"})
+        self.assertEqual((obs["page"], info["event"]), (2, "PageAdvanced"))
+        obs, info = env.step({"type": "OpenResult", "args": {"rank": 1}})
+        self.assertTrue(info["postcondition_ok"])
+        self.assertEqual(obs["view_id"], "PRODUCT_DETAIL")
+
+
+if __name__ == "__main__":
+    unittest.main()
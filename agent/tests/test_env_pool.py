@@ -0,0 +1,27 @@
+import unittest
+
+from agentlab.env.env_pool import EnvPool
+from agentlab.env.simazon_env import SimazonEnv
+
+
+class EnvPoolTest(unittest.TestCase):
+    def test_structured_envs_are_reused_and_share_the_client(self) -> None:
+        pool = EnvPool("mongodb://localhost:27017/?serverSelectionTimeoutMS=100")
+        try:
+            env = pool.env_for("typed_action")
+            self.assertIsInstance(env, SimazonEnv)
+            self.assertIs(pool.env_for("fixed_script"), env)
+            self.assertIs(env.client, pool.client)
+            env.close()  # a pooled env must not close the shared client
+            self.assertIs(pool.env_for("typed_action").client, pool.client)
+        finally:
+            pool.close()
+
+    def test_screenshot_variant_needs_a_base_url(self) -> None:
+        with EnvPool("mongodb://localhost:27017/?serverSelectionTimeoutMS=100") as pool:
+            with self.assertRaises(ValueError):
+                pool.env_for("screenshot_based")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import json
+import unittest
+
+from agentlab.env.columnar_catalog import ColumnarCatalog, ColumnarSimazonEnv
+from agentlab.env.observation import KEYS, Observation
+
+DOCS = [
+    {"asin": "P1", "title": "usb cable", "brand": "Anker", "price": 9.0, "search_tokens": ["usb", "cable"]},
+    {"asin": "P2", "title": "usb charger", "brand": "Belkin", "price": 5.0, "search_tokens": ["usb", "charger"]},
+]
+
+
+class ObservationTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.env = ColumnarSimazonEnv(ColumnarCatalog(DOCS))
+        self.env.reset()
+        self.obs, _ = self.env.step({"type": "Search", "args": {"query": "usb"}})
+
+    def test_reads_like_the_dict_observation(self) -> None:
+        self.assertIsInstance(self.obs, Observation)
+        self.assertEqual(list(self.obs), list(KEYS))
+        self.assertEqual(self.obs["view_id"], "SEARCH_RESULTS")
+        self.assertEqual(self.obs.get("result_count"), 2)
+        self.assertEqual(set(self.obs["result_asins"]), {"P1", "P2"})
+        self.assertIsNone(self.obs.get("_history"))
+        self.assertNotIn("_history", self.obs)
+        self.assertEqual(json.loads(json.dumps(self.obs.to_dict()))["result_asins"], list(self.obs["result_asins"]))
+        self.assertNotIn("facet_counts", self.obs.to_dict(exclude={"facet_counts"}))
+        self.assertIn("facet_counts", self.obs)
+
+    def test_is_immutable_and_unaffected_by_later_steps(self) -> None:
+        with self.assertRaises(AttributeError):
+            self.obs.view_id = "CART"
+        with self.assertRaises(TypeError):
+            self.obs["applied_constraints"]["brand"] = "Anker"
+        self.env.step({"type": "ApplyFacet", "args": {"facet": "brand", "value": "Anker"}})
+        self.env.step({"type": "OpenResult", "args": {"rank": 1}})
+        self.env.step({"type": "AddToCart"})
+        self.assertEqual(self.obs["applied_constraints"], {})
+        self.assertEqual(self.obs["cart_asins"], ())
+        self.assertEqual(self.obs["result_count"], 2)
+
+    def test_views_are_materialized_once_and_interned(self) -> None:
+        asins = self.obs["result_asins"]
+        self.assertIs(self.obs["result_asins"], asins)
+        extended = self.obs.with_extra(_history=[])
+        self.assertIs(extended["result_asins"], asins)
+        self.assertEqual(extended["_history"], [])
+        self.assertEqual(len(extended), len(KEYS) + 1)
+        again, _ = self.env.step({"type": "SortBy", "args": {"key": "price_asc"}})
+        for a in again["result_asins"]:
+            self.assertIs(a, next(b for b in asins if b == a))
+
+
+if __name__ == "__main__":
+    unittest.main()
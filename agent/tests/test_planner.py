@@ -0,0 +1,67 @@
+import unittest
+
+from agentlab.control.planner import beam_search, lookahead_action
+from agentlab.env.columnar_catalog import ColumnarCatalog, ColumnarSimazonEnv
+
+DOCS = [
+    {"asin": "P1", "title": "usb cable", "brand": "Anker", "price": 9.0, "search_tokens": ["usb", "cable"]},
+    {"asin": "P2", "title": "usb charger", "brand": "Belkin", "price": 5.0, "search_tokens": ["usb", "charger"]},
+    {"asin": "P3", "title": "usb hub", "brand": "Anker", "price": 20.0, "search_tokens": ["usb", "hub"]},
+]
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.env = ColumnarSimazonEnv(ColumnarCatalog(DOCS), page_size=2)
+        self.env.reset()
+        self.env.step({"type": "Search", "args": {"query": "usb"}})
+
+    def test_restore_undoes_later_steps_and_stays_reusable(self) -> None:
+        checkpoint = self.env.snapshot()
+        before = self.env.restore(checkpoint)
+        for _ in range(2):
+            self.env.step({"type": "ApplyFacet", "args": {"facet": "brand", "value": "Anker"}})
+            self.env.step({"type": "OpenResult", "args": {"rank": 1}})
+            self.env.step({"type": "AddToCart"})
+            self.assertEqual(self.env.state.cart_asins, ["P1"])
+            self.assertEqual(self.env.restore(checkpoint), before)
+        self.assertEqual(checkpoint.constraints, {})
+        self.assertEqual(checkpoint.cart_asins, [])
+
+    def test_snapshot_shares_structure(self) -> None:
+        checkpoint = self.env.snapshot()
+        self.assertIs(checkpoint.results, self.env.state.results)
+        self.assertIs(checkpoint.facet_counts, self.env.state.facet_counts)
+
+
+class BeamSearchTest(unittest.TestCase):
+    def test_finds_two_step_plan_and_leaves_env_untouched(self) -> None:
+        env = ColumnarSimazonEnv(ColumnarCatalog(DOCS), page_size=2)
+        obs = env.reset()
+        obs, _ = env.step({"type": "Search", "args": {"query": "usb"}})
+
+        def expand(o):
+            if o["view_id"] == "PRODUCT_DETAIL":
+                return [{"type": "AddToCart", "args": {}}]
+            return [{"type": "OpenResult", "args": {"rank": r}} for r in range(1, o["result_count"] + 1)]
+
+        def score(o, info):
+            return 1.0 if "P3" in o["cart_asins"] else 0.1 * (o["selected_asin"] == "P3")
+
+        env.step({"type": "SortBy", "args": {"key": "price_desc"}})
+        obs = env.restore(env.snapshot())
+        best = beam_search(env, obs, expand, score, depth=2, beam_width=1)[0]
+        self.assertEqual([a["type"] for a in best.actions], ["OpenResult", "AddToCart"])
+        self.assertEqual(best.score, 1.0)
+        self.assertEqual(env.state.cart_asins, [])
+        self.assertEqual(env.state.view_id, "SEARCH_RESULTS")
+        self.assertEqual(lookahead_action(env, obs, expand, score), {"type": "OpenResult", "args": {"rank": 1}})
+
+    def test_nothing_to_expand_is_noop(self) -> None:
+        env = ColumnarSimazonEnv(ColumnarCatalog(DOCS))
+        obs = env.reset()
+        self.assertEqual(lookahead_action(env, obs, lambda o: [], lambda o, i: 0.0), {"type": "NoOp", "args": {}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from agentlab.env.product_query import parse_product_view, product_view_pipeline
+
+
+class ProductViewTest(unittest.TestCase):
+    def _row(self, **overrides):
+        row = {
+            "asin": "P1",
+            "brand": "Acme",
+            "category_leaf": "Tools",
+            "related": {"bought_together": ["R2", "MISSING", "R1"]},
+            "_edge": [],
+            "_related_docs": [{"asin": "R1", "title": "one"}, {"asin": "R2", "title": "two"}],
+            "_brand_nbrs": [{"asin": "B1"}],
+            "_category_nbrs": [{"asin": "C1"}],
+        }
+        row.update(overrides)
+        return [row]
+
+    def test_related_keep_edge_order_and_drop_missing(self) -> None:
+        view = parse_product_view(self._row(), "bought_together")
+        self.assertEqual(view["neighbours"], ["R2", "R1"])
+        self.assertEqual([d["title"] for d in view["related"]], ["two", "one"])
+        self.assertNotIn("_related_docs", view["product"])
+
+    def test_empty_edge_falls_back_to_brand_then_category(self) -> None:
+        self.assertEqual(parse_product_view(self._row(), "also_bought")["neighbours"], ["B1"])
+        view = parse_product_view(self._row(brand=None), "also_bought")
+        self.assertEqual(view["neighbours"], ["C1"])
+
+    def test_missing_product(self) -> None:
+        self.assertIsNone(parse_product_view([], "also_bought"))
+
+    def test_pipeline_is_one_round_trip(self) -> None:
+        stages = product_view_pipeline("products", "P1", "also_bought", include_fallback=False)
+        self.assertEqual(stages[0], {"$match": {"asin": "P1"}})
+        self.assertEqual(sum(1 for s in stages if "$lookup" in s), 1)
+
+    def test_fallback_lookups_are_gated(self) -> None:
+        brand, category = [s["$lookup"] for s in product_view_pipeline("products", "P1", "also_bought")[-2:]]
+        self.assertEqual(brand["as"], "_brand_nbrs")
+        when = brand["let"]["v"]["$cond"][0]
+        self.assertIn("$_edge", repr(when))
+        self.assertIn("$_brand_nbrs", repr(category["let"]["v"]["$cond"][0]))
+        gate = brand["pipeline"][0]["$match"]["$expr"]["$and"]
+        self.assertEqual(gate[:2], [{"$eq": [{"$type": "$$v"}, "string"]}, {"$ne": ["$$v", ""]}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from agentlab.eval.progress import ProgressReporter
+
+
+class ProgressReporterTest(unittest.TestCase):
+    def test_events_carry_running_rollup_and_eta(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "progress.jsonl"
+            progress = ProgressReporter(path, total=4)
+            progress.episode({"task_id": "T1", "agent_variant": "a", "success": True})
+            progress.episode({"task_id": "T1", "agent_variant": "b", "success": False})
+            progress.close(summary_out="s.json")
+            events = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+        self.assertEqual([e["event"] for e in events], ["start", "episode", "episode", "done"])
+        self.assertIsNone(events[0]["eta_s"])
+        self.assertEqual(events[2]["completed"], 2)
+        self.assertEqual(events[2]["total"], 4)
+        self.assertEqual(events[-1]["by_variant"]["a"], {"episodes": 1, "successes": 1, "success_rate": 1.0})
+        self.assertEqual(events[-1]["by_variant"]["b"]["success_rate"], 0.0)
+        self.assertEqual(events[-1]["summary_out"], "s.json")
+
+    def test_no_path_is_a_noop(self) -> None:
+        progress = ProgressReporter(None, total=1)
+        progress.episode({"agent_variant": "a", "success": True})
+        progress.close()
+        self.assertEqual(progress.completed, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
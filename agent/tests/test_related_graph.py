@@ -0,0 +1,87 @@
+import tempfile
+import unittest
+
+from agentlab.env.columnar_catalog import ColumnarCatalog
+from agentlab.env.related_graph import RelatedGraph, build_related_graph
+from agentlab.eval.task_resolver import _pick_graph_target
+
+DOCS = [
+    {"asin": "P1", "brand": "Anker", "category_leaf": "Cables", "related": {"also_bought": ["P3", "ZZ", "P2"]}},
+    {"asin": "P2", "brand": "Anker", "category_leaf": "Cables", "related": {"also_bought": ["ZZ"]}},
+    {"asin": "P3", "brand": "Belkin", "category_leaf": "Cables", "related": {"bought_together": "P4"}},
+    {"asin": "P4", "category_leaf": "Cables"},
+    {"asin": "P5", "brand": "Solo"},
+]
+
+
+class _ListCollection:
+    """The find/find_one subset `_pick_graph_target` uses, over a list in insertion order."""
+
+    def __init__(self, docs) -> None:
+        self.docs = docs
+
+    def _matches(self, doc, query) -> bool:
+        for field, cond in query.items():
+            value = doc.get(field)
+            if isinstance(cond, dict) and "$in" in cond:
+                if value not in cond["$in"]:
+                    return False
+            elif isinstance(cond, dict) and "$ne" in cond:
+                if value == cond["$ne"]:
+                    return False
+            elif value != cond:
+                return False
+        return True
+
+    def find(self, query, projection=None, sort=None):
+        docs = [d for d in self.docs if self._matches(d, query)]
+        for field, direction in reversed(sort or []):
+            docs.sort(key=lambda d: d.get(field), reverse=direction < 0)
+        return docs
+
+    def find_one(self, query, projection=None, sort=None):
+        docs = self.find(query, projection, sort)
+        return docs[0] if docs else None
+
+
+class RelatedGraphTest(unittest.TestCase):
+    def test_neighbours_match_the_product_view(self) -> None:
+        graph = build_related_graph(DOCS)
+        catalog = ColumnarCatalog(DOCS)
+        for doc in DOCS:
+            for edge in ("also_bought", "bought_together", "also_viewed"):
+                view = catalog.product_view(doc["asin"], edge)
+                self.assertEqual(graph.neighbours(doc["asin"], edge), view["neighbours"], (doc["asin"], edge))
+        self.assertIsNone(graph.neighbours("nope", "also_bought"))
+        # A declared edge whose targets are all missing does not fall back.
+        self.assertEqual(graph.neighbours("P2", "also_bought"), [])
+
+    def test_saved_graph_memory_maps_and_answers_k_hop(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            build_related_graph(DOCS, meta={"collection": "products", "catalog_epoch": 3}).save(tmp)
+            graph = RelatedGraph.load(tmp)
+            self.assertEqual(graph.meta["catalog_epoch"], 3)
+            self.assertEqual(graph.k_hop("P1", "also_bought", 1), {"P1": 0, "P3": 1, "P2": 1})
+            # P3 has no also_bought edge, so it falls back to its category neighbours.
+            self.assertEqual(graph.hops_between("P1", "P4", "also_bought", 2), 2)
+            self.assertIsNone(graph.hops_between("P1", "P5", "also_bought", 5))
+            del graph
+
+    def test_resolver_uses_the_graph_without_the_collection(self) -> None:
+        graph = build_related_graph(DOCS)
+        self.assertEqual(_pick_graph_target(None, DOCS[0], "also_viewed", graph=graph), ("P3", "also_bought"))
+        self.assertEqual(_pick_graph_target(None, DOCS[2], "also_bought", graph=graph), ("P4", "bought_together"))
+        self.assertEqual(_pick_graph_target(None, DOCS[3], "also_bought", graph=graph), ("P1", "category_fallback"))
+        self.assertEqual(_pick_graph_target(None, DOCS[4], "also_bought", graph=graph), ("P1", "random_fallback"))
+
+    def test_collection_path_picks_the_same_targets_as_the_graph(self) -> None:
+        graph = build_related_graph(DOCS)
+        # Natural order differs from ASIN order, so only an explicit sort agrees with the graph.
+        col = _ListCollection(list(reversed(DOCS)))
+        for doc in DOCS:
+            for edge in ("also_bought", "bought_together", "also_viewed"):
+                self.assertEqual(_pick_graph_target(col, doc, edge), _pick_graph_target(None, doc, edge, graph=graph), (doc["asin"], edge))
+
+
+if __name__ == "__main__":
+    unittest.main()
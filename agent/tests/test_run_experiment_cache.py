@@ -0,0 +1,27 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from agentlab.cli.run_experiment import _PRIORS_CACHE, _cached
+from agentlab.control.priors import load_learned_priors
+
+
+class WarmCacheTest(unittest.TestCase):
+    def test_reloads_on_mtime_change_and_hands_out_copies(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "priors.json"
+            path.write_text(json.dumps({"by_workload_view": {"w": {"v": {"A": 1.0}}}}), encoding="utf-8")
+            first = _cached(_PRIORS_CACHE, path, load_learned_priors)
+            first["by_workload_view"]["w"]["v"]["A"] = 99.0
+            self.assertEqual(_cached(_PRIORS_CACHE, path, load_learned_priors)["by_workload_view"]["w"]["v"]["A"], 1.0)
+
+            path.write_text(json.dumps({"by_workload_view": {"w": {"v": {"A": 2.0}}}}), encoding="utf-8")
+            stat = path.stat()
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+            self.assertEqual(_cached(_PRIORS_CACHE, path, load_learned_priors)["by_workload_view"]["w"]["v"]["A"], 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
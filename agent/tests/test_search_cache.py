@@ -0,0 +1,39 @@
+import unittest
+
+from agentlab.env.search_cache import SearchCache, search_cache_key
+
+
+class SearchCacheTest(unittest.TestCase):
+    def test_key_normalizes_query_and_constraints(self) -> None:
+        a = search_cache_key("db.products", 1, "search", "USB  Cable", {"brand": "Anker", "category_leaf": None}, "relevance", 50)
+        b = search_cache_key("db.products", 1, "search", "usb cable", {"brand": "Anker"}, "relevance", 50)
+        self.assertEqual(a, b)
+        c = search_cache_key("db.products", 2, "search", "usb cable", {"brand": "Anker"}, "relevance", 50)
+        self.assertNotEqual(a, c)
+
+    def test_lru_eviction_and_counters(self) -> None:
+        cache = SearchCache(max_entries=2, ttl_s=60)
+        cache.put(("ns", 1, "a"), [1])
+        cache.put(("ns", 1, "b"), [2])
+        self.assertEqual(cache.get(("ns", 1, "a")), [1])
+        cache.put(("ns", 1, "c"), [3])
+        self.assertIsNone(cache.get(("ns", 1, "b")))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (1, 1, 1))
+
+    def test_new_epoch_drops_stale_entries(self) -> None:
+        cache = SearchCache()
+        cache.note_epoch("ns", 1)
+        cache.put(("ns", 1, "a"), [1])
+        cache.put(("other", 1, "a"), [1])
+        cache.note_epoch("ns", 2)
+        self.assertEqual(cache.stats()["entries"], 1)
+
+    def test_expired_entries_miss(self) -> None:
+        cache = SearchCache(ttl_s=-1.0)
+        cache.put(("ns", 1, "a"), [1])
+        self.assertIsNone(cache.get(("ns", 1, "a")))
+
+
+if __name__ == "__main__":
+    unittest.main()
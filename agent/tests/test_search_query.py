@@ -0,0 +1,99 @@
+import unittest
+
+from agentlab.env.search_query import (
+    bm25_idf,
+    bm25_score_expr,
+    decode_cursor,
+    faceted_search_pipeline,
+    keyset_filter,
+    parse_faceted_result,
+    query_filter,
+    query_tokens,
+    split_page,
+    tokenize,
+)
+
+
+class TextQueryTest(unittest.TestCase):
+    def test_tokens_are_normalized_and_regex_free(self) -> None:
+        self.assertEqual(tokenize("USB-C (2-Pack) cable.*"), ["usb", "c", "2", "pack", "cable"])
+        filt = query_filter("Cable cable [x]", {})
+        self.assertEqual(filt, {"$and": [{"search_tokens": {"$all": ["cable", "x"]}}]})
+
+    def test_rare_terms_weigh_more(self) -> None:
+        self.assertGreater(bm25_idf(1, 1000), bm25_idf(500, 1000))
+
+    def test_relevance_sort_uses_score_only_with_tokens(self) -> None:
+        score = bm25_score_expr(["cable"], {"doc_count": 10, "avg_len": 5.0, "df": {"cable": 2}})
+        pipeline = faceted_search_pipeline({}, "relevance", 5, score_expr=score)
+        results = pipeline[1]["$facet"]["results"]
+        self.assertIn("$addFields", results[0])
+        self.assertEqual(list(results[1]["$sort"]), ["_score", "rating_count", "asin"])
+        self.assertIsNone(bm25_score_expr([], {}))
+
+
+class FacetedSearchTest(unittest.TestCase):
+    def test_pipeline_is_single_match_then_facet(self) -> None:
+        filt = query_filter("usb c", {"brand": "Anker"})
+        pipeline = faceted_search_pipeline(filt, "price_asc", limit=10)
+        # Unscored orderings sort before $facet so the index can supply the order.
+        self.assertEqual([list(stage)[0] for stage in pipeline], ["$match", "$sort", "$facet"])
+        self.assertEqual(pipeline[1], {"$sort": {"price": 1, "asin": 1}})
+        branches = pipeline[2]["$facet"]
+        self.assertEqual(set(branches), {"results", "total", "brand", "category_leaf", "price_bucket"})
+        self.assertEqual([list(stage)[0] for stage in branches["results"]], ["$limit", "$project"])
+
+    def test_scored_pipeline_sorts_inside_facet(self) -> None:
+        tokens = query_tokens("usb c")
+        expr = bm25_score_expr(tokens, {"doc_count": 10, "avg_len": 3.0, "df": {t: 2 for t in tokens}})
+        pipeline = faceted_search_pipeline(query_filter("usb c", {}), "relevance", limit=10, score_expr=expr)
+        self.assertEqual([list(stage)[0] for stage in pipeline], ["$match", "$facet"])
+        self.assertIn("$sort", pipeline[1]["$facet"]["results"][1])
+
+    def test_parse_result(self) -> None:
+        rows = [
+            {
+                "results": [{"asin": "A1"}],
+                "total": [{"n": 7}],
+                "brand": [{"_id": "Anker", "count": 5}],
+                "category_leaf": [],
+                "price_bucket": [{"_id": 10, "count": 4}, {"_id": "5000+", "count": 1}],
+            }
+        ]
+        page = parse_faceted_result(rows)
+        self.assertEqual(page["total"], 7)
+        self.assertEqual(page["facets"]["brand"], [{"value": "Anker", "count": 5}])
+        self.assertEqual([p["value"] for p in page["facets"]["price_bucket"]], ["[10, 25)", "5000+"])
+
+    def test_empty_match_reports_zero_total(self) -> None:
+        page = parse_faceted_result([{"results": [], "total": []}])
+        self.assertEqual(page["total"], 0)
+        self.assertEqual(page["results"], [])
+
+
+class KeysetPaginationTest(unittest.TestCase):
+    def test_split_page_cursor_round_trips(self) -> None:
+        docs = [{"asin": f"A{i}", "price": 10.0 + i} for i in range(4)]
+        page, cursor = split_page(docs, 3, "price_asc", scored=False)
+        self.assertEqual([d["asin"] for d in page], ["A0", "A1", "A2"])
+        self.assertEqual(decode_cursor(cursor, "price_asc", scored=False), [12.0, "A2"])
+        self.assertIsNone(decode_cursor(cursor, "price_desc", scored=False))
+        self.assertIsNone(decode_cursor("not-a-cursor", "price_asc", scored=False))
+        self.assertEqual(split_page(docs, 4, "price_asc", scored=False), (docs, None))
+
+    def test_keyset_filter_breaks_ties_on_asin(self) -> None:
+        filt = keyset_filter("price_asc", [12.0, "A2"], scored=False)
+        self.assertEqual(
+            filt,
+            {"$or": [{"price": {"$gt": 12.0}}, {"$and": [{"price": 12.0}, {"asin": {"$gt": "A2"}}]}]},
+        )
+
+    def test_descending_keyset_keeps_missing_values(self) -> None:
+        filt = keyset_filter("price_desc", [12.0, "A2"], scored=False)
+        self.assertIn({"$or": [{"price": {"$lt": 12.0}}, {"price": None}]}, filt["$or"])
+        # Once the page has reached the null tail only the asin tie-break remains.
+        self.assertEqual(keyset_filter("price_desc", [None, "A2"], scored=False), {"$or": [{"$and": [{"price": None}, {"asin": {"$gt": "A2"}}]}]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+from agentlab.env.product_query import product_view_pipeline
+from agentlab.env.search_cache import search_cache
+from agentlab.env.search_query import BATCH_TAG, encode_cursor, union_pipeline
+from agentlab.env.vector_env import VectorSimazonEnv, step_requests
+
+
+class UnionPipelineTest(unittest.TestCase):
+    def test_branches_are_tagged_and_chained(self) -> None:
+        a = [{"$match": {"brand": "Acme"}}]
+        b = [{"$match": {"brand": "Other"}}]
+        stages = union_pipeline("products", [a, b])
+        self.assertEqual(stages[:2], [*a, {"$addFields": {BATCH_TAG: 0}}])
+        self.assertEqual(stages[2], {"$unionWith": {"coll": "products", "pipeline": [*b, {"$addFields": {BATCH_TAG: 1}}]}})
+
+    def test_product_view_for_many_asins(self) -> None:
+        stages = product_view_pipeline("products", ["P1", "P2"], "also_bought")
+        self.assertEqual(stages[0], {"$match": {"asin": {"$in": ["P1", "P2"]}}})
+        self.assertFalse(any("$limit" in s for s in stages[:2]))
+
+
+class VectorEnvTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.vec = VectorSimazonEnv("mongodb://localhost:27017/?serverSelectionTimeoutMS=100", num_envs=3, page_size=2)
+        self.vec._meta_synced = True
+        for lane in self.vec.envs:
+            lane._meta = {"epoch": 0}
+        self.page = {"results": [{"asin": "A1"}, {"asin": "A2"}], "total": 5, "facets": {}, "next_cursor": "c1"}
+        lane = self.vec.envs[0]
+        search_cache.put(lane._cache_key("faceted", "usb", {}, "price_asc", 2, 12, None), self.page)
+
+    def tearDown(self) -> None:
+        search_cache.clear()
+        self.vec.close()
+
+    def test_lanes_share_prefetched_pages_and_state_stays_per_lane(self) -> None:
+        sort = {"type": "SortBy", "args": {"key": "price_asc"}}
+        for lane in self.vec.envs:
+            lane.state.search_query = "usb"
+        out = self.vec.step({0: sort, 2: sort})
+        self.assertEqual(self.vec.round_trips, 0)
+        self.assertEqual(sorted(out), [0, 2])
+        self.assertEqual(out[0][0]["result_asins"], ("A1", "A2"))
+        self.assertTrue(out[2][0]["has_next_page"])
+        self.assertEqual(self.vec.envs[1].state.sort_key, "relevance")
+
+    def test_next_page_is_a_plain_search_and_keeps_page_one_totals(self) -> None:
+        lane = self.vec.envs[0]
+        cursor = encode_cursor({"asin": "A2", "price": 2.0}, "price_asc", False)
+        search_cache.put(lane._cache_key("faceted", "usb", {}, "price_asc", 2, 12, None), {**self.page, "facets": {"brand": [{"value": "Acme", "count": 5}]}, "next_cursor": cursor})
+        search_cache.put(lane._cache_key("search", "usb", {}, "price_asc", 3, cursor), [{"asin": "A3"}])
+        lane.state.search_query = "usb"
+        self.vec.step({0: {"type": "SortBy", "args": {"key": "price_asc"}}})
+        out = self.vec.step({0: {"type": "NextPage"}})
+        obs = out[0][0]
+        self.assertEqual(self.vec.round_trips, 0)
+        self.assertEqual((obs["page"], obs["result_asins"], obs["has_next_page"]), (2, ("A3",), False))
+        self.assertEqual(obs["result_total"], 5)
+        self.assertEqual(obs["facet_counts"]["brand"][0]["count"], 5)
+
+    def test_stale_cursor_returns_to_page_one(self) -> None:
+        lane = self.vec.envs[0]
+        lane.state.search_query = "usb"
+        self.vec.step({0: {"type": "SortBy", "args": {"key": "price_asc"}}})
+        # self.page's "c1" is not a cursor for this ordering.
+        obs = self.vec.step({0: {"type": "NextPage"}})[0][0]
+        self.assertEqual((obs["page"], obs["result_asins"]), (1, ("A1", "A2")))
+
+    def test_reset_rereads_the_catalog_epoch_for_every_lane(self) -> None:
+        planner = self.vec.envs[0]
+        planner._term_df["usb"] = 3
+        planner._find_meta = lambda: {"epoch": 2}
+        self.vec.reset({1: (None, None)})
+        self.assertEqual([lane._catalog_meta()["epoch"] for lane in self.vec.envs], [2, 2, 2])
+        self.assertEqual(self.vec.envs[2]._term_df, {})
+
+    def test_plan_mirrors_step(self) -> None:
+        lane = self.vec.envs[1]
+        lane.state.search_query = "usb"
+        lane.state.sort_key = "price_asc"
+        (req,) = step_requests(lane, {"type": "ApplyFacet", "args": {"facet": "brand", "value": "Acme"}})
+        self.assertEqual(req.constraints, {"brand": "Acme"})
+        self.assertEqual(lane.state.constraints, {})
+        self.assertEqual(step_requests(lane, {"type": "NextPage"}), [])
+        self.assertEqual(step_requests(lane, {"type": "AddToCart"}), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import argparse
+
+from ingest.snap_amazon.load_mongo import bump_catalog_epoch, ensure_indexes
+from ingest.snap_amazon.search_index import backfill_search_tokens, rebuild_term_stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill search tokens and BM25 term stats on an existing catalog.")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="simazon")
+    parser.add_argument("--collection", default="products")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    from pymongo import MongoClient
+
+    client = MongoClient(args.mongo_uri)
+    try:
+        db = client[args.db]
+        collection = db[args.collection]
+        ensure_indexes(collection)
+        updated = backfill_search_tokens(collection, batch_size=args.batch_size)
+        stats = rebuild_term_stats(db, args.collection)
+        bump_catalog_epoch(db, args.collection)
+    finally:
+        client.close()
+    print(
+        f"reindex_complete updated={updated} docs={stats['search_doc_count']} "
+        f"avg_len={stats['search_avg_len']:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+from datetime import datetime, timezone
 from typing import Iterable
 
+from ingest.snap_amazon.search_index import CATALOG_META_COLLECTION, rebuild_term_stats
+
 
 def _chunked(items: Iterable[dict], size: int) -> Iterable[list[dict]]:
     batch: list[dict] = []
@@ -16,11 +19,21 @@ def _chunked(items: Iterable[dict], size: int) -> Iterable[list[dict]]:
 
 def ensure_indexes(collection) -> None:
     collection.create_index("asin", unique=True, name="asin_unique")
-    collection.create_index("brand", name="brand_idx")
-    collection.create_index("category_leaf", name="category_leaf_idx")
+    collection.create_index([("brand", 1), ("asin", 1)], name="brand_asin_idx")
+    collection.create_index([("category_leaf", 1), ("asin", 1)], name="category_leaf_asin_idx")
     collection.create_index("price", name="price_idx")
     collection.create_index("rating_avg", name="rating_avg_idx")
     collection.create_index("rating_count", name="rating_count_idx")
+    collection.create_index("search_tokens", name="search_tokens_idx")
+
+
+def bump_catalog_epoch(db, collection_name: str) -> None:
+    # Storefront caches key derived data on this epoch; bump it after every load.
+    db[CATALOG_META_COLLECTION].update_one(
+        {"_id": collection_name},
+        {"$inc": {"epoch": 1}, "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}},
+        upsert=True,
+    )
 
 
 def load_products(
@@ -56,6 +69,9 @@ def load_products(
                 continue
             collection.bulk_write(ops, ordered=False)
             written += len(ops)
+        if written:
+            rebuild_term_stats(client[db_name], collection_name)
+            bump_catalog_epoch(client[db_name], collection_name)
         return written
     finally:
         client.close()
@@ -3,6 +3,9 @@ from __future__ import annotations
 import re
 from typing import Any
 
+# Must stay in sync with agentlab.env.search_query.tokenize.
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
 
 def _clean_price(value: Any) -> float | None:
     if value is None:
@@ -66,6 +69,11 @@ def _to_int(value: Any) -> int | None:
     return None
 
 
+def search_tokens(doc: dict[str, Any]) -> list[str]:
+    text = " ".join(str(doc.get(f) or "") for f in ("title", "brand", "category_leaf"))
+    return _TOKEN_RE.findall(text.lower())
+
+
 def normalize_record(record: dict[str, Any], source_file: str) -> dict[str, Any] | None:
     asin = record.get("parent_asin") or record.get("asin")
     title = record.get("title")
@@ -94,6 +102,8 @@ def normalize_record(record: dict[str, Any], source_file: str) -> dict[str, Any]
         },
     }
 
+    doc["search_tokens"] = search_tokens(doc)
+
     related = _normalize_related(record)
     if related:
         doc["related"] = related
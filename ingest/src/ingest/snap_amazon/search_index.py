@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from ingest.snap_amazon.normalize import search_tokens
+
+CATALOG_META_COLLECTION = "catalog_meta"
+
+
+def search_terms_collection(collection_name: str) -> str:
+    return f"{collection_name}_search_terms"
+
+
+def backfill_search_tokens(collection, batch_size: int = 1000) -> int:
+    """Write `search_tokens` onto documents loaded before the field existed."""
+    from pymongo import UpdateOne
+
+    written = 0
+    batch: list = []
+    cursor = collection.find({}, {"_id": 1, "title": 1, "brand": 1, "category_leaf": 1})
+    for doc in cursor:
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"search_tokens": search_tokens(doc)}}))
+        if len(batch) >= batch_size:
+            collection.bulk_write(batch, ordered=False)
+            written += len(batch)
+            batch = []
+    if batch:
+        collection.bulk_write(batch, ordered=False)
+        written += len(batch)
+    return written
+
+
+def rebuild_term_stats(db, collection_name: str) -> dict:
+    """Recompute BM25 corpus statistics (document frequency per token, avg length)."""
+    collection = db[collection_name]
+    terms = search_terms_collection(collection_name)
+    collection.aggregate(
+        [
+            {"$project": {"_id": 0, "t": {"$setUnion": [{"$ifNull": ["$search_tokens", []]}, []]}}},
+            {"$unwind": "$t"},
+            {"$group": {"_id": "$t", "df": {"$sum": 1}}},
+            {"$out": terms},
+        ],
+        allowDiskUse=True,
+    )
+    rows: Iterable[dict] = collection.aggregate(
+        [{"$group": {"_id": None, "n": {"$sum": 1}, "avg_len": {"$avg": {"$size": {"$ifNull": ["$search_tokens", []]}}}}}]
+    )
+    row = next(iter(rows), None) or {"n": 0, "avg_len": 0.0}
+    stats = {"search_doc_count": int(row["n"]), "search_avg_len": float(row["avg_len"] or 0.0)}
+    db[CATALOG_META_COLLECTION].update_one({"_id": collection_name}, {"$set": stats}, upsert=True)
+    return stats
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""Storefront load test: seed a synthetic catalog, start the API, replay an agent-like traffic mix.
+
+    python scripts/bench_storefront.py --products 20000 --concurrency 32 --duration 30 --out bench.json
+
+Pass --base-url to benchmark an already running deployment instead (seeding and
+server start are skipped). The report is JSON with p50/p95/p99 latency, error
+count and requests/sec per route.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import html
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ingest" / "src"))
+
+BRANDS = [f"Brand{i:02d}" for i in range(40)]
+CATEGORIES = [
+    "Cables", "Chargers", "Headphones", "Keyboards", "Mice", "Monitors", "Speakers", "Webcams",
+    "Routers", "Hard Drives", "Memory Cards", "Laptop Stands", "Phone Cases", "Smart Plugs",
+]
+WORDS = [
+    "usb", "wireless", "bluetooth", "portable", "fast", "charging", "premium", "compact", "ergonomic",
+    "gaming", "noise", "cancelling", "braided", "magnetic", "waterproof", "rechargeable", "slim", "pro",
+    "mini", "ultra", "hd", "4k", "dual", "smart", "travel", "heavy", "duty", "quiet", "rgb", "mechanical",
+]
+MIX_ROUTES = ("search", "facet", "product", "add", "cart", "next")
+DEFAULT_MIX = "search=35,facet=20,product=25,add=5,cart=10,next=5"
+
+
+def synthetic_records(n: int, seed: int) -> list[dict]:
+    """Raw records in the Amazon Reviews 2023 shape, so they go through the normal ingest path."""
+    rng = random.Random(seed)
+    asins = [f"B{seed % 100:02d}{i:08d}" for i in range(n)]
+    records = []
+    for asin in asins:
+        category = rng.choice(CATEGORIES)
+        record = {
+            "parent_asin": asin,
+            "title": " ".join(rng.sample(WORDS, rng.randint(3, 7)) + [category.lower()]),
+            "store": rng.choice(BRANDS),
+            "main_category": "Electronics",
+            "categories": ["Electronics", category],
+            "price": round(rng.lognormvariate(3.3, 0.9), 2) if rng.random() > 0.05 else None,
+            "average_rating": round(rng.uniform(1.0, 5.0), 1),
+            "rating_number": rng.randint(0, 20_000),
+        }
+        if rng.random() < 0.6:
+            record["bought_together"] = rng.sample(asins, rng.randint(1, 5))
+        records.append(record)
+    return records
+
+
+def seed_catalog(mongo_uri: str, db: str, n: int, seed: int) -> int:
+    from pymongo import MongoClient
+
+    from ingest.snap_amazon.load_mongo import load_products
+    from ingest.snap_amazon.normalize import normalize_record
+
+    client = MongoClient(mongo_uri)
+    try:
+        client.drop_database(db)
+    finally:
+        client.close()
+    docs = (normalize_record(r, "synthetic") for r in synthetic_records(n, seed))
+    return load_products((d for d in docs if d), mongo_uri=mongo_uri, db_name=db)
+
+
+def start_server(mongo_uri: str, db: str, port: int, workers: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "MONGO_URI": mongo_uri,
+        "MONGO_DB": db,
+        # Make the facet cache aggregate the synthetic catalog instead of reading a stale stats file.
+        "FACET_STATS_PATH": str(ROOT / "experiments" / "bench_no_facet_stats.json"),
+        "SESSION_BACKEND": os.environ.get("SESSION_BACKEND", "mongo" if workers > 1 else "memory"),
+        # The storefront imports its query engine from agentlab.
+        "PYTHONPATH": os.pathsep.join(p for p in (str(ROOT / "agent" / "src"), os.environ.get("PYTHONPATH")) if p),
+    }
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(cmd, cwd=ROOT / "services" / "api", env=env)
+
+
+async def wait_ready(client, base_url: str, timeout_s: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f"{base_url}/ui/static/simazon.css")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"server at {base_url} did not become ready within {timeout_s}s")
+
+
+def parse_mix(raw: str) -> dict[str, float]:
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - set(MIX_ROUTES)
+    if unknown:
+        raise SystemExit(f"unknown mix entries {sorted(unknown)}; expected {MIX_ROUTES}")
+    return mix
+
+
+class VirtualUser:
+    """One agent session: keeps the last results page around so product/add/next requests follow it."""
+
+    def __init__(self, uid: int, client, base_url: str, tier: str, rng: random.Random) -> None:
+        self.sid = f"bench{uid:04d}"
+        self.client = client
+        self.base_url = base_url
+        self.tier = tier
+        self.rng = rng
+        self.asins: list[str] = []
+        self.next_params: dict[str, str] | None = None
+
+    def _query(self) -> str:
+        return " ".join(self.rng.sample(WORDS, self.rng.randint(1, 2)))
+
+    async def _search(self, params: dict[str, str]) -> int:
+        if self.tier == "api":
+            resp = await self.client.get(f"{self.base_url}/search", params={**params, "fields": "asin"})
+            if resp.status_code == 200:
+                body = resp.json()
+                self.asins = [d["asin"] for d in body["results"]]
+                cursor = body.get("next_cursor")
+                self.next_params = {**params, "after": cursor} if cursor else None
+            return resp.status_code
+        resp = await self.client.get(f"{self.base_url}/ui/search", params={"sid": self.sid, **params})
+        if resp.status_code == 200:
+            self.asins = _attr_values(resp.text, 'data-testid="result-card" data-asin="')
+            hrefs = _attr_values(resp.text, 'data-testid="next-page" href="')
+            self.next_params = dict(parse_qsl(hrefs[0].partition("?")[2])) if hrefs else None
+        return resp.status_code
+
+    async def request(self, route: str) -> int:
+        if route == "search" or (route in ("product", "add", "next") and not self.asins):
+            return await self._search({"q": self._query(), "sort": self.rng.choice(["relevance", "price_asc", "rating_desc"])})
+        if route == "facet":
+            return await self._search({"q": self._query(), "sort": "relevance", "brand": self.rng.choice(BRANDS)})
+        if route == "next":
+            return await self._search(self.next_params or {"q": self._query(), "sort": "relevance"})
+        asin = self.rng.choice(self.asins)
+        if route == "product":
+            url = f"{self.base_url}/products/{asin}" if self.tier == "api" else f"{self.base_url}/ui/product/{asin}"
+            resp = await self.client.get(url, params={} if self.tier == "api" else {"sid": self.sid})
+        elif route == "add":
+            if self.tier == "api":
+                resp = await self.client.post(f"{self.base_url}/cart/items", params={"sid": self.sid, "asin": asin})
+            else:
+                resp = await self.client.get(f"{self.base_url}/ui/cart/add", params={"sid": self.sid, "asin": asin})
+        else:
+            url = f"{self.base_url}/cart" if self.tier == "api" else f"{self.base_url}/ui/cart"
+            resp = await self.client.get(url, params={"sid": self.sid})
+        return resp.status_code
+
+
+def _attr_values(text: str, marker: str) -> list[str]:
+    """Unescaped values of the attribute that ends `marker`, e.g. every result card's data-asin."""
+    out = []
+    start = text.find(marker)
+    while start != -1:
+        start += len(marker)
+        end = text.find('"', start)
+        out.append(html.unescape(text[start:end]))
+        start = text.find(marker, end)
+    return out
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile.
+    k = math.ceil(pct / 100.0 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, k))]
+
+
+def summarize(samples: dict[str, list[float]], errors: dict[str, int], elapsed_s: float) -> dict[str, dict]:
+    routes = {}
+    all_ms: list[float] = []
+    for route in sorted(set(samples) | set(errors)):
+        ms = sorted(samples.get(route, []))
+        all_ms.extend(ms)
+        routes[route] = _stats(ms, errors.get(route, 0), elapsed_s)
+    routes["ALL"] = _stats(sorted(all_ms), sum(errors.values()), elapsed_s)
+    return routes
+
+
+def _stats(ms: list[float], errors: int, elapsed_s: float) -> dict:
+    return {
+        "count": len(ms),
+        "errors": errors,
+        "rps": round(len(ms) / elapsed_s, 2) if elapsed_s else 0.0,
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "mean_ms": round(sum(ms) / len(ms), 2) if ms else 0.0,
+        "max_ms": round(ms[-1], 2) if ms else 0.0,
+    }
+
+
+async def run_load(args, base_url: str) -> dict:
+    try:
+        import httpx
+    except ModuleNotFoundError as exc:
+        raise ModuleNotFoundError("httpx is required for the storefront benchmark. Install with `pip install httpx`.") from exc
+
+    mix = parse_mix(args.mix)
+    routes, weights = list(mix), list(mix.values())
+    samples: dict[str, list[float]] = {r: [] for r in routes}
+    errors: dict[str, int] = {r: 0 for r in routes}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    headers = {"accept-encoding": "br, gzip"} if args.compression else {}
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout_s, headers=headers) as client:
+        await wait_ready(client, base_url)
+        measuring = False
+        stop_at = 0.0
+
+        async def worker(uid: int) -> None:
+            rng = random.Random(args.seed * 10_007 + uid)
+            user = VirtualUser(uid, client, base_url, args.tier, rng)
+            while time.monotonic() < stop_at:
+                route = rng.choices(routes, weights)[0]
+                t0 = time.perf_counter()
+                try:
+                    status = await user.request(route)
+                    ok = status < 400
+                except httpx.HTTPError:
+                    ok = False
+                elapsed_ms = (time.perf_counter() - t0) * 1000.0
+                if measuring:
+                    if ok:
+                        samples[route].append(elapsed_ms)
+                    else:
+                        errors[route] += 1
+
+        stop_at = time.monotonic() + args.warmup_s
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+        measuring = True
+        started = time.monotonic()
+        stop_at = started + args.duration_s
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+        elapsed = time.monotonic() - started
+    return summarize(samples, errors, elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the storefront with an agent-like traffic mix.")
+    parser.add_argument("--base-url", default=None, help="Benchmark a running server; skips seeding and startup.")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="simazon_bench")
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse an already seeded --db.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--tier", choices=["ui", "api"], default="ui")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted route mix, e.g. {DEFAULT_MIX}")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration-s", "--duration", type=float, default=30.0)
+    parser.add_argument("--warmup-s", type=float, default=3.0)
+    parser.add_argument("--timeout-s", type=float, default=30.0)
+    parser.add_argument("--no-compression", dest="compression", action="store_false")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default=None, help="Write the JSON report here as well as stdout.")
+    args = parser.parse_args()
+
+    server = None
+    seeded = None
+    base_url = args.base_url
+    if base_url is None:
+        if not args.skip_seed:
+            seeded = seed_catalog(args.mongo_uri, args.db, args.products, args.seed)
+        server = start_server(args.mongo_uri, args.db, args.port, args.workers)
+        base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        routes = asyncio.run(run_load(args, base_url.rstrip("/")))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "base_url": base_url,
+        "config": {
+            "tier": args.tier,
+            "mix": parse_mix(args.mix),
+            "concurrency": args.concurrency,
+            "duration_s": args.duration_s,
+            "warmup_s": args.warmup_s,
+            "workers": args.workers if args.base_url is None else None,
+            "products": seeded if seeded is not None else (None if args.base_url else "existing"),
+            "compression": args.compression,
+            "seed": args.seed,
+        },
+        "routes": routes,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -71,6 +71,11 @@ def _rating_buckets(col) -> list[dict]:
     return [{"value": d["_id"], "count": d["count"]} for d in col.aggregate(pipeline)]
 
 
+def _catalog_epoch(db, collection: str) -> int:
+    doc = db["catalog_meta"].find_one({"_id": collection}, {"epoch": 1})
+    return int(doc.get("epoch", 0)) if doc else 0
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Build facet stats for storefront defaults.")
     parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
@@ -87,6 +92,7 @@ def main() -> None:
             "generated_at": datetime.now(timezone.utc).isoformat(),
             "db": args.db,
             "collection": args.collection,
+            "catalog_epoch": _catalog_epoch(client[args.db], args.collection),
             "document_count": col.count_documents({}),
             "top_k": args.top_k,
             "facets": {
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from pymongo import MongoClient
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "agent" / "src"))
+
+from agentlab.env.related_graph import build_from_collection  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the memory-mappable related-item graph used by experiments.")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="simazon")
+    parser.add_argument("--collection", default="products")
+    parser.add_argument("--out", default="data/processed/related_graph")
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_uri)
+    try:
+        graph = build_from_collection(client[args.db][args.collection])
+    finally:
+        client.close()
+
+    graph.save(args.out)
+    print(f"wrote related graph: {args.out}")
+    print(f"nodes: {len(graph)} catalog_epoch: {graph.meta.get('catalog_epoch')}")
+    for edge, (indptr, _, declared) in sorted(graph.edges.items()):
+        print(f"edge {edge}: declared={int(declared.sum())} validated_edges={int(indptr[-1])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+# Ingest bumps `catalog_meta.{_id: <collection>}.epoch` after every load, so
+# anything derived from the products collection can be keyed on this number.
+CATALOG_META_COLLECTION = "catalog_meta"
+
+
+async def read_catalog_epoch(db, collection: str = "products") -> int:
+    doc = await db[CATALOG_META_COLLECTION].find_one({"_id": collection}, {"epoch": 1})
+    if not doc:
+        return 0
+    return int(doc.get("epoch", 0))
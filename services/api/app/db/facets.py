@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any
+
+from agentlab.env.search_query import FACET_FIELDS, facet_branches, parse_faceted_result
+
+from app.db.catalog import read_catalog_epoch
+from app.db.mongo import get_async_db
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CACHED_FACETS = (*FACET_FIELDS, "price_bucket")
+
+
+def _repo_root() -> Path:
+    # .../services/api/app/db/facets.py -> repo root at parents[4]
+    return Path(__file__).resolve().parents[4]
+
+
+def _stats_path() -> Path:
+    p = Path(settings.facet_stats_path)
+    return p if p.is_absolute() else _repo_root() / p
+
+
+class FacetCache:
+    """Query-independent facet counts, used when the search page has no filter.
+
+    Values are tagged with the catalog epoch they were computed from and are
+    recomputed by a background task when the epoch moves or the TTL expires.
+    """
+
+    def __init__(self, collection: str = "products", top_k: int = 50) -> None:
+        self.collection = collection
+        self.top_k = top_k
+        self.epoch: int | None = None
+        self.source = "empty"
+        self.loaded_at = 0.0
+        self.document_count: int | None = None
+        self._values: dict[str, list[dict[str, Any]]] = {f: [] for f in CACHED_FACETS}
+        self._task: asyncio.Task | None = None
+        self._refresh_lock = asyncio.Lock()
+
+    def top(self, field: str, limit: int = 12) -> list[str]:
+        return [row["value"] for row in self._values.get(field, [])[:limit]]
+
+    def counts(self, limit: int = 12) -> dict[str, list[dict[str, Any]]]:
+        return {f: rows[:limit] for f, rows in self._values.items()}
+
+    @property
+    def ready(self) -> bool:
+        return self.epoch is not None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "epoch": self.epoch,
+            "source": self.source,
+            "age_s": round(time.monotonic() - self.loaded_at, 3) if self.loaded_at else None,
+            "document_count": self.document_count,
+            "sizes": {f: len(v) for f, v in self._values.items()},
+        }
+
+    def _set(self, values: dict[str, list[dict[str, Any]]], document_count: int | None, epoch: int, source: str) -> None:
+        self._values = {f: list(values.get(f, [])) for f in CACHED_FACETS}
+        self.document_count = document_count
+        self.epoch = epoch
+        self.source = source
+        self.loaded_at = time.monotonic()
+
+    def _load_stats_file(self, epoch: int) -> bool:
+        path = _stats_path()
+        if not path.exists():
+            return False
+        text = path.read_text(encoding="utf-8")
+        if text.startswith("version https://git-lfs.github.com/spec/v1"):
+            return False
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            logger.warning("facet stats file is not valid JSON: %s", path)
+            return False
+        if data.get("db") not in {None, settings.mongo_db} or data.get("collection") not in {None, self.collection}:
+            return False
+        # Files written before epochs existed carry no epoch; trust them until the first TTL refresh.
+        file_epoch = data.get("catalog_epoch")
+        if file_epoch is not None and int(file_epoch) != epoch:
+            return False
+        facets = data.get("facets", {})
+        values = {
+            f: [{"value": str(row["value"]), "count": int(row.get("count", 0))} for row in facets.get(f, []) if row.get("value")]
+            for f in CACHED_FACETS
+        }
+        self._set(values, data.get("document_count"), epoch, "file")
+        return True
+
+    async def _aggregate(self) -> dict[str, Any]:
+        col = get_async_db()[self.collection]
+        branches = {"total": [{"$count": "n"}], **facet_branches(self.top_k)}
+        cursor = await col.aggregate([{"$facet": branches}])
+        return parse_faceted_result(await cursor.to_list())
+
+    async def refresh(self, force: bool = False) -> bool:
+        async with self._refresh_lock:
+            epoch = await read_catalog_epoch(get_async_db(), self.collection)
+            stale = time.monotonic() - self.loaded_at >= settings.facet_cache_ttl_s
+            if not force and not stale and epoch == self.epoch:
+                return False
+            page = await self._aggregate()
+            self._set(page["facets"], page["total"], epoch, "aggregate")
+            return True
+
+    async def warm(self) -> None:
+        try:
+            epoch = await read_catalog_epoch(get_async_db(), self.collection)
+            if not self._load_stats_file(epoch):
+                await self.refresh(force=True)
+        except Exception:
+            # A cold facet panel must not keep the storefront from starting.
+            logger.exception("facet cache warm-up failed")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.facet_cache_poll_s)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("facet cache refresh failed")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+facet_cache = FacetCache()
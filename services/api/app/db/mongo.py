@@ -1,9 +1,72 @@
-from pymongo import MongoClient
+from __future__ import annotations
 
+import threading
+from typing import Any
+
+from pymongo import AsyncMongoClient, MongoClient
+
+from app.metrics import mongo_command_metrics
 from app.settings import settings
 
+# One pooled client per driver flavour for the whole process. The sync client
+# serves admin/background code; the async client serves the /ui handlers.
+_client: MongoClient | None = None
+_async_client: AsyncMongoClient | None = None
+_LOCK = threading.Lock()
+
+
+def _client_options() -> dict[str, Any]:
+    return {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "maxIdleTimeMS": settings.mongo_max_idle_time_ms,
+        "connectTimeoutMS": settings.mongo_connect_timeout_ms,
+        "serverSelectionTimeoutMS": settings.mongo_server_selection_timeout_ms,
+        "socketTimeoutMS": settings.mongo_socket_timeout_ms,
+        "readPreference": settings.mongo_read_preference,
+        "appname": "simazon-api",
+        "event_listeners": [mongo_command_metrics],
+    }
+
+
+def get_client() -> MongoClient:
+    global _client
+    if _client is None:
+        with _LOCK:
+            if _client is None:
+                _client = MongoClient(settings.mongo_uri, **_client_options())
+    return _client
+
+
+def get_async_client() -> AsyncMongoClient:
+    global _async_client
+    if _async_client is None:
+        with _LOCK:
+            if _async_client is None:
+                _async_client = AsyncMongoClient(settings.mongo_uri, **_client_options())
+    return _async_client
+
 
 def get_db():
-    client = MongoClient(settings.mongo_uri)
-    return client[settings.mongo_db]
+    return get_client()[settings.mongo_db]
+
+
+def get_async_db():
+    return get_async_client()[settings.mongo_db]
+
+
+def open_clients() -> None:
+    get_client()
+    get_async_client()
+
 
+async def close_clients() -> None:
+    global _client, _async_client
+    with _LOCK:
+        client, async_client = _client, _async_client
+        _client = None
+        _async_client = None
+    if async_client is not None:
+        await async_client.close()
+    if client is not None:
+        client.close()
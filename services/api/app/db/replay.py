@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Any
+
+# Experiment reports are one JSON list of episodes, which gets large quickly
+# (every step carries its state_vars). The first replay request for a report
+# converts it into a SQLite sidecar next to it; after that, opening episode N
+# or a page of its steps only reads those rows. The sidecar records the
+# report's size and mtime and is rebuilt whenever the report is rewritten.
+
+SIDECAR_SUFFIX = ".replay.sqlite"
+SCHEMA_VERSION = 1
+MAX_STEP_PAGE = 200
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE episodes (idx INTEGER PRIMARY KEY, header TEXT NOT NULL, step_count INTEGER NOT NULL);
+CREATE TABLE steps (episode INTEGER NOT NULL, t INTEGER NOT NULL, body TEXT NOT NULL, PRIMARY KEY (episode, t)) WITHOUT ROWID;
+"""
+
+
+def sidecar_path(report: Path) -> Path:
+    return report.with_name(report.name + SIDECAR_SUFFIX)
+
+
+def _source_key(report: Path) -> str:
+    st = report.stat()
+    return f"{SCHEMA_VERSION}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def _read_source_key(sidecar: Path) -> str | None:
+    try:
+        with closing(sqlite3.connect(f"file:{sidecar}?mode=ro", uri=True)) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def build_sidecar(report: Path, sidecar: Path, source_key: str) -> None:
+    """Convert `report` into an indexed sidecar; raises ValueError if it is not a list of episodes."""
+    episodes = json.loads(report.read_text(encoding="utf-8"))
+    if not isinstance(episodes, list):
+        raise ValueError("replay file must contain a JSON list of episodes")
+    tmp = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    with closing(sqlite3.connect(tmp)) as conn:
+        conn.executescript(_SCHEMA)
+        for idx, ep in enumerate(episodes):
+            ep = ep if isinstance(ep, dict) else {}
+            steps = ep.get("steps") or []
+            header = {k: v for k, v in ep.items() if k != "steps"}
+            conn.execute("INSERT INTO episodes VALUES (?, ?, ?)", (idx, json.dumps(header), len(steps)))
+            conn.executemany(
+                "INSERT INTO steps VALUES (?, ?, ?)",
+                ((idx, t, json.dumps(step)) for t, step in enumerate(steps)),
+            )
+        conn.execute("INSERT INTO meta VALUES ('source', ?)", (source_key,))
+        conn.commit()
+    os.replace(tmp, sidecar)
+
+
+class ReplayIndex:
+    """Read-only view of one report's sidecar. Cheap to construct; each call opens its own connection."""
+
+    def __init__(self, sidecar: Path) -> None:
+        self.sidecar = sidecar
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.sidecar}?mode=ro", uri=True)
+
+    def episode_count(self) -> int:
+        with closing(self._connect()) as conn:
+            return int(conn.execute("SELECT COUNT(*) FROM episodes").fetchone()[0])
+
+    def episode(self, idx: int) -> dict[str, Any] | None:
+        """Episode metadata without its steps, plus `step_count`."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT header, step_count FROM episodes WHERE idx = ?", (idx,)).fetchone()
+        if row is None:
+            return None
+        return {**json.loads(row[0]), "step_count": int(row[1])}
+
+    def steps(self, idx: int, offset: int = 0, limit: int = 50) -> list[dict[str, Any]]:
+        limit = max(0, min(limit, MAX_STEP_PAGE))
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT body FROM steps WHERE episode = ? AND t >= ? ORDER BY t LIMIT ?",
+                (idx, max(0, offset), limit),
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+
+_lock = threading.Lock()
+_verified: dict[Path, str] = {}
+
+
+def open_replay(report: Path) -> ReplayIndex:
+    """Index for `report`, building or rebuilding its sidecar first if it is missing or stale.
+
+    Raises FileNotFoundError if `report` is not a regular file, ValueError if it
+    is not a list of episodes, and OSError/sqlite3.Error if the sidecar cannot be written.
+    """
+    report = report.resolve()
+    if not report.is_file():
+        raise FileNotFoundError(report)
+    sidecar = sidecar_path(report)
+    key = _source_key(report)
+    if _verified.get(sidecar) != key:
+        with _lock:
+            if _verified.get(sidecar) != key and _read_source_key(sidecar) != key:
+                build_sidecar(report, sidecar, key)
+            _verified[sidecar] = key
+    return ReplayIndex(sidecar)
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from typing import Any
+
+from agentlab.env.search_query import CATALOG_META_COLLECTION, search_terms_collection
+
+from app.db.mongo import get_async_db
+
+
+class TermStatsCache:
+    """BM25 corpus stats (doc count, avg length, per-token df), reset per catalog epoch."""
+
+    def __init__(self, collection: str = "products", max_terms: int = 200_000) -> None:
+        self.collection = collection
+        self.max_terms = max_terms
+        self.epoch: int | None = None
+        self._meta: dict[str, Any] | None = None
+        self._df: dict[str, int] = {}
+
+    async def get(self, tokens: list[str], epoch: int | None) -> dict[str, Any]:
+        if epoch != self.epoch or len(self._df) > self.max_terms:
+            self.epoch = epoch
+            self._meta = None
+            self._df = {}
+        db = get_async_db()
+        if self._meta is None:
+            meta = await db[CATALOG_META_COLLECTION].find_one({"_id": self.collection}) or {}
+            self._meta = {"doc_count": meta.get("search_doc_count", 0), "avg_len": meta.get("search_avg_len", 0.0)}
+        missing = [t for t in tokens if t not in self._df]
+        if missing:
+            rows = await db[search_terms_collection(self.collection)].find({"_id": {"$in": missing}}).to_list()
+            found = {row["_id"]: int(row.get("df", 0)) for row in rows}
+            for t in missing:
+                self._df[t] = found.get(t, 0)
+        return {**self._meta, "df": self._df}
+
+
+term_stats = TermStatsCache()
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import datetime as dt
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from pymongo import ReturnDocument
+
+from agentlab.env.search_cache import SearchCache
+
+from app.db.mongo import get_async_db
+from app.settings import settings
+
+
+@dataclass(frozen=True)
+class Cart:
+    sid: str
+    asins: tuple[str, ...] = ()
+    # Bumped on every mutation; lets renderers and ETags key on cart state cheaply.
+    version: int = 0
+
+
+class SessionStore(ABC):
+    """Per-session cart storage. Backends must make `add_to_cart` atomic."""
+
+    @abstractmethod
+    async def get_cart(self, sid: str) -> Cart: ...
+
+    @abstractmethod
+    async def add_to_cart(self, sid: str, asin: str, qty: int = 1) -> Cart:
+        """Append `qty` copies of `asin` as one mutation (one version bump)."""
+
+    async def close(self) -> None:
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": type(self).__name__}
+
+
+class MemorySessionStore(SessionStore):
+    """Bounded LRU + TTL store. Process-local: only safe with a single uvicorn worker."""
+
+    def __init__(self, max_sessions: int = 10_000, ttl_s: float = 86_400.0) -> None:
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self._carts: OrderedDict[str, tuple[float, Cart]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _get(self, sid: str, now: float) -> Cart:
+        entry = self._carts.get(sid)
+        if entry is None or now - entry[0] > self.ttl_s:
+            return Cart(sid)
+        return entry[1]
+
+    def _put(self, cart: Cart, now: float) -> None:
+        self._carts[cart.sid] = (now, cart)
+        self._carts.move_to_end(cart.sid)
+        while len(self._carts) > self.max_sessions:
+            self._carts.popitem(last=False)
+            self.evictions += 1
+
+    async def get_cart(self, sid: str) -> Cart:
+        now = time.monotonic()
+        with self._lock:
+            cart = self._get(sid, now)
+            if sid in self._carts:
+                self._put(cart, now)
+            return cart
+
+    async def add_to_cart(self, sid: str, asin: str, qty: int = 1) -> Cart:
+        now = time.monotonic()
+        with self._lock:
+            cart = self._get(sid, now)
+            cart = Cart(sid, cart.asins + (asin,) * qty, cart.version + 1)
+            self._put(cart, now)
+            return cart
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": type(self).__name__,
+                "sessions": len(self._carts),
+                "max_sessions": self.max_sessions,
+                "evictions": self.evictions,
+            }
+
+
+class MongoSessionStore(SessionStore):
+    """Shared store for multi-worker deployments; expiry is handled by a Mongo TTL index."""
+
+    def __init__(self, collection: str = "sessions", ttl_s: float = 86_400.0) -> None:
+        self.collection = collection
+        self.ttl_s = ttl_s
+        self._indexed = False
+
+    def _col(self):
+        return get_async_db()[self.collection]
+
+    async def _ensure_indexes(self) -> None:
+        if not self._indexed:
+            await self._col().create_index("updated_at", expireAfterSeconds=int(self.ttl_s), name="session_ttl")
+            self._indexed = True
+
+    @staticmethod
+    def _to_cart(sid: str, doc: dict[str, Any] | None) -> Cart:
+        if not doc:
+            return Cart(sid)
+        return Cart(sid, tuple(doc.get("cart", [])), int(doc.get("version", 0)))
+
+    async def get_cart(self, sid: str) -> Cart:
+        return self._to_cart(sid, await self._col().find_one({"_id": sid}))
+
+    async def add_to_cart(self, sid: str, asin: str, qty: int = 1) -> Cart:
+        await self._ensure_indexes()
+        doc = await self._col().find_one_and_update(
+            {"_id": sid},
+            {"$push": {"cart": {"$each": [asin] * qty}}, "$inc": {"version": 1}, "$set": {"updated_at": dt.datetime.now(dt.timezone.utc)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return self._to_cart(sid, doc)
+
+
+def build_session_store() -> SessionStore:
+    if settings.session_backend == "mongo":
+        return MongoSessionStore(ttl_s=settings.session_ttl_s)
+    if settings.session_backend != "memory":
+        raise ValueError(f"unknown SESSION_BACKEND {settings.session_backend!r} (expected 'memory' or 'mongo')")
+    return MemorySessionStore(max_sessions=settings.session_max_sessions, ttl_s=settings.session_ttl_s)
+
+
+session_store = build_session_store()
+
+# title/price per ASIN for cart rendering, shared across sessions and keyed by catalog epoch.
+_SUMMARY_FIELDS = {"_id": 0, "asin": 1, "title": 1, "price": 1}
+summary_cache = SearchCache(max_entries=50_000, ttl_s=3600.0)
+
+
+async def cart_summaries(cart: Cart, epoch: int | None, collection: str = "products") -> list[dict[str, Any]]:
+    """Distinct cart items in first-added order, querying only ASINs not already cached."""
+    namespace = f"{settings.mongo_db}.{collection}"
+    summary_cache.note_epoch(namespace, epoch)
+    unique = list(dict.fromkeys(cart.asins))
+    found: dict[str, dict[str, Any]] = {}
+    missing: list[str] = []
+    for asin in unique:
+        cached = summary_cache.get((namespace, epoch, "summary", asin))
+        if cached is None:
+            missing.append(asin)
+        else:
+            found[asin] = cached
+    if missing:
+        docs = await get_async_db()[collection].find({"asin": {"$in": missing}}, _SUMMARY_FIELDS).to_list()
+        for doc in docs:
+            found[doc["asin"]] = doc
+            summary_cache.put((namespace, epoch, "summary", doc["asin"]), doc)
+    return [found[a] for a in unique if a in found]
+
+
+async def cart_contents(cart: Cart, epoch: int | None, collection: str = "products") -> dict[str, Any]:
+    """JSON-ready cart: distinct items with quantities plus a subtotal over priced items."""
+    counts = Counter(cart.asins)
+    items = [{**doc, "qty": counts[doc["asin"]]} for doc in await cart_summaries(cart, epoch, collection)]
+    subtotal = sum(float(i["price"]) * i["qty"] for i in items if isinstance(i.get("price"), (int, float)))
+    return {"sid": cart.sid, "version": cart.version, "count": len(cart.asins), "items": items, "subtotal": round(subtotal, 2)}
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from typing import Any
+
+from agentlab.env.product_query import (
+    PRODUCT_PROJECTION,
+    parse_product_view,
+    product_cache,
+    product_cache_key,
+    product_view_pipeline,
+)
+from agentlab.env.search_cache import search_cache, search_cache_key
+from agentlab.env.search_query import (
+    SEARCH_PROJECTION,
+    bm25_score_expr,
+    decode_cursor,
+    faceted_search_pipeline,
+    is_scored,
+    parse_faceted_result,
+    query_filter,
+    query_tokens,
+    search_pipeline,
+    split_page,
+)
+
+from app.db.facets import facet_cache
+from app.db.mongo import get_async_db
+from app.db.search_stats import term_stats
+from app.settings import settings
+
+# The query engine behind both /ui and the JSON API, so an agent sees the same
+# results, cursors and caches whichever tier it drives.
+
+SORT_KEYS = ("relevance", "price_asc", "price_desc", "rating_desc")
+PRODUCT_FIELDS = tuple(k for k in PRODUCT_PROJECTION if k != "_id")
+SEARCH_FIELDS = tuple(k for k in SEARCH_PROJECTION if k != "_id")
+
+
+def parse_fields(raw: str, allowed: tuple[str, ...]) -> tuple[str, ...] | None:
+    """Comma-separated `fields=` value; None means "all". Raises ValueError on unknown names."""
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    if not fields:
+        return None
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(f"unknown fields {unknown}; expected a subset of {list(allowed)}")
+    return fields
+
+
+def select_fields(doc: dict[str, Any], fields: tuple[str, ...] | None) -> dict[str, Any]:
+    if fields is None:
+        return doc
+    return {k: doc[k] for k in ("asin", *fields) if k in doc}
+
+
+class InvalidCursor(ValueError):
+    """An `after` cursor that is malformed or belongs to another ordering."""
+
+
+def _namespace(collection: str = "products") -> str:
+    return f"{settings.mongo_db}.{collection}"
+
+
+async def search_page(
+    q: str,
+    brand: str | None,
+    category: str | None,
+    sort: str,
+    limit: int = 50,
+    after: str | None = None,
+) -> dict[str, Any]:
+    """One page of results with total, facets and `next_cursor`. Cached per catalog epoch.
+
+    Raises InvalidCursor when `after` cannot continue this query's ordering.
+    """
+    constraints = {"brand": brand, "category_leaf": category}
+    namespace = _namespace()
+    search_cache.note_epoch(namespace, facet_cache.epoch)
+    key = search_cache_key(namespace, facet_cache.epoch, "storefront", q, constraints, sort, limit, after)
+    cached = search_cache.get(key)
+    if cached is not None:
+        return cached
+
+    col = get_async_db()["products"]
+    filt = query_filter(q, constraints)
+    # An unfiltered page has the same facet counts and total as the whole catalog.
+    use_cached = not filt and facet_cache.ready
+    tokens = query_tokens(q)
+    score_expr = None
+    if sort == "relevance" and tokens:
+        score_expr = bm25_score_expr(tokens, await term_stats.get(tokens, facet_cache.epoch))
+    scored = is_scored(sort, score_expr)
+    after_values = decode_cursor(after, sort, scored)
+    if after and after_values is None:
+        raise InvalidCursor("cursor is malformed or was issued for a different sort order")
+    if use_cached or after_values is not None:
+        # A plain page query keeps the index-backed sort. Total and facets describe the
+        # whole match set: from facet_cache, or carried over from page 1 (normally cached).
+        cursor = await col.aggregate(search_pipeline(filt, sort, limit + 1, score_expr=score_expr, after=after_values))
+        page = {"results": await cursor.to_list()}
+        if use_cached:
+            page["total"], page["facets"] = facet_cache.document_count, facet_cache.counts()
+        else:
+            first = await search_page(q, brand, category, sort, limit)
+            page["total"], page["facets"] = first["total"], first["facets"]
+    else:
+        pipeline = faceted_search_pipeline(filt, sort, limit + 1, score_expr=score_expr)
+        cursor = await col.aggregate(pipeline)
+        page = parse_faceted_result(await cursor.to_list())
+    page["results"], page["next_cursor"] = split_page(page["results"], limit, sort, scored)
+    if page["total"] is None:
+        page["total"] = len(page["results"])
+    search_cache.put(key, page)
+    return page
+
+
+async def product_view(asin: str, edge: str) -> dict[str, Any] | None:
+    namespace = _namespace()
+    product_cache.note_epoch(namespace, facet_cache.epoch)
+    key = product_cache_key(namespace, facet_cache.epoch, asin, edge, False)
+    cached = product_cache.get(key)
+    if cached is not None:
+        return cached
+    cursor = await get_async_db()["products"].aggregate(product_view_pipeline("products", asin, edge, include_fallback=False))
+    view = parse_product_view(await cursor.to_list(), edge)
+    if view is not None:
+        product_cache.put(key, view)
+    return view
+
+
+async def products_by_asin(asins: list[str], fields: tuple[str, ...] = PRODUCT_FIELDS) -> list[dict[str, Any]]:
+    """Products for `asins` in request order, using one `$in` query. Unknown ASINs are skipped."""
+    projection = {"_id": 0, "asin": 1, **{f: 1 for f in fields}}
+    docs = await get_async_db()["products"].find({"asin": {"$in": asins}}, projection).to_list()
+    by_asin = {d["asin"]: d for d in docs}
+    return [by_asin[a] for a in dict.fromkeys(asins) if a in by_asin]
@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import datetime as dt
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+# Experiment subprocesses are expensive (a Mongo client, maybe a browser), so
+# admin submissions go through a bounded priority queue drained by a fixed
+# number of worker threads rather than each getting its own thread.
+
+TERMINAL_STATUSES = ("succeeded", "failed", "cancelled", "timed_out")
+_POLL_S = 0.5
+_KILL_GRACE_S = 10.0
+_TAIL_CHARS = 4000
+
+
+class QueueFull(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    cmd: list[str]
+    env: dict[str, str]
+    cwd: str
+    timeout_s: float
+    # Output goes straight to these files, so a multi-hour run never buffers in the API process.
+    stdout_path: str
+    stderr_path: str
+    # When set (and the queue has a warm executor) the job runs as `function(**kwargs)`
+    # in a child forked from the warm pool; `cmd` is then only the equivalent command line.
+    function: Callable[..., Any] | None = None
+    kwargs: dict[str, Any] = field(default_factory=dict)
+
+
+def _now() -> str:
+    return dt.datetime.now(dt.timezone.utc).isoformat()
+
+
+def tail_text(path: str | Path, max_chars: int = _TAIL_CHARS) -> str:
+    """Last `max_chars` characters (roughly; decoded from the last bytes) of a log file."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - max_chars))
+            return f.read().decode("utf-8", errors="replace")
+    except FileNotFoundError:
+        return ""
+
+
+def read_events(path: str | Path, offset: int = 0) -> tuple[list[dict[str, Any]], int]:
+    """Complete JSON lines appended to `path` since byte `offset`, and the offset to resume from."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], offset
+    end = data.rfind(b"\n") + 1
+    events = []
+    for line in data[:end].splitlines():
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            continue
+    return events, offset + end
+
+
+def last_event(path: str | Path, window: int = 65536) -> dict[str, Any] | None:
+    """Newest progress event, reading only the end of the file."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - window))
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return None
+    for line in reversed(lines):
+        try:
+            return json.loads(line)
+        except ValueError:
+            continue
+    return None
+
+
+def _call_in_child(
+    function: Callable[..., Any],
+    kwargs: dict[str, Any],
+    cwd: str,
+    env: dict[str, str],
+    stdout_path: str,
+    stderr_path: str,
+) -> None:
+    """Body of a forked job: same session, cwd, env and log files a subprocess job would get."""
+    os.setsid()
+    os.chdir(cwd)
+    os.environ.update(env)
+    for fd, path in ((1, stdout_path), (2, stderr_path)):
+        log_fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        os.dup2(log_fd, fd)
+        os.close(log_fd)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    function(**kwargs)
+
+
+class _ForkedProcess:
+    """Popen-shaped view of a multiprocessing child, so waiting and termination share one code path."""
+
+    def __init__(self, process: multiprocessing.process.BaseProcess) -> None:
+        self._process = process
+
+    @property
+    def pid(self) -> int:
+        return self._process.pid
+
+    @property
+    def returncode(self) -> int | None:
+        return self._process.exitcode
+
+    def wait(self, timeout: float | None = None) -> int:
+        self._process.join(timeout)
+        if self._process.exitcode is None:
+            raise subprocess.TimeoutExpired(f"pid {self.pid}", timeout)
+        return self._process.exitcode
+
+    def terminate(self) -> None:
+        self._process.terminate()
+
+    def kill(self) -> None:
+        self._process.kill()
+
+
+class WarmExecutor:
+    """Forks jobs from a long-lived forkserver that has already imported (and warmed) `preload`.
+
+    Each job is still its own process, so a crash, leak or cancellation stays
+    contained, but it starts from a copy of the warm server instead of a cold
+    interpreter.
+    """
+
+    def __init__(self, preload: list[str]) -> None:
+        self._ctx = multiprocessing.get_context("forkserver")
+        self._ctx.set_forkserver_preload(preload)
+
+    @staticmethod
+    def available() -> bool:
+        return "forkserver" in multiprocessing.get_all_start_methods()
+
+    def start(self) -> None:
+        """Launch the forkserver (and run the preloads) now rather than on the first job."""
+        from multiprocessing import forkserver
+
+        forkserver.ensure_running()
+
+    def spawn(self, job_id: str, spec: JobSpec) -> _ForkedProcess:
+        process = self._ctx.Process(
+            target=_call_in_child,
+            args=(spec.function, spec.kwargs, spec.cwd, spec.env, spec.stdout_path, spec.stderr_path),
+            name=f"job-{job_id}",
+            daemon=True,
+        )
+        process.start()
+        return _ForkedProcess(process)
+
+
+def _terminate(proc: subprocess.Popen | _ForkedProcess) -> None:
+    """SIGTERM the job's process group (it may have spawned a browser), then SIGKILL after a grace period."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGTERM)
+        else:
+            proc.terminate()
+        proc.wait(timeout=_KILL_GRACE_S)
+    except ProcessLookupError:
+        return
+    except subprocess.TimeoutExpired:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+
+
+class JobQueue:
+    """Priority (then FIFO) queue of subprocess jobs with a concurrency limit, timeouts and cancellation."""
+
+    def __init__(
+        self,
+        concurrency: int = 1,
+        max_queued: int = 50,
+        default_timeout_s: float = 3600.0,
+        executor: WarmExecutor | None = None,
+    ) -> None:
+        self.concurrency = max(1, concurrency)
+        self.max_queued = max_queued
+        self.default_timeout_s = default_timeout_s
+        self.executor = executor
+        self._jobs: dict[str, dict[str, Any]] = {}
+        self._specs: dict[str, JobSpec] = {}
+        self._procs: dict[str, subprocess.Popen | _ForkedProcess] = {}
+        self._heap: list[tuple[int, int, str]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._workers: list[threading.Thread] = []
+        self._stopping = False
+
+    # -- submission / inspection -------------------------------------------------
+
+    def submit(self, job_id: str, record: dict[str, Any], spec: JobSpec, priority: int = 0) -> dict[str, Any]:
+        with self._cond:
+            if len(self._queued_ids_locked()) >= self.max_queued:
+                raise QueueFull(f"{self.max_queued} jobs already queued")
+            self._ensure_workers_locked()
+            self._jobs[job_id] = {**record, "id": job_id, "status": "queued", "priority": priority, "timeout_s": spec.timeout_s}
+            self._specs[job_id] = spec
+            heapq.heappush(self._heap, (-priority, next(self._seq), job_id))
+            self._cond.notify()
+            return self._view_locked(job_id)
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        with self._cond:
+            return self._view_locked(job_id) if job_id in self._jobs else None
+
+    def list_jobs(self) -> list[dict[str, Any]]:
+        with self._cond:
+            return [self._view_locked(job_id) for job_id in self._jobs]
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            return {
+                "concurrency": self.concurrency,
+                "max_queued": self.max_queued,
+                "queued": len(self._queued_ids_locked()),
+                "running": sum(1 for j in self._jobs.values() if j["status"] == "running"),
+                "executor": "warm" if self.executor is not None else "subprocess",
+            }
+
+    def cancel(self, job_id: str) -> dict[str, Any] | None:
+        """Cancel a queued job immediately or signal a running one. Finished jobs are returned unchanged."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] == "queued":
+                job.update(status="cancelled", finished_at=_now())
+                self._specs.pop(job_id, None)
+            elif job["status"] == "running":
+                job["cancel_requested"] = True
+            return self._view_locked(job_id)
+
+    def warm(self) -> None:
+        if self.executor is not None:
+            self.executor.start()
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._stopping = True
+            for job_id in self._queued_ids_locked():
+                self._jobs[job_id].update(status="cancelled", finished_at=_now())
+            procs = list(self._procs.values())
+            self._cond.notify_all()
+        for proc in procs:
+            _terminate(proc)
+
+    # -- internals -----------------------------------------------------------------
+
+    def _queued_ids_locked(self) -> list[str]:
+        return [job_id for _, _, job_id in sorted(self._heap) if self._jobs[job_id]["status"] == "queued"]
+
+    def _view_locked(self, job_id: str) -> dict[str, Any]:
+        view = dict(self._jobs[job_id])
+        if view["status"] == "queued":
+            view["queue_position"] = self._queued_ids_locked().index(job_id) + 1
+        return view
+
+    def _ensure_workers_locked(self) -> None:
+        self._workers = [t for t in self._workers if t.is_alive()]
+        while len(self._workers) < self.concurrency:
+            t = threading.Thread(target=self._worker, name=f"job-worker-{len(self._workers)}", daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    def _next(self) -> str | None:
+        with self._cond:
+            while True:
+                if self._stopping:
+                    return None
+                while self._heap:
+                    _, _, job_id = heapq.heappop(self._heap)
+                    if self._jobs[job_id]["status"] == "queued":
+                        self._jobs[job_id].update(status="running", started_at=_now())
+                        return job_id
+                self._cond.wait()
+
+    def _worker(self) -> None:
+        while (job_id := self._next()) is not None:
+            self._run(job_id)
+
+    def _finish(self, job_id: str, **fields: Any) -> None:
+        with self._cond:
+            self._procs.pop(job_id, None)
+            self._jobs[job_id].update(finished_at=_now(), **fields)
+
+    def _start(self, job_id: str, spec: JobSpec) -> subprocess.Popen | _ForkedProcess:
+        if spec.function is not None and self.executor is not None:
+            return self.executor.spawn(job_id, spec)
+        with open(spec.stdout_path, "ab") as out, open(spec.stderr_path, "ab") as err:
+            return subprocess.Popen(
+                spec.cmd,
+                env=spec.env,
+                cwd=spec.cwd,
+                stdout=out,
+                stderr=err,
+                start_new_session=True,
+            )
+
+    def _run(self, job_id: str) -> None:
+        with self._cond:
+            spec = self._specs.pop(job_id)
+            self._jobs[job_id]["command"] = spec.cmd
+            self._jobs[job_id]["executor"] = "warm" if spec.function is not None and self.executor else "subprocess"
+        Path(spec.stdout_path).parent.mkdir(parents=True, exist_ok=True)
+        try:
+            proc = self._start(job_id, spec)
+        except OSError as exc:
+            self._finish(job_id, status="failed", returncode=None, stderr_tail=str(exc))
+            return
+        with self._cond:
+            self._procs[job_id] = proc
+            self._jobs[job_id]["pid"] = proc.pid
+
+        deadline = time.monotonic() + spec.timeout_s
+        outcome = None
+        while True:
+            try:
+                proc.wait(timeout=_POLL_S)
+                break
+            except subprocess.TimeoutExpired:
+                with self._cond:
+                    cancelled = self._jobs[job_id].get("cancel_requested") or self._stopping
+                if cancelled:
+                    outcome = "cancelled"
+                elif time.monotonic() > deadline:
+                    outcome = "timed_out"
+                if outcome:
+                    _terminate(proc)
+                    proc.wait()
+                    break
+
+        self._finish(
+            job_id,
+            status=outcome or ("succeeded" if proc.returncode == 0 else "failed"),
+            returncode=proc.returncode,
+            stdout_tail=tail_text(spec.stdout_path),
+            stderr_tail=tail_text(spec.stderr_path),
+        )
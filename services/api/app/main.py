@@ -1,23 +1,45 @@
-from pathlib import Path
+import asyncio
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 
 import app.routes.admin as admin
+import app.routes.artifacts as artifacts
 import app.routes.cart as cart
 import app.routes.checkout as checkout
 import app.routes.products as products
 import app.routes.search as search
 import app.routes.ui as ui
+from app.compression import CompressionMiddleware
+from app.db.facets import facet_cache
+from app.db.mongo import close_clients, open_clients
+from app.db.sessions import session_store
+from app.metrics import MetricsMiddleware
 
-app = FastAPI(title="simazon-api")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    open_clients()
+    await facet_cache.warm()
+    facet_cache.start()
+    await asyncio.to_thread(admin.job_queue.warm)
+    try:
+        yield
+    finally:
+        admin.job_queue.shutdown()
+        await facet_cache.stop()
+        await session_store.close()
+        await close_clients()
+
+
+app = FastAPI(title="simazon-api", lifespan=lifespan)
+app.add_middleware(CompressionMiddleware)
+# Added last so it is outermost and its timings include compression.
+app.add_middleware(MetricsMiddleware)
 app.include_router(search.router, prefix="/search", tags=["search"])
 app.include_router(products.router, prefix="/products", tags=["products"])
 app.include_router(cart.router, prefix="/cart", tags=["cart"])
 app.include_router(checkout.router, prefix="/checkout", tags=["checkout"])
 app.include_router(ui.router, tags=["ui"])
 app.include_router(admin.router)
-
-artifacts_dir = Path("experiments/artifacts")
-artifacts_dir.mkdir(parents=True, exist_ok=True)
-app.mount("/artifacts", StaticFiles(directory=artifacts_dir), name="artifacts")
+app.include_router(artifacts.router, tags=["artifacts"])
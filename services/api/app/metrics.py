@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+from pymongo import monitoring
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# In-process latency histograms for storefront requests and the Mongo commands
+# they issue, exported by /admin/metrics. Each uvicorn worker keeps its own
+# registry; scrape every worker (or run one) to see the full picture.
+
+BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Prometheus-style histogram with fixed upper bounds (seconds) plus +Inf."""
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS_S) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+
+    def observe(self, value_s: float, error: bool = False) -> None:
+        i = 0
+        while i < len(self.buckets) and value_s > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value_s
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate from bucket counts, interpolating linearly inside the bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "sum_s": round(self.sum, 6),
+            "mean_ms": round(1000.0 * self.sum / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(1000.0 * self.quantile(0.50), 3),
+            "p95_ms": round(1000.0 * self.quantile(0.95), 3),
+            "p99_ms": round(1000.0 * self.quantile(0.99), 3),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._families: dict[str, tuple[str, tuple[str, ...]]] = {}
+        self._series: dict[str, dict[tuple[str, ...], Histogram]] = {}
+
+    def histogram(self, name: str, help_text: str, labels: tuple[str, ...]) -> None:
+        with self._lock:
+            self._families[name] = (help_text, labels)
+            self._series.setdefault(name, {})
+
+    def observe(self, name: str, label_values: tuple[str, ...], value_s: float, error: bool = False) -> None:
+        with self._lock:
+            series = self._series[name]
+            hist = series.get(label_values)
+            if hist is None:
+                hist = series[label_values] = Histogram()
+            hist.observe(value_s, error)
+
+    def reset(self) -> None:
+        with self._lock:
+            for series in self._series.values():
+                series.clear()
+
+    def to_json(self) -> dict[str, list[dict[str, Any]]]:
+        with self._lock:
+            out = {}
+            for name, series in self._series.items():
+                labels = self._families[name][1]
+                rows = [{**dict(zip(labels, values)), **hist.snapshot()} for values, hist in series.items()]
+                out[name] = sorted(rows, key=lambda r: -r["sum_s"])
+            return out
+
+    def to_prometheus(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            for name, series in self._series.items():
+                help_text, labels = self._families[name]
+                rows = [(",".join(f'{k}="{_escape(v)}"' for k, v in zip(labels, values)), hist) for values, hist in sorted(series.items())]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for base, hist in rows:
+                    sep = "," if base else ""
+                    cumulative = 0
+                    for bound, n in zip((*hist.buckets, "+Inf"), hist.counts):
+                        cumulative += n
+                        lines.append(f'{name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+                    lines.append(f"{name}_sum{{{base}}} {hist.sum:.6f}")
+                    lines.append(f"{name}_count{{{base}}} {hist.count}")
+                # A `_total` sample is not part of the histogram type, so errors are their own counter family.
+                errors = f"{name}_errors_total"
+                lines.append(f"# HELP {errors} Observations of {name} that ended in an error.")
+                lines.append(f"# TYPE {errors} counter")
+                lines.extend(f"{errors}{{{base}}} {hist.errors}" for base, hist in rows)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+HTTP_METRIC = "simazon_http_request_duration_seconds"
+MONGO_METRIC = "simazon_mongo_command_duration_seconds"
+
+metrics = MetricsRegistry()
+metrics.histogram(HTTP_METRIC, "Storefront request latency by route template.", ("method", "route", "status"))
+metrics.histogram(MONGO_METRIC, "Mongo command latency by query shape.", ("command", "collection", "shape"))
+
+
+class MetricsMiddleware:
+    """Times each HTTP request up to its final body chunk, labelled by route template (not raw path)."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router records the matched route on the (shared) scope while dispatching.
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            metrics.observe(
+                HTTP_METRIC,
+                (scope["method"], template, str(status)),
+                time.perf_counter() - start,
+                error=status >= 500,
+            )
+
+
+_MONITORED_COMMANDS = {
+    "find",
+    "aggregate",
+    "getMore",
+    "findAndModify",
+    "insert",
+    "update",
+    "delete",
+    "count",
+    "distinct",
+    "createIndexes",
+}
+
+
+def query_shape(command_name: str, command: dict[str, Any]) -> str:
+    """A low-cardinality label for what a command is doing, e.g. `search_facets` or `asin_in`."""
+    if command_name == "aggregate":
+        stages = [next(iter(stage)) for stage in command.get("pipeline", []) if stage]
+        if "$facet" in stages:
+            return "search_facets"
+        if "$lookup" in stages:
+            return "product_view"
+        if "$match" in stages and "$sort" in stages:
+            return "search"
+        return "aggregate"
+    if command_name == "find":
+        filt = command.get("filter") or {}
+        for key, value in filt.items():
+            if isinstance(value, dict) and "$in" in value:
+                return f"{key}_in"
+        keys = ",".join(sorted(filt)) or "all"
+        return f"find_one:{keys}" if command.get("limit") == 1 or command.get("singleBatch") else f"find:{keys}"
+    return command_name
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Records driver-measured command durations; shape is derived from the command document at start."""
+
+    def __init__(self, max_pending: int = 10_000) -> None:
+        self.max_pending = max_pending
+        self._pending: dict[tuple[Any, int], tuple[str, str, str]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name not in _MONITORED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        labels = (event.command_name, str(collection), query_shape(event.command_name, event.command))
+        with self._lock:
+            if len(self._pending) < self.max_pending:
+                self._pending[(event.connection_id, event.request_id)] = labels
+
+    def _finish(self, event: Any, error: bool) -> None:
+        with self._lock:
+            labels = self._pending.pop((event.connection_id, event.request_id), None)
+        if labels is not None:
+            metrics.observe(MONGO_METRIC, labels, event.duration_micros / 1e6, error=error)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, error=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, error=True)
+
+
+mongo_command_metrics = MongoCommandMetrics()
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import hashlib
+import html
+from functools import lru_cache
+from string import Formatter
+from typing import Any, Sequence
+from urllib.parse import quote, urlencode
+
+# Rendering helpers for the /ui storefront. Agents depend on every data-testid and
+# on the view-id meta tag; keep them stable when editing templates here.
+
+_VIEW_COLORS = {
+    "HOME": "#ad2831",
+    "SEARCH_RESULTS": "#1d4ed8",
+    "EMPTY_RESULTS": "#1d4ed8",
+    "PRODUCT_DETAIL": "#0f766e",
+    "CART": "#b45309",
+}
+
+STYLESHEET = "\n".join(
+    [
+        "body { font-family: ui-sans-serif, system-ui, -apple-system, sans-serif; margin: 0; background: #f8fafc; }",
+        ".banner { background: #334155; color: white; padding: 12px 16px; font-weight: 700; }",
+        *(f".banner-{view} {{ background: {color}; }}" for view, color in _VIEW_COLORS.items()),
+        ".wrap { max-width: 1100px; margin: 16px auto; padding: 0 16px; }",
+        ".row { display: flex; gap: 16px; align-items: flex-start; }",
+        ".col { background: white; border: 1px solid #e2e8f0; border-radius: 10px; padding: 12px; }",
+        ".facet-col { width: 280px; }",
+        ".results-col { flex: 1; }",
+        ".card { border: 1px solid #cbd5e1; border-radius: 8px; padding: 10px; margin: 8px 0; background: #fff; }",
+        ".chip { display: inline-block; border: 1px solid #cbd5e1; border-radius: 999px; padding: 4px 8px; margin: 4px 4px 0 0; font-size: 12px; }",
+        ".btn { display: inline-block; border: 1px solid #94a3b8; border-radius: 6px; padding: 6px 10px; text-decoration: none; color: #111827; background: #f8fafc; margin-right: 6px; margin-top: 6px; }",
+        ".btn-primary { background: #2563eb; border-color: #2563eb; color: white; }",
+        ".muted { color: #64748b; font-size: 13px; }",
+        "input, select { padding: 6px 8px; border: 1px solid #cbd5e1; border-radius: 6px; }",
+        "",
+    ]
+)
+STYLESHEET_ETAG = hashlib.sha256(STYLESHEET.encode("utf-8")).hexdigest()[:16]
+STYLESHEET_HREF = f"/ui/static/simazon.css?v={STYLESHEET_ETAG}"
+
+
+class Template:
+    """`str.format`-style template whose placeholders are parsed once, at import time."""
+
+    def __init__(self, source: str) -> None:
+        self._parts: list[tuple[str, str | None]] = []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if spec or conversion:
+                raise ValueError(f"format specs are not supported in templates: {field!r}")
+            self._parts.append((literal, field))
+
+    def render(self, **values: Any) -> str:
+        out: list[str] = []
+        for literal, field in self._parts:
+            out.append(literal)
+            if field is not None:
+                out.append(str(values[field]))
+        return "".join(out)
+
+
+PAGE = Template(
+    """<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8" />
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <meta name="view-id" content="{view_id}" />
+  <title>Simazon {view_id}</title>
+  <link rel="stylesheet" href="{stylesheet}" />
+</head>
+<body>
+  <div class="banner banner-{view_id}" data-testid="view-banner">{view_id}</div>
+  <div class="wrap">
+    <div class="muted">session <span data-testid="session-id">{sid}</span></div>
+    <div class="muted">cart_count <span data-testid="cart-count">{cart_count}</span></div>
+    <div data-testid="cart-asins" data-asins="{cart_csv}" style="display:none"></div>
+    {body}
+  </div>
+</body>
+</html>"""
+)
+
+
+def page(view_id: str, sid: str, cart_asins: Sequence[str], body: str) -> str:
+    return PAGE.render(
+        view_id=view_id,
+        stylesheet=STYLESHEET_HREF,
+        sid=html.escape(sid),
+        cart_count=len(cart_asins),
+        cart_csv=html.escape(",".join(cart_asins)),
+        body=body,
+    )
+
+
+def qs(**params: Any) -> str:
+    """URL-encode `params` and HTML-escape the result, ready to drop into an href."""
+    return html.escape(urlencode(params, quote_via=quote))
+
+
+def option(value: str, selected: str) -> str:
+    return f'<option value="{value}" {"selected" if value == selected else ""}>{value}</option>'
+
+
+@lru_cache(maxsize=8192)
+def _card_parts(asin: str, title: str, brand: str, price: str, rating: str) -> tuple[str, str, str]:
+    # The rank and the per-request query suffix are the only request-dependent
+    # pieces of a result card, so everything around them is cached per product.
+    head = f"""
+            <div class="card" data-testid="result-card" data-asin="{html.escape(asin)}">
+              <div><strong>"""
+    mid = f""". {html.escape(title)}</strong></div>
+              <div class="muted">{html.escape(brand)} | ${price} | rating {rating}</div>
+              <a class="btn btn-primary" data-testid="open-product" href="/ui/product/{quote(asin)}?"""
+    tail = """">Open</a>
+            </div>
+            """
+    return head, mid, tail
+
+
+def result_card(rank: int, doc: dict[str, Any], nav_qs: str) -> str:
+    head, mid, tail = _card_parts(
+        str(doc.get("asin", "")),
+        str(doc.get("title", "")),
+        str(doc.get("brand", "")),
+        str(doc.get("price")),
+        str(doc.get("rating_avg")),
+    )
+    return f"{head}{rank}{mid}{nav_qs}{tail}"
+
+
+def render_stats() -> dict[str, Any]:
+    info = _card_parts.cache_info()
+    return {"card_fragments": {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max": info.maxsize}}
+
+
+HOME_BODY = Template(
+    """
+    <main data-testid="view-home">
+      <form action="/ui/search" method="get">
+        <input type="hidden" name="sid" value="{sid}" />
+        <input data-testid="search-input" name="q" value="" placeholder="Search products" />
+        <button data-testid="search-submit" class="btn btn-primary" type="submit">Search</button>
+      </form>
+      <a class="btn" data-testid="nav-cart" href="/ui/cart?{sid_qs}">Go to Cart</a>
+    </main>
+    """
+)
+
+SEARCH_BODY = Template(
+    """
+    <main data-testid="view-search-results">
+      <form action="/ui/search" method="get">
+        <input type="hidden" name="sid" value="{sid}" />
+        <input data-testid="search-input" name="q" value="{q}" />
+        <select data-testid="sort-select" name="sort">
+          {sort_options}
+        </select>
+        <button class="btn btn-primary" data-testid="search-submit" type="submit">Apply</button>
+      </form>
+      <a class="btn" data-testid="nav-cart" href="/ui/cart?{sid_qs}">Cart</a>
+      <div class="row">
+        <div class="col facet-col" data-testid="facet-panel">
+          <h4>Brand</h4>
+          {brand_chips}
+          <h4>Category</h4>
+          {category_chips}
+          <h4>Price</h4>
+          {price_chips}
+        </div>
+        <div class="col results-col" data-testid="results-list">
+          <div class="muted" data-testid="result-count">{total}</div>
+          {cards}
+          <div class="muted">page <span data-testid="page-number">{page_number}</span></div>
+          {next_link}
+        </div>
+      </div>
+    </main>
+    """
+)
+
+PRODUCT_BODY = Template(
+    """
+    <main data-testid="view-product-detail">
+      <div data-testid="product-asin">{asin}</div>
+      <h2 data-testid="product-title">{title}</h2>
+      <div data-testid="product-brand">{brand}</div>
+      <div data-testid="product-price">{price}</div>
+      <a class="btn btn-primary" data-testid="add-to-cart" href="/ui/cart/add?{add_qs}">Add To Cart</a>
+      <a class="btn" data-testid="back-to-results" href="/ui/search?{search_qs}">Back To Results</a>
+      <a class="btn" data-testid="nav-cart" href="/ui/cart?{sid_qs}">Cart</a>
+      <h4>Related ({edge})</h4>
+      <div data-testid="related-list">{related}</div>
+    </main>
+    """
+)
+
+CART_BODY = Template(
+    """
+    <main data-testid="view-cart">
+      <a class="btn" href="/ui?{sid_qs}">Home</a>
+      <div data-testid="cart-items">{rows}</div>
+      <div data-testid="cart-subtotal">{subtotal}</div>
+    </main>
+    """
+)
@@ -1,21 +1,53 @@
 from __future__ import annotations
 
+import asyncio
 import datetime as dt
+import json
 import os
-import subprocess
 import sys
-import threading
 import uuid
 from pathlib import Path
 from typing import Any
 
-from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from agentlab.cli.run_experiment import run_and_report
+from agentlab.env.product_query import product_cache
+from agentlab.env.search_cache import search_cache
+
+from app.db.facets import facet_cache
+from app.db.sessions import session_store, summary_cache
+from app.jobs import (
+    TERMINAL_STATUSES,
+    JobQueue,
+    JobSpec,
+    QueueFull,
+    WarmExecutor,
+    last_event,
+    read_events,
+    tail_text,
+)
+from app.metrics import metrics
+from app.render import render_stats
+from app.settings import settings
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
-_JOBS: dict[str, dict[str, Any]] = {}
-_LOCK = threading.Lock()
+_SSE_POLL_S = 0.5
+_SSE_KEEPALIVE_S = 15.0
+
+job_queue = JobQueue(
+    concurrency=settings.job_concurrency,
+    max_queued=settings.job_max_queued,
+    default_timeout_s=settings.job_timeout_s,
+    executor=(
+        WarmExecutor(["app.jobs", "agentlab.cli.warm"])
+        if settings.job_executor == "warm" and WarmExecutor.available()
+        else None
+    ),
+)
 
 
 class RunExperimentRequest(BaseModel):
@@ -27,6 +59,13 @@ class RunExperimentRequest(BaseModel):
     collection: str = "products"
     screenshot_base_url: str | None = None
     max_steps: int | None = None
+    engine: str = Field(default="mongo", pattern="^(mongo|columnar)$")
+    graph_index: str | None = None
+    batch_size: int = Field(default=1, ge=1, le=256)
+    concurrency: int = Field(default=1, ge=1, le=1024)
+    # Higher runs first; equal priorities run in submission order.
+    priority: int = 0
+    timeout_s: float | None = Field(default=None, gt=0)
 
 
 def _repo_root() -> Path:
@@ -51,54 +90,34 @@ def _require_admin(request: Request) -> None:
         raise HTTPException(status_code=401, detail="invalid admin token")
 
 
-def _run_job(job_id: str, payload: RunExperimentRequest) -> None:
+def _experiment_kwargs(payload: RunExperimentRequest, out: Path, summary: Path, progress: Path) -> dict[str, Any]:
+    """Arguments for `agentlab.cli.run_experiment.run_experiment`; the CLI flags are derived from these."""
     root = _repo_root()
-    with _LOCK:
-        out = Path(_JOBS[job_id]["out"])
-        summary = Path(_JOBS[job_id]["summary_out"])
-
-    cmd = [
-        sys.executable,
-        "-m",
-        "agentlab.cli.run_experiment",
-        "--config",
-        str(root / payload.config),
-        "--tasks-file",
-        str(root / payload.tasks_file),
-        "--catalog",
-        str(root / payload.catalog),
-        "--mongo-uri",
-        payload.mongo_uri or os.getenv("MONGO_URI", "mongodb://localhost:27017"),
-        "--db",
-        payload.mongo_db or os.getenv("MONGO_DB", "simazon"),
-        "--collection",
-        payload.collection,
-        "--screenshot-base-url",
-        payload.screenshot_base_url or os.getenv("SIMAZON_BASE_URL", ""),
-        "--out",
-        str(out),
-        "--summary-out",
-        str(summary),
-    ]
-    if payload.max_steps is not None:
-        # optional override via temp config is skipped for simplicity; keep contract stable.
-        pass
-
-    with _LOCK:
-        _JOBS[job_id]["status"] = "running"
-        _JOBS[job_id]["started_at"] = _now()
-        _JOBS[job_id]["command"] = cmd
+    return {
+        "config": str(root / payload.config),
+        "tasks_file": str(root / payload.tasks_file),
+        "catalog": str(root / payload.catalog),
+        "mongo_uri": payload.mongo_uri or os.getenv("MONGO_URI", "mongodb://localhost:27017"),
+        "db": payload.mongo_db or os.getenv("MONGO_DB", "simazon"),
+        "collection": payload.collection,
+        "screenshot_base_url": payload.screenshot_base_url or os.getenv("SIMAZON_BASE_URL", ""),
+        "out": str(out),
+        "summary_out": str(summary),
+        "progress_file": str(progress),
+        "max_steps": payload.max_steps,
+        "engine": payload.engine,
+        "graph_index": str(root / payload.graph_index) if payload.graph_index else None,
+        "batch_size": payload.batch_size,
+        "concurrency": payload.concurrency,
+    }
 
-    env = os.environ.copy()
-    env["PYTHONPATH"] = str(root / "agent" / "src")
-    proc = subprocess.run(cmd, env=env, cwd=str(root), capture_output=True, text=True)
 
-    with _LOCK:
-        _JOBS[job_id]["status"] = "succeeded" if proc.returncode == 0 else "failed"
-        _JOBS[job_id]["finished_at"] = _now()
-        _JOBS[job_id]["returncode"] = proc.returncode
-        _JOBS[job_id]["stdout_tail"] = (proc.stdout or "")[-4000:]
-        _JOBS[job_id]["stderr_tail"] = (proc.stderr or "")[-4000:]
+def _build_command(kwargs: dict[str, Any]) -> list[str]:
+    cmd = [sys.executable, "-m", "agentlab.cli.run_experiment"]
+    for key, value in kwargs.items():
+        if value is not None:
+            cmd += [f"--{key.replace('_', '-')}", str(value)]
+    return cmd
 
 
 @router.post("/run-experiment")
@@ -111,33 +130,163 @@ def run_experiment(payload: RunExperimentRequest, request: Request):
     stamp = dt.datetime.now(dt.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
     out = reports_dir / f"{job_id}_{stamp}.json"
     summary = reports_dir / f"{job_id}_{stamp}.summary.json"
-    with _LOCK:
-        _JOBS[job_id] = {
-            "id": job_id,
-            "status": "queued",
-            "created_at": _now(),
-            "payload": payload.model_dump(),
-            "out": str(out),
-            "summary_out": str(summary),
-            "replay_url": f"/ui/replay?file={out}",
-        }
-    t = threading.Thread(target=_run_job, args=(job_id, payload), daemon=True)
-    t.start()
-    return {"job_id": job_id, "status": "queued", "check_url": f"/admin/jobs/{job_id}"}
+    progress = reports_dir / f"{job_id}_{stamp}.progress.jsonl"
+    stdout_log = reports_dir / f"{job_id}_{stamp}.stdout.log"
+    stderr_log = reports_dir / f"{job_id}_{stamp}.stderr.log"
+    env = os.environ.copy()
+    env["PYTHONPATH"] = str(root / "agent" / "src")
+    kwargs = _experiment_kwargs(payload, out, summary, progress)
+    spec = JobSpec(
+        cmd=_build_command(kwargs),
+        env=env,
+        cwd=str(root),
+        timeout_s=payload.timeout_s or job_queue.default_timeout_s,
+        stdout_path=str(stdout_log),
+        stderr_path=str(stderr_log),
+        function=run_and_report,
+        kwargs=kwargs,
+    )
+    record = {
+        "created_at": _now(),
+        "payload": payload.model_dump(),
+        "out": str(out),
+        "summary_out": str(summary),
+        "progress_file": str(progress),
+        "stdout_log": str(stdout_log),
+        "stderr_log": str(stderr_log),
+        "replay_url": f"/ui/replay?file={out}",
+        "events_url": f"/admin/jobs/{job_id}/events",
+    }
+    try:
+        job = job_queue.submit(job_id, record, spec, priority=payload.priority)
+    except QueueFull as exc:
+        raise HTTPException(status_code=429, detail=str(exc)) from exc
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "queue_position": job.get("queue_position"),
+        "check_url": f"/admin/jobs/{job_id}",
+        "events_url": f"/admin/jobs/{job_id}/events",
+    }
 
 
 @router.get("/jobs")
 def list_jobs(request: Request):
     _require_admin(request)
-    with _LOCK:
-        return {"jobs": list(_JOBS.values())}
+    return {"jobs": job_queue.list_jobs(), "queue": job_queue.stats()}
 
 
 @router.get("/jobs/{job_id}")
 def get_job(job_id: str, request: Request):
     _require_admin(request)
-    with _LOCK:
-        job = _JOBS.get(job_id)
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="job not found")
+    return {**job, "progress": last_event(job["progress_file"])}
+
+
+def _sse(event: str, data: dict[str, Any], event_id: int | None = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """Server-sent events: `progress` per finished episode, `status` on state changes, then `end`.
+
+    Event ids are progress line numbers, so a reconnecting client sending
+    Last-Event-ID only receives the episodes it missed.
+    """
+    _require_admin(request)
+    if job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    try:
+        resume_after = int(request.headers.get("last-event-id", ""))
+    except ValueError:
+        resume_after = 0
+
+    async def stream():
+        offset, line_no, last_status, idle = 0, 0, None, 0.0
+        while True:
+            job = job_queue.get(job_id)
+            events, offset = read_events(job["progress_file"], offset)
+            for event in events:
+                line_no += 1
+                if line_no > resume_after:
+                    yield _sse("progress", event, line_no)
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield _sse("status", {k: job.get(k) for k in ("status", "queue_position", "returncode")})
+            if job["status"] in TERMINAL_STATUSES and not events:
+                yield _sse("end", {"status": job["status"]})
+                return
+            if await request.is_disconnected():
+                return
+            idle = 0.0 if events else idle + _SSE_POLL_S
+            if idle >= _SSE_KEEPALIVE_S:
+                idle = 0.0
+                yield ": keepalive\n\n"
+            await asyncio.sleep(_SSE_POLL_S)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/jobs/{job_id}/logs")
+def job_logs(
+    job_id: str,
+    request: Request,
+    stream: str = Query(default="stdout", pattern="^(stdout|stderr)$"),
+    tail: int = Query(default=4000, ge=1, le=1_000_000),
+):
+    _require_admin(request)
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="job not found")
+    return PlainTextResponse(tail_text(job[f"{stream}_log"], tail))
+
+
+@router.delete("/jobs/{job_id}")
+def cancel_job(job_id: str, request: Request):
+    _require_admin(request)
+    job = job_queue.get(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="job not found")
-    return job
+    if job["status"] in TERMINAL_STATUSES:
+        raise HTTPException(status_code=409, detail=f"job already {job['status']}")
+    return job_queue.cancel(job_id)
+
+
+@router.get("/caches")
+def cache_stats(request: Request):
+    _require_admin(request)
+    return {
+        "search": search_cache.stats(),
+        "product": product_cache.stats(),
+        "facets": facet_cache.stats(),
+        "cart_summaries": summary_cache.stats(),
+        "sessions": session_store.stats(),
+        **render_stats(),
+    }
+
+
+@router.delete("/caches")
+def clear_caches(request: Request):
+    _require_admin(request)
+    search_cache.clear()
+    product_cache.clear()
+    return {"cleared": ["search", "product"]}
+
+
+@router.get("/metrics")
+def get_metrics(request: Request, format: str = Query(default="prometheus", pattern="^(prometheus|json)$")):
+    _require_admin(request)
+    if format == "json":
+        return metrics.to_json()
+    return PlainTextResponse(metrics.to_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@router.delete("/metrics")
+def reset_metrics(request: Request):
+    _require_admin(request)
+    metrics.reset()
+    return {"reset": True}
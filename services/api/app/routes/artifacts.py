@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import FileResponse, Response
+
+from app.compression import etag_matches
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Screenshot artifacts are written once per (session, step) and never rewritten,
+# so originals and their derivatives are served with a content-hash ETag and a
+# year-long cache lifetime. Derivatives are rendered on first request and kept
+# under `.derived/` inside the artifacts directory.
+ARTIFACT_WIDTHS = (320, 960)
+ARTIFACT_FORMATS = {"png": "image/png", "webp": "image/webp"}
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+DERIVED_DIR = ".derived"
+# WebP cannot encode images taller than this; full-page shots are cropped to it.
+WEBP_MAX_DIM = 16383
+
+
+@lru_cache(maxsize=16384)
+def _content_hash(path: str, size: int, mtime_ns: int) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:32]
+
+
+def strong_etag(path: Path) -> str:
+    st = path.stat()
+    return f'"{_content_hash(str(path), st.st_size, st.st_mtime_ns)}"'
+
+
+def derivative_path(root: Path, src: Path, width: int | None, fmt: str) -> Path:
+    rel = src.relative_to(root)
+    suffix = f".w{width}" if width else ""
+    return root / DERIVED_DIR / rel.parent / f"{rel.name}{suffix}.{fmt}"
+
+
+def render_derivative(src: Path, out: Path, width: int | None, fmt: str) -> bool:
+    """Write a resized/re-encoded copy of `src` to `out`; False if Pillow can't produce it."""
+    try:
+        from PIL import Image
+    except ModuleNotFoundError:
+        logger.warning("Pillow is not installed; serving original artifacts only")
+        return False
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(f"{out.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with Image.open(src) as img:
+            img = img.convert("RGB")
+            if width and img.width > width:
+                img = img.resize((width, max(1, round(img.height * width / img.width))), Image.Resampling.LANCZOS)
+            if fmt == "webp":
+                img = img.crop((0, 0, min(img.width, WEBP_MAX_DIM), min(img.height, WEBP_MAX_DIM)))
+                img.save(tmp, format="WEBP", quality=80, method=4)
+            else:
+                img.save(tmp, format="PNG", optimize=True)
+    except OSError:
+        logger.warning("could not render %s derivative of %s", fmt, src, exc_info=True)
+        tmp.unlink(missing_ok=True)
+        return False
+    os.replace(tmp, out)
+    return True
+
+
+@router.get("/artifacts/{path:path}")
+def get_artifact(
+    path: str,
+    request: Request,
+    w: int | None = Query(default=None),
+    fmt: str | None = Query(default=None),
+):
+    root = Path(settings.artifacts_dir).resolve()
+    src = (root / path).resolve()
+    if not src.is_relative_to(root) or not src.is_file() or DERIVED_DIR in src.relative_to(root).parts:
+        return Response(status_code=404)
+    if w is not None and w not in ARTIFACT_WIDTHS:
+        return Response(f"w must be one of {ARTIFACT_WIDTHS}", status_code=400)
+    if fmt is not None and fmt not in ARTIFACT_FORMATS:
+        return Response(f"fmt must be one of {tuple(ARTIFACT_FORMATS)}", status_code=400)
+
+    target, media_type = src, None
+    if w is not None or fmt is not None:
+        out_fmt = fmt or "png"
+        out = derivative_path(root, src, w, out_fmt)
+        fresh = out.exists() and out.stat().st_mtime_ns >= src.stat().st_mtime_ns
+        if fresh or render_derivative(src, out, w, out_fmt):
+            target, media_type = out, ARTIFACT_FORMATS[out_fmt]
+
+    headers = {"ETag": strong_etag(target), "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    # FileResponse handles Range / If-Range against the ETag above.
+    return FileResponse(target, media_type=media_type, headers=headers)
@@ -1,14 +1,24 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 
-router = APIRouter()
+from app.db.facets import facet_cache
+from app.db.sessions import cart_contents, session_store
+from app.db.storefront import products_by_asin
+
+# Same session carts as /ui/cart: a sid used here shows up in the storefront and vice versa.
+router = APIRouter(default_response_class=ORJSONResponse)
+
+MAX_QTY = 20
 
 
 @router.get("")
-def get_cart():
-    return {"items": [], "count": 0}
+async def get_cart(sid: str = Query(...)):
+    return await cart_contents(await session_store.get_cart(sid), facet_cache.epoch)
 
 
 @router.post("/items")
-def add_item(asin: str, qty: int = 1):
-    return {"asin": asin, "qty": qty}
-
+async def add_item(sid: str = Query(...), asin: str = Query(...), qty: int = Query(default=1, ge=1, le=MAX_QTY)):
+    if not await products_by_asin([asin], ()):
+        raise HTTPException(status_code=404, detail="product not found")
+    cart = await session_store.add_to_cart(sid, asin, qty)
+    return await cart_contents(cart, facet_cache.epoch)
@@ -1,9 +1,34 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 
-router = APIRouter()
+from app.db.storefront import PRODUCT_FIELDS, parse_fields, product_view, products_by_asin, select_fields
 
+router = APIRouter(default_response_class=ORJSONResponse)
+
+MAX_BULK_ASINS = 100
+
+
+def _fields(raw: str) -> tuple[str, ...] | None:
+    try:
+        return parse_fields(raw, PRODUCT_FIELDS)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-@router.get("/{asin}")
-def get_product(asin: str):
-    return {"asin": asin}
 
+@router.get("")
+async def get_products(asin: str = Query(..., description="comma-separated ASINs"), fields: str = ""):
+    asins = list(dict.fromkeys(a.strip() for a in asin.split(",") if a.strip()))
+    if not asins or len(asins) > MAX_BULK_ASINS:
+        raise HTTPException(status_code=400, detail=f"asin must list 1 to {MAX_BULK_ASINS} ASINs")
+    docs = await products_by_asin(asins, _fields(fields) or PRODUCT_FIELDS)
+    found = {d["asin"] for d in docs}
+    return {"products": docs, "missing": [a for a in asins if a not in found]}
+
+
+@router.get("/{asin}")
+async def get_product(asin: str, edge: str = "also_bought", fields: str = ""):
+    keep = _fields(fields)
+    view = await product_view(asin, edge)
+    if view is None:
+        raise HTTPException(status_code=404, detail="product not found")
+    return {"product": select_fields(view["product"], keep), "edge": edge, "related": view["related"]}
@@ -1,9 +1,36 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 
-router = APIRouter()
+from app.db.storefront import SEARCH_FIELDS, SORT_KEYS, InvalidCursor, parse_fields, search_page, select_fields
 
+router = APIRouter(default_response_class=ORJSONResponse)
 
-@router.get("")
-def search(q: str = "", sort: str = "relevance"):
-    return {"query": q, "sort": sort, "results": []}
 
+@router.get("")
+async def search(
+    q: str = "",
+    sort: str = "relevance",
+    brand: str = "",
+    category: str = "",
+    limit: int = Query(default=50, ge=1, le=200),
+    after: str = "",
+    fields: str = "",
+):
+    if sort not in SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {list(SORT_KEYS)}")
+    try:
+        keep = parse_fields(fields, SEARCH_FIELDS)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    try:
+        page = await search_page(q, brand or None, category or None, sort, limit=limit, after=after or None)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {
+        "query": q,
+        "sort": sort,
+        "total": page["total"],
+        "results": [select_fields(d, keep) for d in page["results"]],
+        "facets": page["facets"],
+        "next_cursor": page["next_cursor"],
+    }
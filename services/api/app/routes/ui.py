@@ -1,206 +1,149 @@
 from __future__ import annotations
 
+import hashlib
 import html
 import json
+import sqlite3
 import uuid
 from pathlib import Path
-from typing import Any
+from urllib.parse import quote, urlencode
 
 from fastapi import APIRouter, Query, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
 
-from app.db.mongo import get_db
+from agentlab.env import product_query, search_query
+
+from app import render
+from app.compression import etag_matches
+from app.db import storefront
+from app.db.facets import facet_cache
+from app.db.replay import MAX_STEP_PAGE, open_replay
+from app.db.sessions import Cart, cart_summaries, session_store
+from app.db.storefront import SORT_KEYS, InvalidCursor, product_view, search_page
+from app.settings import settings
 
 router = APIRouter()
 
-# Lightweight in-memory cart store for local experimentation.
-_CARTS: dict[str, list[str]] = {}
-
-_VIEW_COLORS = {
-    "HOME": "#ad2831",
-    "SEARCH_RESULTS": "#1d4ed8",
-    "EMPTY_RESULTS": "#1d4ed8",
-    "PRODUCT_DETAIL": "#0f766e",
-    "CART": "#b45309",
-}
-
-
-def _cart_for(sid: str) -> list[str]:
-    return _CARTS.setdefault(sid, [])
-
-
-def _base_html(view_id: str, sid: str, cart_asins: list[str], body: str) -> str:
-    color = _VIEW_COLORS.get(view_id, "#334155")
-    cart_count = len(cart_asins)
-    cart_csv = ",".join(cart_asins)
-    return f"""<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <meta name="view-id" content="{view_id}" />
-  <title>Simazon {view_id}</title>
-  <style>
-    body {{ font-family: ui-sans-serif, system-ui, -apple-system, sans-serif; margin: 0; background: #f8fafc; }}
-    .banner {{ background: {color}; color: white; padding: 12px 16px; font-weight: 700; }}
-    .wrap {{ max-width: 1100px; margin: 16px auto; padding: 0 16px; }}
-    .row {{ display: flex; gap: 16px; align-items: flex-start; }}
-    .col {{ background: white; border: 1px solid #e2e8f0; border-radius: 10px; padding: 12px; }}
-    .facet-col {{ width: 280px; }}
-    .results-col {{ flex: 1; }}
-    .card {{ border: 1px solid #cbd5e1; border-radius: 8px; padding: 10px; margin: 8px 0; background: #fff; }}
-    .chip {{ display: inline-block; border: 1px solid #cbd5e1; border-radius: 999px; padding: 4px 8px; margin: 4px 4px 0 0; font-size: 12px; }}
-    .btn {{ display: inline-block; border: 1px solid #94a3b8; border-radius: 6px; padding: 6px 10px; text-decoration: none; color: #111827; background: #f8fafc; margin-right: 6px; margin-top: 6px; }}
-    .btn-primary {{ background: #2563eb; border-color: #2563eb; color: white; }}
-    .muted {{ color: #64748b; font-size: 13px; }}
-    input, select {{ padding: 6px 8px; border: 1px solid #cbd5e1; border-radius: 6px; }}
-  </style>
-</head>
-<body>
-  <div class="banner" data-testid="view-banner">{view_id}</div>
-  <div class="wrap">
-    <div class="muted">session <span data-testid="session-id">{sid}</span></div>
-    <div class="muted">cart_count <span data-testid="cart-count">{cart_count}</span></div>
-    <div data-testid="cart-asins" data-asins="{html.escape(cart_csv)}" style="display:none"></div>
-    {body}
-  </div>
-</body>
-</html>"""
-
-
-def _search_docs(
-    q: str,
-    brand: str | None,
-    category: str | None,
-    sort: str,
-    limit: int = 50,
-) -> list[dict[str, Any]]:
-    db = get_db()
-    col = db["products"]
-    and_parts: list[dict[str, Any]] = []
-    tokens = [t for t in q.strip().split() if t]
-    for t in tokens:
-        rx = {"$regex": t, "$options": "i"}
-        and_parts.append({"$or": [{"title": rx}, {"brand": rx}, {"category_leaf": rx}]})
-    if brand:
-        and_parts.append({"brand": brand})
-    if category:
-        and_parts.append({"category_leaf": category})
-    filt = {"$and": and_parts} if and_parts else {}
-
-    cursor = col.find(
-        filt,
-        {"_id": 0, "asin": 1, "title": 1, "brand": 1, "price": 1, "rating_avg": 1, "category_leaf": 1},
-    )
-    if sort == "price_asc":
-        cursor = cursor.sort([("price", 1), ("asin", 1)])
-    elif sort == "rating_desc":
-        cursor = cursor.sort([("rating_avg", -1), ("asin", 1)])
-    else:
-        cursor = cursor.sort([("rating_count", -1), ("asin", 1)])
-    return list(cursor.limit(limit))
-
-
-def _top_values(field: str, limit: int = 12) -> list[str]:
-    db = get_db()
-    col = db["products"]
-    rows = list(
-        col.aggregate(
-            [
-                {"$match": {field: {"$type": "string", "$ne": ""}}},
-                {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
-                {"$sort": {"count": -1}},
-                {"$limit": limit},
-            ]
-        )
+# Storefront pages are a pure function of (code, catalog epoch, URL, cart), so
+# that tuple is their validator; hashing the sources of everything that shapes a
+# page (routes, templates, query engine) makes a deploy invalidate pages browsers
+# already hold.
+_PAGE_SOURCES = (__file__, render.__file__, storefront.__file__, search_query.__file__, product_query.__file__)
+_PAGE_VERSION = hashlib.sha256(b"".join(Path(p).read_bytes() for p in _PAGE_SOURCES)).hexdigest()[:12]
+_PAGE_CACHE_CONTROL = "private, no-cache"
+
+
+def _page_etag(request: Request, cart: Cart) -> str:
+    raw = "|".join(
+        (_PAGE_VERSION, str(facet_cache.epoch), request.url.path, request.url.query, str(cart.version), ",".join(cart.asins))
     )
-    return [r["_id"] for r in rows]
+    return f'"{hashlib.sha256(raw.encode("utf-8")).hexdigest()[:24]}"'
+
+
+def _not_modified(request: Request, etag: str) -> Response | None:
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": _PAGE_CACHE_CONTROL})
+    return None
+
+
+def _html(content: str, etag: str) -> HTMLResponse:
+    return HTMLResponse(content, headers={"ETag": etag, "Cache-Control": _PAGE_CACHE_CONTROL})
+
+
+@router.get("/ui/static/simazon.css")
+def ui_stylesheet(request: Request):
+    headers = {"Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{render.STYLESHEET_ETAG}"'}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(render.STYLESHEET, media_type="text/css", headers=headers)
 
 
 @router.get("/ui", response_class=HTMLResponse)
-def ui_home(sid: str = Query(default="")):
-    sid = sid or uuid.uuid4().hex[:8]
-    cart = _cart_for(sid)
-    body = f"""
-    <main data-testid="view-home">
-      <form action="/ui/search" method="get">
-        <input type="hidden" name="sid" value="{sid}" />
-        <input data-testid="search-input" name="q" value="" placeholder="Search products" />
-        <button data-testid="search-submit" class="btn btn-primary" type="submit">Search</button>
-      </form>
-      <a class="btn" data-testid="nav-cart" href="/ui/cart?sid={sid}">Go to Cart</a>
-    </main>
-    """
-    return HTMLResponse(_base_html("HOME", sid, cart, body))
+async def ui_home(request: Request, sid: str = Query(default="")):
+    if not sid:
+        # A fresh session id per request: nothing to revalidate.
+        sid = uuid.uuid4().hex[:8]
+        body = render.HOME_BODY.render(sid=html.escape(sid), sid_qs=render.qs(sid=sid))
+        return HTMLResponse(render.page("HOME", sid, (), body), headers={"Cache-Control": "no-store"})
+    cart = await session_store.get_cart(sid)
+    etag = _page_etag(request, cart)
+    if (cached := _not_modified(request, etag)) is not None:
+        return cached
+    body = render.HOME_BODY.render(sid=html.escape(sid), sid_qs=render.qs(sid=sid))
+    return _html(render.page("HOME", sid, cart.asins, body), etag)
 
 
 @router.get("/ui/search", response_class=HTMLResponse)
-def ui_search(
+async def ui_search(
+    request: Request,
     sid: str = Query(...),
     q: str = Query(default=""),
     sort: str = Query(default="relevance"),
     brand: str = Query(default=""),
     category: str = Query(default=""),
+    page_no: int = Query(default=1, alias="page", ge=1),
+    after: str = Query(default=""),
 ):
-    cart = _cart_for(sid)
-    results = _search_docs(q, brand or None, category or None, sort)
-    brands = _top_values("brand")
-    categories = _top_values("category_leaf")
+    cart = await session_store.get_cart(sid)
+    etag = _page_etag(request, cart)
+    if (cached := _not_modified(request, etag)) is not None:
+        return cached
+    # Later pages are keyset-paginated: `after` is the opaque cursor of the previous page's last row.
+    page_size = settings.ui_page_size
+    try:
+        page = await search_page(q, brand or None, category or None, sort, limit=page_size, after=after or None)
+    except InvalidCursor:
+        # A stale or hand-edited link: show page 1 and number it as such.
+        after = ""
+        page = await search_page(q, brand or None, category or None, sort, limit=page_size)
+    results = page["results"]
+    facet_counts = page["facets"]
     view_id = "SEARCH_RESULTS" if results else "EMPTY_RESULTS"
 
-    facets = "".join(
-        f'<a class="chip" data-testid="facet-brand-{html.escape(b)}" href="/ui/search?sid={sid}&q={html.escape(q)}&sort={sort}&brand={html.escape(b)}&category={html.escape(category)}">{html.escape(b)}</a>'
-        for b in brands
+    # Escape the request-scoped parts of every link once, not once per card/chip.
+    base_qs = render.qs(sid=sid, q=q, sort=sort)
+    nav_qs = f"{base_qs}&amp;{render.qs(brand=brand, category=category)}"
+    brand_tail = render.qs(category=category)
+    category_prefix = render.qs(brand=brand)
+
+    brand_chips = "".join(
+        f'<a class="chip" data-testid="facet-brand-{html.escape(b["value"])}" href="/ui/search?{base_qs}&amp;{render.qs(brand=b["value"])}&amp;{brand_tail}">{html.escape(b["value"])} <span class="muted">({b["count"]})</span></a>'
+        for b in facet_counts.get("brand", [])
     )
-    categories_html = "".join(
-        f'<a class="chip" data-testid="facet-category-{html.escape(c)}" href="/ui/search?sid={sid}&q={html.escape(q)}&sort={sort}&brand={html.escape(brand)}&category={html.escape(c)}">{html.escape(c)}</a>'
-        for c in categories
+    category_chips = "".join(
+        f'<a class="chip" data-testid="facet-category-{html.escape(c["value"])}" href="/ui/search?{base_qs}&amp;{category_prefix}&amp;{render.qs(category=c["value"])}">{html.escape(c["value"])} <span class="muted">({c["count"]})</span></a>'
+        for c in facet_counts.get("category_leaf", [])
     )
-    cards = []
-    for i, r in enumerate(results, start=1):
-        asin = r.get("asin", "")
-        cards.append(
-            f"""
-            <div class="card" data-testid="result-card" data-asin="{html.escape(asin)}">
-              <div><strong>{i}. {html.escape(str(r.get("title", "")))}</strong></div>
-              <div class="muted">{html.escape(str(r.get("brand", "")))} | ${r.get("price")} | rating {r.get("rating_avg")}</div>
-              <a class="btn btn-primary" data-testid="open-product" href="/ui/product/{html.escape(asin)}?sid={sid}&q={html.escape(q)}&sort={sort}&brand={html.escape(brand)}&category={html.escape(category)}">Open</a>
-            </div>
-            """
-        )
+    price_chips = "".join(
+        f'<span class="chip" data-testid="facet-price-{html.escape(p["value"])}">{html.escape(p["value"])} <span class="muted">({p["count"]})</span></span>'
+        for p in facet_counts.get("price_bucket", [])
+    )
+    # Ranks stay page-local so OpenResult(rank) means the same thing on every page.
+    cards = "".join(render.result_card(i, r, nav_qs) for i, r in enumerate(results, start=1))
+    next_link = ""
+    if page["next_cursor"]:
+        next_qs = f"{nav_qs}&amp;{render.qs(page=page_no + 1 if after else 2, after=page['next_cursor'])}"
+        next_link = f'<a class="btn" data-testid="next-page" href="/ui/search?{next_qs}">Next page</a>'
 
-    body = f"""
-    <main data-testid="view-search-results">
-      <form action="/ui/search" method="get">
-        <input type="hidden" name="sid" value="{sid}" />
-        <input data-testid="search-input" name="q" value="{html.escape(q)}" />
-        <select data-testid="sort-select" name="sort">
-          <option value="relevance" {"selected" if sort=="relevance" else ""}>relevance</option>
-          <option value="price_asc" {"selected" if sort=="price_asc" else ""}>price_asc</option>
-          <option value="rating_desc" {"selected" if sort=="rating_desc" else ""}>rating_desc</option>
-        </select>
-        <button class="btn btn-primary" data-testid="search-submit" type="submit">Apply</button>
-      </form>
-      <a class="btn" data-testid="nav-cart" href="/ui/cart?sid={sid}">Cart</a>
-      <div class="row">
-        <div class="col facet-col" data-testid="facet-panel">
-          <h4>Brand</h4>
-          {facets}
-          <h4>Category</h4>
-          {categories_html}
-        </div>
-        <div class="col results-col" data-testid="results-list">
-          <div class="muted" data-testid="result-count">{len(results)}</div>
-          {"".join(cards) if cards else '<div data-testid="empty-results-message">No results</div>'}
-        </div>
-      </div>
-    </main>
-    """
-    return HTMLResponse(_base_html(view_id, sid, cart, body))
+    body = render.SEARCH_BODY.render(
+        sid=html.escape(sid),
+        q=html.escape(q),
+        sort_options="".join(render.option(v, sort) for v in SORT_KEYS),
+        sid_qs=render.qs(sid=sid),
+        brand_chips=brand_chips,
+        category_chips=category_chips,
+        price_chips=price_chips,
+        total=page["total"],
+        page_number=page_no if after else 1,
+        next_link=next_link,
+        cards=cards or '<div data-testid="empty-results-message">No results</div>',
+    )
+    return _html(render.page(view_id, sid, cart.asins, body), etag)
 
 
 @router.get("/ui/product/{asin}", response_class=HTMLResponse)
-def ui_product(
+async def ui_product(
+    request: Request,
     asin: str,
     sid: str = Query(...),
     edge: str = Query(default="also_bought"),
@@ -209,115 +152,189 @@ def ui_product(
     brand: str = Query(default=""),
     category: str = Query(default=""),
 ):
-    cart = _cart_for(sid)
-    db = get_db()
-    product = db["products"].find_one({"asin": asin}, {"_id": 0})
-    if not product:
-        return HTMLResponse(_base_html("PRODUCT_DETAIL", sid, cart, f"<main>Product {html.escape(asin)} not found</main>"), status_code=404)
-
-    related = product.get("related") if isinstance(product.get("related"), dict) else {}
-    related_raw = related.get(edge, [])
-    if isinstance(related_raw, str):
-        related_asins = [related_raw]
-    elif isinstance(related_raw, list):
-        related_asins = [str(a) for a in related_raw if str(a).strip()]
-    else:
-        related_asins = []
-    if related_asins:
-        related_docs = list(
-            db["products"].find({"asin": {"$in": related_asins}}, {"_id": 0, "asin": 1, "title": 1}).limit(10)
-        )
-    else:
-        related_docs = []
+    cart = await session_store.get_cart(sid)
+    etag = _page_etag(request, cart)
+    if (cached := _not_modified(request, etag)) is not None:
+        return cached
+    view = await product_view(asin, edge)
+    if not view:
+        return HTMLResponse(render.page("PRODUCT_DETAIL", sid, cart.asins, f"<main>Product {html.escape(asin)} not found</main>"), status_code=404)
+    product = view["product"]
+    related_docs = view["related"][:10]
 
+    search_params = {"sid": sid, "q": q, "sort": sort, "brand": brand, "category": category}
+    product_params = {"sid": sid, "edge": edge, "q": q, "sort": sort, "brand": brand, "category": category}
+    product_qs = render.qs(**product_params)
     related_html = "".join(
-        f'<a class="chip" data-testid="related-item" data-asin="{html.escape(r["asin"])}" href="/ui/product/{html.escape(r["asin"])}?sid={sid}&edge={edge}&q={html.escape(q)}&sort={sort}&brand={html.escape(brand)}&category={html.escape(category)}">{html.escape(r["title"][:60])}</a>'
+        f'<a class="chip" data-testid="related-item" data-asin="{html.escape(r["asin"])}" href="/ui/product/{quote(r["asin"])}?{product_qs}">{html.escape(str(r.get("title", ""))[:60])}</a>'
         for r in related_docs
     )
-    body = f"""
-    <main data-testid="view-product-detail">
-      <div data-testid="product-asin">{html.escape(str(product.get("asin", "")))}</div>
-      <h2 data-testid="product-title">{html.escape(str(product.get("title", "")))}</h2>
-      <div data-testid="product-brand">{html.escape(str(product.get("brand", "")))}</div>
-      <div data-testid="product-price">{product.get("price")}</div>
-      <a class="btn btn-primary" data-testid="add-to-cart" href="/ui/cart/add?sid={sid}&asin={html.escape(asin)}&next=/ui/product/{html.escape(asin)}?sid={sid}&edge={edge}&q={html.escape(q)}&sort={sort}&brand={html.escape(brand)}&category={html.escape(category)}">Add To Cart</a>
-      <a class="btn" data-testid="back-to-results" href="/ui/search?sid={sid}&q={html.escape(q)}&sort={sort}&brand={html.escape(brand)}&category={html.escape(category)}">Back To Results</a>
-      <a class="btn" data-testid="nav-cart" href="/ui/cart?sid={sid}">Cart</a>
-      <h4>Related ({html.escape(edge)})</h4>
-      <div data-testid="related-list">{related_html or '<span class="muted">None</span>'}</div>
-    </main>
-    """
-    return HTMLResponse(_base_html("PRODUCT_DETAIL", sid, cart, body))
+    next_url = f"/ui/product/{quote(asin)}?{urlencode(product_params, quote_via=quote)}"
+    body = render.PRODUCT_BODY.render(
+        asin=html.escape(str(product.get("asin", ""))),
+        title=html.escape(str(product.get("title", ""))),
+        brand=html.escape(str(product.get("brand", ""))),
+        price=product.get("price"),
+        add_qs=render.qs(sid=sid, asin=asin, next=next_url),
+        search_qs=render.qs(**search_params),
+        sid_qs=render.qs(sid=sid),
+        edge=html.escape(edge),
+        related=related_html or '<span class="muted">None</span>',
+    )
+    return _html(render.page("PRODUCT_DETAIL", sid, cart.asins, body), etag)
 
 
 @router.get("/ui/cart/add")
-def ui_cart_add(sid: str, asin: str, next: str = "/ui"):
-    cart = _cart_for(sid)
-    cart.append(asin)
+async def ui_cart_add(sid: str, asin: str, next: str = "/ui"):
+    await session_store.add_to_cart(sid, asin)
     return RedirectResponse(next)
 
 
 @router.get("/ui/cart", response_class=HTMLResponse)
-def ui_cart(sid: str = Query(...)):
-    cart = _cart_for(sid)
-    db = get_db()
-    docs = list(db["products"].find({"asin": {"$in": cart}}, {"_id": 0, "asin": 1, "title": 1, "price": 1}))
+async def ui_cart(request: Request, sid: str = Query(...)):
+    cart = await session_store.get_cart(sid)
+    etag = _page_etag(request, cart)
+    if (cached := _not_modified(request, etag)) is not None:
+        return cached
+    docs = await cart_summaries(cart, facet_cache.epoch)
     rows = "".join(
-        f'<div class="card" data-testid="cart-item" data-asin="{html.escape(d["asin"])}"><strong>{html.escape(d["title"][:80])}</strong><div>${d.get("price")}</div></div>'
+        f'<div class="card" data-testid="cart-item" data-asin="{html.escape(d["asin"])}"><strong>{html.escape(str(d.get("title", ""))[:80])}</strong><div>${d.get("price")}</div></div>'
         for d in docs
     )
-    body = f"""
-    <main data-testid="view-cart">
-      <a class="btn" href="/ui?sid={sid}">Home</a>
-      <div data-testid="cart-items">{rows or '<span class="muted">Empty cart</span>'}</div>
-      <div data-testid="cart-subtotal">0.0</div>
-    </main>
-    """
-    return HTMLResponse(_base_html("CART", sid, cart, body))
+    body = render.CART_BODY.render(
+        sid_qs=render.qs(sid=sid),
+        rows=rows or '<span class="muted">Empty cart</span>',
+        subtotal="0.0",
+    )
+    return _html(render.page("CART", sid, cart.asins, body), etag)
+
+
+_REPLAY_STEP_PAGE = 50
+_REPLAY_SHOT_WIDTH = 960
+
+
+def _replay_error(message: str, status_code: int, as_json: bool) -> Response:
+    if as_json:
+        return JSONResponse({"detail": message}, status_code=status_code)
+    return HTMLResponse(f"<h3>{html.escape(message)}</h3>", status_code=status_code)
+
+
+def _repo_root() -> Path:
+    # .../services/api/app/routes/ui.py -> repo root at parents[4]
+    return Path(__file__).resolve().parents[4]
+
+
+def _replay_index(file: str, as_json: bool = False):
+    # Relative paths are relative to the repo root, wherever uvicorn was started from.
+    root = (_repo_root() / settings.reports_dir).resolve()
+    path = (_repo_root() / file).resolve()
+    # Only reports under reports_dir: opening one writes a sidecar next to it.
+    if not path.is_relative_to(root) or not path.is_file():
+        return None, _replay_error(f"Replay file not found: {file}", 404, as_json)
+    try:
+        index = open_replay(path)
+    except FileNotFoundError:
+        return None, _replay_error(f"Replay file not found: {file}", 404, as_json)
+    except ValueError:
+        return None, _replay_error("Replay file has no episodes", 400, as_json)
+    except (OSError, sqlite3.Error):
+        return None, _replay_error("Replay file could not be indexed", 500, as_json)
+    return index, None
 
 
 @router.get("/ui/replay", response_class=HTMLResponse)
 def ui_replay(file: str = Query(default="experiments/reports/last_run.json"), idx: int = Query(default=0)):
-    path = Path(file)
-    if not path.exists():
-        return HTMLResponse(f"<h3>Replay file not found: {html.escape(file)}</h3>", status_code=404)
-    episodes = json.loads(path.read_text(encoding="utf-8"))
-    if not isinstance(episodes, list) or not episodes:
+    index, error = _replay_index(file)
+    if error is not None:
+        return error
+    count = index.episode_count()
+    if not count:
         return HTMLResponse("<h3>Replay file has no episodes</h3>", status_code=400)
-    idx = max(0, min(idx, len(episodes) - 1))
-    ep = episodes[idx]
-    steps = ep.get("steps", [])
-    steps_json = json.dumps(steps)
+    idx = max(0, min(idx, count - 1))
+    ep = index.episode(idx) or {}
+    step_count = ep.get("step_count", 0)
+    # Steps are fetched page by page from /ui/replay/steps; only the first page is inlined.
+    first_page = json.dumps(index.steps(idx, 0, _REPLAY_STEP_PAGE)).replace("<", "\\u003c")
+    steps_url = json.dumps(f"/ui/replay/steps?{urlencode({'file': file, 'idx': idx})}").replace("<", "\\u003c")
     body = f"""
     <main>
       <h2>Episode Replay</h2>
-      <div class="muted">file: {html.escape(file)} | episode {idx+1}/{len(episodes)} | task {html.escape(str(ep.get("task_id")))}</div>
+      <div class="muted">file: {html.escape(file)} | episode {idx+1}/{count} | task {html.escape(str(ep.get("task_id")))}</div>
       <div>
-        <a class="btn" href="/ui/replay?file={html.escape(file)}&idx={max(0, idx-1)}">Prev Episode</a>
-        <a class="btn" href="/ui/replay?file={html.escape(file)}&idx={min(len(episodes)-1, idx+1)}">Next Episode</a>
+        <a class="btn" href="/ui/replay?{render.qs(file=file, idx=max(0, idx-1))}">Prev Episode</a>
+        <a class="btn" href="/ui/replay?{render.qs(file=file, idx=min(count-1, idx+1))}">Next Episode</a>
       </div>
       <div style="margin-top:12px;">
-        <input id="stepRange" type="range" min="0" max="{max(0, len(steps)-1)}" value="0" style="width:100%;" />
+        <input id="stepRange" type="range" min="0" max="{max(0, step_count-1)}" value="0" style="width:100%;" />
       </div>
       <div id="meta" class="muted"></div>
-      <img id="shot" src="" style="max-width:100%; border:1px solid #cbd5e1; border-radius:8px; margin-top:8px;" />
+      <a id="shotLink" href="" target="_blank"><img id="shot" src="" style="max-width:100%; border:1px solid #cbd5e1; border-radius:8px; margin-top:8px;" /></a>
       <pre id="stepJson" style="white-space:pre-wrap;background:#0b1020;color:#dbeafe;padding:8px;border-radius:8px;"></pre>
     </main>
     <script>
-      const steps = {steps_json};
+      const PAGE = {_REPLAY_STEP_PAGE};
+      const stepsUrl = {steps_url};
+      const pages = new Map([[0, Promise.resolve({first_page})]]);
       const range = document.getElementById('stepRange');
       const shot = document.getElementById('shot');
+      const shotLink = document.getElementById('shotLink');
+      const prefetched = new Set();
+      // A resized WebP derivative keeps scrubbing cheap; clicking opens the original PNG.
+      const shotUrl = p => p ? `/artifacts/${{p}}?w={_REPLAY_SHOT_WIDTH}&fmt=webp` : '';
       const meta = document.getElementById('meta');
       const stepJson = document.getElementById('stepJson');
-      function render(i) {{
-        const s = steps[i] || {{}};
+      function loadPage(start) {{
+        if (!pages.has(start)) {{
+          pages.set(start, fetch(`${{stepsUrl}}&offset=${{start}}&limit=${{PAGE}}`).then(r => r.json()).then(d => d.steps));
+        }}
+        return pages.get(start);
+      }}
+      async function render(i) {{
+        const start = Math.floor(i / PAGE) * PAGE;
+        const s = (await loadPage(start))[i - start] || {{}};
+        if (parseInt(range.value, 10) !== i) return;
         const p = s.screenshot_path || "";
-        shot.src = p ? '/artifacts/' + p : '';
+        shot.src = shotUrl(p);
+        shotLink.href = p ? '/artifacts/' + p : '';
         meta.innerText = `step ${{i}} | view=${{s.view_pred}} | action=${{(s.action||{{}}).type||'NA'}} | done=${{s.oracle_done}}`;
         stepJson.textContent = JSON.stringify(s, null, 2);
+        prefetch(i);
+      }}
+      async function prefetch(i) {{
+        for (const j of [i + 1, i - 1, i + 2, i - 2]) {{
+          if (j < 0 || j > parseInt(range.max, 10)) continue;
+          const start = Math.floor(j / PAGE) * PAGE;
+          const url = shotUrl(((await loadPage(start))[j - start] || {{}}).screenshot_path);
+          if (url && !prefetched.has(url)) {{
+            prefetched.add(url);
+            new Image().src = url;
+          }}
+        }}
       }}
       range.addEventListener('input', () => render(parseInt(range.value, 10)));
       render(0);
     </script>
     """
-    return HTMLResponse(_base_html("HOME", "replay", [], body))
+    return HTMLResponse(render.page("HOME", "replay", (), body))
+
+
+@router.get("/ui/replay/steps")
+def ui_replay_steps(
+    file: str = Query(...),
+    idx: int = Query(default=0, ge=0),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=_REPLAY_STEP_PAGE, ge=1, le=MAX_STEP_PAGE),
+):
+    index, error = _replay_index(file, as_json=True)
+    if error is not None:
+        return error
+    ep = index.episode(idx)
+    if ep is None:
+        return JSONResponse({"detail": f"episode {idx} not found"}, status_code=404)
+    return {
+        "episode": idx,
+        "offset": offset,
+        "limit": limit,
+        "total": ep["step_count"],
+        "steps": index.steps(idx, offset, limit),
+    }
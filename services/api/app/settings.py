@@ -6,6 +6,30 @@ from pydantic import BaseModel
 class Settings(BaseModel):
     mongo_uri: str = os.getenv("MONGO_URI", "mongodb://localhost:27017")
     mongo_db: str = os.getenv("MONGO_DB", "simazon")
+    mongo_max_pool_size: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    mongo_min_pool_size: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    mongo_max_idle_time_ms: int = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+    mongo_connect_timeout_ms: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+    mongo_server_selection_timeout_ms: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    mongo_socket_timeout_ms: int = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "20000"))
+    # Carts and catalog epochs need read-your-writes; opt in to secondary reads explicitly.
+    mongo_read_preference: str = os.getenv("MONGO_READ_PREFERENCE", "primary")
+    facet_stats_path: str = os.getenv("FACET_STATS_PATH", "data/processed/facet_stats.json")
+    facet_cache_ttl_s: float = float(os.getenv("FACET_CACHE_TTL_S", "900"))
+    facet_cache_poll_s: float = float(os.getenv("FACET_CACHE_POLL_S", "30"))
+    ui_page_size: int = int(os.getenv("UI_PAGE_SIZE", "50"))
+    job_concurrency: int = int(os.getenv("JOB_CONCURRENCY", "1"))
+    job_max_queued: int = int(os.getenv("JOB_MAX_QUEUED", "50"))
+    job_timeout_s: float = float(os.getenv("JOB_TIMEOUT_S", "7200"))
+    # "warm" forks jobs from a preloaded forkserver; "subprocess" starts a fresh interpreter per job.
+    job_executor: str = os.getenv("JOB_EXECUTOR", "warm")
+    artifacts_dir: str = os.getenv("ARTIFACTS_DIR", "experiments/artifacts")
+    # /ui/replay only opens reports under this directory (it writes an index sidecar next to them).
+    reports_dir: str = os.getenv("REPORTS_DIR", "experiments/reports")
+    # "memory" is per-process; use "mongo" when running uvicorn with --workers > 1.
+    session_backend: str = os.getenv("SESSION_BACKEND", "memory")
+    session_max_sessions: int = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+    session_ttl_s: float = float(os.getenv("SESSION_TTL_S", "86400"))
 
 
 settings = Settings()